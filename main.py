@@ -18,7 +18,13 @@ if __name__ == "__main__":
 
 import uvicorn
 from wechat_decrypt_tool.network_access import get_lan_access_host
-from wechat_decrypt_tool.runtime_settings import read_effective_backend_host, read_effective_backend_port
+from wechat_decrypt_tool.runtime_settings import (
+    read_effective_backend_host,
+    read_effective_backend_port,
+    read_effective_backend_workers,
+    read_backend_uds,
+    read_uvicorn_server_options,
+)
 
 def main():
     """启动微信解密工具API服务"""
@@ -43,8 +49,13 @@ def main():
         print("监听地址来源: 配置文件 output/runtime_settings.json（由网页/桌面设置写入）")
     else:
         print("监听地址来源: 默认值")
-    print(f"监听地址: {host}")
-    print(f"API文档: http://{access_host}:{port}/docs")
+    uds = read_backend_uds()
+    if uds:
+        print(f"监听地址: unix:{uds}（环境变量 WECHAT_TOOL_UDS，忽略 host/port）")
+    else:
+        print(f"监听地址: {host}")
+    if os.environ.get("WECHAT_TOOL_DISABLE_DOCS", "0").strip() != "1":
+        print(f"API文档: http://{access_host}:{port}/docs")
     print(f"健康检查: http://{access_host}:{port}/api/health")
     if lan_access_host != access_host:
         print(f"局域网 MCP: http://{lan_access_host}:{port}/mcp")
@@ -53,13 +64,17 @@ def main():
     
     repo_root = Path(__file__).resolve().parent
     enable_reload = os.environ.get("WECHAT_TOOL_RELOAD", "0") == "1"
+    # uvicorn only honours `workers` with an import string and without reload.
+    workers = 1 if enable_reload else read_effective_backend_workers()
 
     # 启动API服务
     uvicorn.run(
         "wechat_decrypt_tool.api:app",
         host=host,
         port=port,
+        uds=uds,
         reload=enable_reload,
+        workers=workers,
         reload_dirs=[str(repo_root / "src")] if enable_reload else None,
         reload_excludes=[
             "output/*",
@@ -69,7 +84,8 @@ def main():
             ".venv/*",
             ".venv/**",
         ] if enable_reload else None,
-        log_level="info"
+        log_level="info",
+        **read_uvicorn_server_options(),
     )
 
 if __name__ == "__main__":
@@ -1,9 +1,11 @@
 ﻿"""微信解密工具的FastAPI Web服务器"""
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -18,7 +20,7 @@ logger = get_logger(__name__)
 request_logger = get_logger("wechat_decrypt_tool.request")
 
 from . import __version__ as APP_VERSION
-from .path_fix import PathFixRoute
+from .chat_helpers import _close_pooled_read_connections
 from .chat_realtime_autosync import CHAT_REALTIME_AUTOSYNC
 from .routers.chat import router as _chat_router
 from .routers.chat_contacts import router as _chat_contacts_router
@@ -39,29 +41,78 @@ from .routers.wrapped import router as _wrapped_router
 from .routers.general import router as _general_router
 from .routers.favorites import router as _favorites_router
 from .routers.record_export import router as _record_export_router
+from .json_response import FastJSONResponse
 from .request_logging import log_server_errors_middleware
+from .response_compression import GZipTextMiddleware
 from .wcdb_realtime import WCDB_REALTIME, shutdown as _wcdb_shutdown
 from .img_helper import IMG_HELPER
 from .routers.biz import router as _biz_router
 from .routers.system import router as _system_router
 
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    await _startup_background_jobs()
+    try:
+        yield
+    finally:
+        await _shutdown_wcdb_realtime()
+        _close_pooled_read_connections()
+
+
+# Set WECHAT_TOOL_DISABLE_DOCS=1 to skip /docs, /redoc and the OpenAPI schema build
+# (walks every route on first hit) in deployments that never use them.
+_DOCS_ENABLED = os.environ.get("WECHAT_TOOL_DISABLE_DOCS", "0").strip() != "1"
+
 app = FastAPI(
     title="微信数据库解密工具",
     description="现代化的微信数据库解密工具，支持微信信息检测和数据库解密功能",
     version=APP_VERSION,
+    lifespan=_lifespan,
+    default_response_class=FastJSONResponse,
+    docs_url="/docs" if _DOCS_ENABLED else None,
+    redoc_url="/redoc" if _DOCS_ENABLED else None,
+    openapi_url="/openapi.json" if _DOCS_ENABLED else None,
 )
 
-# 设置自定义路由类
-app.router.route_class = PathFixRoute
-
-# Enable CORS for React frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Enable CORS for the web frontend. `WECHAT_TOOL_CORS_ORIGINS` (comma-separated)
+# pins exact origins; the wildcard stays the default so custom API-base setups keep working.
+_CORS_ORIGINS = [
+    origin.strip()
+    for origin in str(os.environ.get("WECHAT_TOOL_CORS_ORIGINS", "") or "").split(",")
+    if origin.strip()
+] or ["*"]
+# The frontend authenticates with headers, not cookies. Credentials are only
+# allowed for an explicit allowlist; with "*" Starlette can then send a static
+# `Access-Control-Allow-Origin: *` instead of echoing each request's Origin.
+_CORS_ALLOW_CREDENTIALS = "*" not in _CORS_ORIGINS
+# When the bundled UI is served by this same process (desktop build / `frontend/.output/public`),
+# every request is same-origin; WECHAT_TOOL_DISABLE_CORS=1 drops the middleware from the chain.
+_CORS_ENABLED = os.environ.get("WECHAT_TOOL_DISABLE_CORS", "0").strip() != "1"
+# eager task factory 会改变任务调度顺序（create_task 时同步执行到首个 await），默认关闭
+_EAGER_TASKS_ENABLED = os.environ.get("WECHAT_TOOL_EAGER_TASKS", "0").strip() == "1"
+
+if _CORS_ENABLED:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=_CORS_ORIGINS,
+        allow_credentials=_CORS_ALLOW_CREDENTIALS,
+        allow_methods=["GET", "POST", "DELETE"],
+        # MCP streamable HTTP 客户端需要携带/读取会话与协议版本头
+        allow_headers=[
+            "authorization",
+            "content-type",
+            "x-mcp-token",
+            "mcp-session-id",
+            "mcp-protocol-version",
+            "last-event-id",
+        ],
+        expose_headers=["mcp-session-id"],
+    )
+
+# Compress large JSON/HTML payloads (chat pages, exports listings, SNS timeline);
+# media, downloads and SSE streams pass through untouched.
+app.add_middleware(GZipTextMiddleware, minimum_size=1024, compresslevel=5)
 
 
 @app.middleware("http")
@@ -72,27 +123,34 @@ async def _log_server_errors(request: Request, call_next):
     return await log_server_errors_middleware(request_logger, request, call_next)
 
 
-app.include_router(_health_router)
-app.include_router(_admin_router)
-app.include_router(_account_archive_export_router)
-app.include_router(_wechat_detection_router)
-app.include_router(_import_decrypted_router)
-app.include_router(_decrypt_router)
-app.include_router(_keys_router)
-app.include_router(_media_router)
-app.include_router(_mcp_router)
-app.include_router(_chat_router)
-app.include_router(_chat_contacts_router)
-app.include_router(_chat_export_router)
-app.include_router(_chat_media_router)
-app.include_router(_sns_router)
-app.include_router(_sns_export_router)
-app.include_router(_wrapped_router)
-app.include_router(_biz_router)
-app.include_router(_general_router)
-app.include_router(_favorites_router)
-app.include_router(_record_export_router)
-app.include_router(_system_router)
+# Compose every feature router under one parent and include it once, so the app
+# router is populated in a single pass.
+_api_router = APIRouter()
+for _router in (
+    _health_router,
+    _admin_router,
+    _account_archive_export_router,
+    _wechat_detection_router,
+    _import_decrypted_router,
+    _decrypt_router,
+    _keys_router,
+    _media_router,
+    _mcp_router,
+    _chat_router,
+    _chat_contacts_router,
+    _chat_export_router,
+    _chat_media_router,
+    _sns_router,
+    _sns_export_router,
+    _wrapped_router,
+    _biz_router,
+    _general_router,
+    _favorites_router,
+    _record_export_router,
+    _system_router,
+):
+    _api_router.include_router(_router)
+app.include_router(_api_router)
 
 
 class _SPAStaticFiles(StaticFiles):
@@ -186,55 +244,72 @@ def _maybe_mount_frontend() -> None:
 _maybe_mount_frontend()
 
 
-@app.on_event("startup")
 async def _startup_background_jobs() -> None:
+    # Python 3.12+ (opt-in via WECHAT_TOOL_EAGER_TASKS=1): run new tasks inline until
+    # their first real await, skipping a scheduler round-trip for coroutines that
+    # finish synchronously.
+    eager_task_factory = getattr(asyncio, "eager_task_factory", None) if _EAGER_TASKS_ENABLED else None
+    if eager_task_factory is not None:
+        try:
+            asyncio.get_running_loop().set_task_factory(eager_task_factory)
+        except Exception:
+            logger.exception("Failed to install eager task factory")
+
     try:
         CHAT_REALTIME_AUTOSYNC.start()
     except Exception:
         logger.exception("Failed to start realtime autosync service")
 
 
-@app.on_event("shutdown")
 async def _shutdown_wcdb_realtime() -> None:
-    try:
-        CHAT_REALTIME_AUTOSYNC.stop()
-    except Exception:
-        pass
-    
-    # Uninstall img_helper hook if enabled
-    try:
-        IMG_HELPER.disable()
-    except Exception:
-        pass
+    # Stopping autosync (joins its worker thread) and uninstalling the img_helper
+    # hook are independent, so overlap them. WCDB close/shutdown below must stay
+    # sequential: the library may only be shut down after every handle is closed.
+    results = await asyncio.gather(
+        asyncio.to_thread(CHAT_REALTIME_AUTOSYNC.stop),
+        asyncio.to_thread(IMG_HELPER.disable),
+        return_exceptions=True,
+    )
+    for step, result in zip(("autosync.stop", "img_helper.disable"), results):
+        if isinstance(result, Exception):
+            logger.warning("[shutdown] %s failed: %s", step, result)
 
-    close_ok = False
     lock_timeout_s: float | None = 0.2
+    raw = str(os.environ.get("WECHAT_TOOL_WCDB_SHUTDOWN_LOCK_TIMEOUT_S", "0.2") or "").strip()
     try:
-        raw = str(os.environ.get("WECHAT_TOOL_WCDB_SHUTDOWN_LOCK_TIMEOUT_S", "0.2") or "").strip()
         lock_timeout_s = float(raw) if raw else 0.2
-        if lock_timeout_s <= 0:
-            lock_timeout_s = None
-    except Exception:
+    except ValueError:
+        logger.warning("[shutdown] invalid WECHAT_TOOL_WCDB_SHUTDOWN_LOCK_TIMEOUT_S=%r; using 0.2", raw)
         lock_timeout_s = 0.2
+    if lock_timeout_s <= 0:
+        lock_timeout_s = None
+
+    # Blocking WCDB calls run off the event loop so shutdown does not stall it.
+    # ctypes/sidecar failures surface as OSError, WCDB errors as RuntimeError.
     try:
-        close_ok = WCDB_REALTIME.close_all(lock_timeout_s=lock_timeout_s)
-    except Exception:
+        close_ok = await asyncio.to_thread(WCDB_REALTIME.close_all, lock_timeout_s=lock_timeout_s)
+    except (OSError, RuntimeError) as e:
+        logger.warning("[shutdown] wcdb close_all failed: %s", e)
         close_ok = False
-    if close_ok:
-        try:
-            _wcdb_shutdown()
-        except Exception:
-            pass
-    else:
+    if not close_ok:
         # If some conn locks were busy, other threads may still be running WCDB calls; avoid shutting down the lib.
         logger.warning("[wcdb] close_all not fully completed; skip wcdb_shutdown")
+        return
+    try:
+        await asyncio.to_thread(_wcdb_shutdown)
+    except (OSError, RuntimeError) as e:
+        logger.warning("[shutdown] wcdb_shutdown failed: %s", e)
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    from .runtime_settings import read_effective_backend_port
+    from .runtime_settings import read_backend_uds, read_effective_backend_port, read_uvicorn_server_options
 
     host = os.environ.get("WECHAT_TOOL_HOST", "127.0.0.1")
     port, _ = read_effective_backend_port(default=10392)
-    uvicorn.run(app, host=host, port=port)
+    # Build Config/Server explicitly; `Server.run` creates the loop via the configured
+    # loop factory (uvloop when selected); startup installs the eager task factory when
+    # WECHAT_TOOL_EAGER_TASKS=1.
+    config = uvicorn.Config(app, host=host, port=port, uds=read_backend_uds(), **read_uvicorn_server_options())
+    uvicorn.Server(config).run()
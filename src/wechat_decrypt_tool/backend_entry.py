@@ -17,13 +17,17 @@ if __name__ == "__main__":
 import uvicorn
 
 from wechat_decrypt_tool.api import app
-from wechat_decrypt_tool.runtime_settings import read_effective_backend_host, read_effective_backend_port
+from wechat_decrypt_tool.runtime_settings import (
+    read_effective_backend_host,
+    read_effective_backend_port,
+    read_uvicorn_server_options,
+)
 
 
 def main() -> None:
     host, _ = read_effective_backend_host(default="127.0.0.1")
     port, _ = read_effective_backend_port(default=10392)
-    uvicorn.run(app, host=host, port=port, log_level="info")
+    uvicorn.run(app, host=host, port=port, log_level="info", **read_uvicorn_server_options())
 
 
 if __name__ == "__main__":
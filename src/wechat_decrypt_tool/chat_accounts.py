@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
+import os
 import re
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
@@ -57,8 +59,31 @@ def _safe_account_name(value: Any) -> str:
     return name
 
 
+# 账号列表会在每次请求里重新计算；打开 sqlite 做有效性检查远比一次 stat 贵，
+# 所以按 (size, mtime_ns) 记住结果，文件被重新解密/替换后自然失效。
+_USABLE_DB_CACHE: dict[str, tuple[int, int, bool]] = {}
+_USABLE_DB_CACHE_LOCK = threading.Lock()
+_USABLE_DB_CACHE_MAX = 256
+
+
 def _is_valid_decrypted_sqlite(path: Path) -> bool:
-    return is_usable_sqlite_db(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    key = str(path)
+    stamp = (int(st.st_size), int(st.st_mtime_ns))
+    with _USABLE_DB_CACHE_LOCK:
+        cached = _USABLE_DB_CACHE.get(key)
+    if cached is not None and cached[:2] == stamp:
+        return cached[2]
+
+    usable = is_usable_sqlite_db(path)
+    with _USABLE_DB_CACHE_LOCK:
+        if len(_USABLE_DB_CACHE) >= _USABLE_DB_CACHE_MAX:
+            _USABLE_DB_CACHE.clear()
+        _USABLE_DB_CACHE[key] = (*stamp, usable)
+    return usable
 
 
 def _has_decrypted_chat_dbs(account_dir: Path) -> bool:
@@ -200,15 +225,15 @@ def _context_for_name(account: str) -> Optional[ChatAccountContext]:
 def list_chat_account_contexts() -> list[ChatAccountContext]:
     names: set[str] = set()
     output_databases_dir = get_output_databases_dir()
-    if output_databases_dir.exists():
-        try:
-            for p in output_databases_dir.iterdir():
-                if p.is_dir():
-                    n = _safe_account_name(p.name)
+    try:
+        with os.scandir(output_databases_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    n = _safe_account_name(entry.name)
                     if n:
                         names.add(n)
-        except Exception:
-            pass
+    except OSError:
+        pass
 
     store = load_account_keys_store()
     if isinstance(store, dict):
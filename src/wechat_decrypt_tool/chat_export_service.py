@@ -20,12 +20,13 @@ import zipfile
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Iterable, Literal, Optional
+from typing import Any, Callable, Iterable, Iterator, Literal, Optional
 from urllib.parse import urlencode, urljoin, urlparse
 
 import requests
 
 from .chat_helpers import (
+    _connect_sqlite_for_read,
     _decode_message_content,
     _decode_sqlite_text,
     _extract_md5_from_packed_info,
@@ -34,17 +35,23 @@ from .chat_helpers import (
     _extract_xml_tag_or_attr,
     _extract_xml_tag_text,
     _format_session_time,
+    _has_appmsg_tag,
     _infer_message_brief_by_local_type,
     _infer_transfer_status_text,
     _iter_message_db_paths,
     _list_decrypted_accounts,
     _load_contact_rows,
     _load_latest_message_previews,
+    _RESOURCE_MD5_BATCH_SIZE,
+    _RESOURCE_MD5_LOCAL_TYPES,
     _lookup_resource_md5,
+    _lookup_resource_md5_batch,
+    _lookup_resource_md5_prefetched,
     _parse_app_message,
     _parse_location_message,
     _parse_system_message_content,
     _parse_pat_message,
+    _pooled_read_connection,
     _build_avatar_url,
     _pick_display_name,
     _quote_ident,
@@ -1347,7 +1354,7 @@ class ChatExportManager:
         resource_conn: Optional[sqlite3.Connection] = None
         try:
             if message_resource_db_path.exists():
-                resource_conn = sqlite3.connect(str(message_resource_db_path))
+                resource_conn = _connect_sqlite_for_read(message_resource_db_path)
                 resource_conn.row_factory = sqlite3.Row
         except Exception:
             try:
@@ -2954,34 +2961,41 @@ def _iter_rows_for_conversation(
                 "ORDER BY m.create_time ASC, m.sort_seq ASC, m.local_id ASC "
             )
 
+            # 主查询按 SELECT 的列顺序直接解包元组，省掉 sqlite3.Row 每列按名字查找
+            conn.row_factory = None
             try:
                 cur = conn.execute(sql_with_join, params)
             except Exception:
                 cur = conn.execute(sql_no_join, params)
 
-            batch = 400
+            is_group = bool(conv_username.endswith("@chatroom"))
+            batch = 1000
             while True:
                 rows = cur.fetchmany(batch)
                 if not rows:
                     break
-                for r in rows:
-                    local_id = int(r["local_id"] or 0)
-                    server_id = int(r["server_id"] or 0)
-                    local_type = int(r["local_type"] or 0)
-                    sort_seq = int(r["sort_seq"] or 0) if r["sort_seq"] is not None else 0
-                    create_time = int(r["create_time"] or 0)
-                    sender_username = _decode_sqlite_text(r["sender_username"]).strip()
+                for (
+                    local_id,
+                    server_id,
+                    local_type,
+                    sort_seq,
+                    real_sender_id,
+                    create_time,
+                    message_content,
+                    compress_content,
+                    packed_info_data,
+                    sender_username,
+                ) in rows:
+                    sender_username = _decode_sqlite_text(sender_username).strip()
 
                     is_sent = False
                     if my_rowid is not None:
                         try:
-                            is_sent = int(r["real_sender_id"] or 0) == int(my_rowid)
+                            is_sent = int(real_sender_id or 0) == int(my_rowid)
                         except Exception:
                             is_sent = False
 
-                    raw_text = _decode_message_content(r["compress_content"], r["message_content"]).strip()
-
-                    is_group = bool(conv_username.endswith("@chatroom"))
+                    raw_text = _decode_message_content(compress_content, message_content).strip()
 
                     if is_sent:
                         sender_username = account_wxid
@@ -2991,15 +3005,15 @@ def _iter_rows_for_conversation(
                     yield _Row(
                         db_stem=db_path.stem,
                         table_name=table_name,
-                        local_id=local_id,
-                        server_id=server_id,
-                        local_type=local_type,
-                        sort_seq=sort_seq,
-                        create_time=create_time,
+                        local_id=int(local_id or 0),
+                        server_id=int(server_id or 0),
+                        local_type=int(local_type or 0),
+                        sort_seq=int(sort_seq or 0),
+                        create_time=int(create_time or 0),
                         raw_text=raw_text,
                         sender_username=sender_username,
                         is_sent=bool(is_sent),
-                        packed_info_data=r["packed_info_data"],
+                        packed_info_data=packed_info_data,
                     )
         finally:
             try:
@@ -3015,6 +3029,46 @@ def _iter_rows_for_conversation(
     return heapq.merge(*streams, key=sort_key)
 
 
+def _iter_with_resource_md5_prefetch(
+    source_messages: Iterable[Any],
+    resource_conn: Optional[sqlite3.Connection],
+    resource_chat_id: Optional[int],
+) -> Iterator[tuple[Any, Optional[dict[tuple[int, int, int, int], str]]]]:
+    """逐条产出 (消息, 所在批次的资源 md5 预取结果)。
+
+    导出是流式读行的；每攒够一批 `_Row` 就一次性查 message_resource.db，
+    代替图片/视频/表情每条各查一次。预取失败时给 None，解析时回退到逐条查询。
+    """
+    if resource_conn is None:
+        for message in source_messages:
+            yield message, None
+        return
+
+    def flush(batch: list[Any]) -> Iterator[tuple[Any, Optional[dict[tuple[int, int, int, int], str]]]]:
+        keys = [
+            (int(m.local_type or 0), int(m.server_id or 0), int(m.local_id or 0), int(m.create_time or 0))
+            for m in batch
+            if isinstance(m, _Row) and int(m.local_type or 0) in _RESOURCE_MD5_LOCAL_TYPES
+        ]
+        prefetched: Optional[dict[tuple[int, int, int, int], str]] = {}
+        if keys:
+            try:
+                prefetched = _lookup_resource_md5_batch(resource_conn, resource_chat_id, keys)
+            except Exception:
+                prefetched = None
+        for message in batch:
+            yield message, prefetched
+
+    batch: list[Any] = []
+    for message in source_messages:
+        batch.append(message)
+        if len(batch) >= _RESOURCE_MD5_BATCH_SIZE:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
 def _parse_message_for_export(
     *,
     row: _Row,
@@ -3024,6 +3078,7 @@ def _parse_message_for_export(
     resource_chat_id: Optional[int],
     sender_alias: str = "",
     resolve_display_name: Optional[Callable[[str], str]] = None,
+    resource_md5_prefetched: Optional[dict[tuple[int, int, int, int], str]] = None,
 ) -> dict[str, Any]:
     raw_text = row.raw_text or ""
     sender_username = str(row.sender_username or "").strip()
@@ -3192,7 +3247,8 @@ def _parse_message_for_export(
         # (especially for *_t.dat thumbnails), causing offline media materialization to miss.
         if resource_conn is not None:
             try:
-                md5_hit = _lookup_resource_md5(
+                md5_hit = _lookup_resource_md5_prefetched(
+                    resource_md5_prefetched,
                     resource_conn,
                     resource_chat_id,
                     message_local_type=local_type,
@@ -3282,7 +3338,8 @@ def _parse_message_for_export(
         video_thumb_file_id = "" if video_thumb_url else (str(video_thumb_url_or_id or "").strip() or "")
         video_file_id = "" if video_url else (str(video_url_or_id or "").strip() or "")
         if (not video_thumb_md5) and resource_conn is not None:
-            video_thumb_md5 = _lookup_resource_md5(
+            video_thumb_md5 = _lookup_resource_md5_prefetched(
+                resource_md5_prefetched,
                 resource_conn,
                 resource_chat_id,
                 message_local_type=local_type,
@@ -3306,7 +3363,8 @@ def _parse_message_for_export(
         if not emoji_url:
             emoji_url = _extract_xml_tag_text(raw_text, "cdn_url")
         if (not emoji_md5) and resource_conn is not None:
-            emoji_md5 = _lookup_resource_md5(
+            emoji_md5 = _lookup_resource_md5_prefetched(
+                resource_md5_prefetched,
                 resource_conn,
                 resource_chat_id,
                 message_local_type=local_type,
@@ -3342,9 +3400,9 @@ def _parse_message_for_export(
         if not content_text:
             content_text = _infer_message_brief_by_local_type(local_type)
         else:
-            if content_text.startswith("<") or content_text.startswith('"<'):
+            if content_text.startswith(("<", '"<')):
                 parsed_special = False
-                if "<appmsg" in content_text.lower():
+                if _has_appmsg_tag(content_text):
                     parsed = _parse_app_message(content_text)
                     rt = str(parsed.get("renderType") or "")
                     if rt and rt != "text":
@@ -3607,7 +3665,9 @@ def _write_conversation_json(
                 source=source,
                 rt_conn=rt_conn,
             )
-            for source_message in source_messages:
+            for source_message, resource_md5_prefetched in _iter_with_resource_md5_prefetch(
+                source_messages, resource_conn, resource_chat_id
+            ):
                 scanned += 1
                 _raise_if_job_cancelled(
                     job,
@@ -3653,6 +3713,7 @@ def _write_conversation_json(
                         resource_chat_id=resource_chat_id,
                         sender_alias=sender_alias,
                         resolve_display_name=resolve_display_name,
+                        resource_md5_prefetched=resource_md5_prefetched,
                     )
                     _log_export_slow_step(
                         "json.parse_message",
@@ -3953,7 +4014,9 @@ def _write_conversation_txt(
                 source=source,
                 rt_conn=rt_conn,
             )
-            for source_message in source_messages:
+            for source_message, resource_md5_prefetched in _iter_with_resource_md5_prefetch(
+                source_messages, resource_conn, resource_chat_id
+            ):
                 scanned += 1
                 _raise_if_job_cancelled(
                     job,
@@ -3998,6 +4061,7 @@ def _write_conversation_txt(
                         resource_chat_id=resource_chat_id,
                         sender_alias=sender_alias,
                         resolve_display_name=resolve_display_name,
+                        resource_md5_prefetched=resource_md5_prefetched,
                     )
                     _log_export_slow_step(
                         "txt.parse_message",
@@ -4850,7 +4914,9 @@ def _write_conversation_html(
                 source=source,
                 rt_conn=rt_conn,
             )
-            for source_message in source_messages:
+            for source_message, resource_md5_prefetched in _iter_with_resource_md5_prefetch(
+                source_messages, resource_conn, resource_chat_id
+            ):
                 scanned += 1
                 _raise_if_job_cancelled(
                     job,
@@ -4882,6 +4948,7 @@ def _write_conversation_html(
                         resource_chat_id=resource_chat_id,
                         sender_alias="",
                         resolve_display_name=resolve_display_name,
+                        resource_md5_prefetched=resource_md5_prefetched,
                     )
                     _log_export_slow_step(
                         "html.parse_message",
@@ -6264,20 +6331,17 @@ def _materialize_voice(
 
     data = b""
     if media_db_path.exists():
-        conn: Optional[sqlite3.Connection] = None
+        # 导出会逐条取语音，复用池化的只读连接，不再每条语音都重新打开 media_0.db。
         try:
-            conn = sqlite3.connect(str(media_db_path))
-            row = conn.execute(
-                "SELECT voice_data FROM VoiceInfo WHERE svr_id = ? ORDER BY create_time DESC LIMIT 1",
-                (int(server_id),),
-            ).fetchone()
+            with _pooled_read_connection(media_db_path) as conn:
+                row = conn.execute(
+                    "SELECT voice_data FROM VoiceInfo WHERE svr_id = ? ORDER BY create_time DESC LIMIT 1",
+                    (int(server_id),),
+                ).fetchone()
             if row:
                 data = coerce_blob(row[0])
         except Exception:
             data = b""
-        finally:
-            if conn is not None:
-                conn.close()
 
     if not data:
         try:
@@ -1,13 +1,17 @@
 import base64
 import hashlib
 import html
+import json
 import os
 import re
 import sqlite3
-from collections import Counter
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterable, Iterator, Optional
 from urllib.parse import parse_qs, quote, urlparse
 
 from .chat_accounts import list_chat_account_names, resolve_chat_account_context
@@ -120,6 +124,22 @@ def _resolve_account_dir(account: Optional[str]) -> Path:
     return resolve_chat_account_context(account).account_dir
 
 
+_SESSION_EXCLUDE_EXACT = frozenset(
+    {
+        "brandsessionholder",
+        "brandservicesessionholder",
+        "notifymessage",
+        "opencustomerservicemsg",
+        "notification_messages",
+        "userexperience_alarm",
+    }
+)
+# System-account prefixes and openim/service markers, folded into one C-level regex search.
+_SESSION_EXCLUDE_RE = re.compile(
+    r"^(?:weixin|qqmail|fmessage|medianote|floatbottle|newsapp)|@kefu\.openim|@openim|service_"
+)
+
+
 def _should_keep_session(username: str, include_official: bool) -> bool:
     if not username:
         return False
@@ -127,36 +147,23 @@ def _should_keep_session(username: str, include_official: bool) -> bool:
     if not include_official and username.startswith("gh_"):
         return False
 
-    if username.startswith(("weixin", "qqmail", "fmessage", "medianote", "floatbottle", "newsapp")):
-        return False
-
-    if "@kefu.openim" in username:
-        return False
-    if "@openim" in username:
-        return False
-    if "service_" in username:
-        return False
-
-    if username in {
-        "brandsessionholder",
-        "brandservicesessionholder",
-        "notifymessage",
-        "opencustomerservicemsg",
-        "notification_messages",
-        "userexperience_alarm",
-    }:
+    if username in _SESSION_EXCLUDE_EXACT or _SESSION_EXCLUDE_RE.search(username):
         return False
 
     return username.endswith("@chatroom") or username.startswith("wxid_") or ("@" not in username)
 
 
-def _format_session_time(ts: Optional[int]) -> str:
-    """智能时间格式化：今天显示时间，昨天显示"昨天 HH:MM"，本周显示"星期X HH:MM"，本年显示"M月D日 HH:MM"，跨年显示"YYYY年M月D日 HH:MM"""
+def _format_session_time(ts: Optional[int], *, now: Optional[datetime] = None) -> str:
+    """智能时间格式化：今天显示时间，昨天显示"昨天 HH:MM"，本周显示"星期X HH:MM"，本年显示"M月D日 HH:MM"，跨年显示"YYYY年M月D日 HH:MM"
+
+    批量格式化时可传入同一个 `now`，省去逐条取当前时间。
+    """
     if not ts:
         return ""
     try:
         dt = datetime.fromtimestamp(int(ts))
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
         time_str = dt.strftime("%H:%M")
 
         # 计算日期差异（基于日历日期）
@@ -188,106 +195,135 @@ def _format_session_time(ts: Optional[int]) -> str:
         return ""
 
 
+_LAST_MESSAGE_BRIEF_BY_TYPE: dict[int, str] = {
+    1: "[文本]",
+    3: "[图片]",
+    34: "[语音]",
+    42: "[名片]",
+    43: "[视频]",
+    47: "[动画表情]",
+    48: "[位置]",
+    10000: "[系统消息]",
+}
+# type 49 (app message) is further split by sub_type.
+_LAST_MESSAGE_BRIEF_BY_APP_SUBTYPE: dict[int, str] = {
+    5: "[链接]",
+    6: "[文件]",
+    33: "[小程序]",
+    36: "[小程序]",
+    57: "[引用消息]",
+    63: "[直播]",
+    88: "[直播]",
+    87: "[群公告]",
+    2000: "[转账]",
+    2003: "[红包]",
+    19: "[聊天记录]",
+}
+
+_MESSAGE_BRIEF_BY_LOCAL_TYPE: dict[int, str] = {
+    1: "",
+    3: "[图片]",
+    34: "[语音]",
+    43: "[视频]",
+    47: "[动画表情]",
+    48: "[位置]",
+    50: "[通话]",
+    10000: "[系统消息]",
+    244813135921: "[引用消息]",
+    17179869233: "[链接]",
+    21474836529: "[文章]",
+    154618822705: "[小程序]",
+    12884901937: "[音乐]",
+    8594229559345: "[红包]",
+    81604378673: "[聊天记录]",
+    266287972401: "[拍一拍]",
+    8589934592049: "[转账]",
+    270582939697: "[直播]",
+    25769803825: "[文件]",
+}
+
+
 def _infer_last_message_brief(msg_type: Optional[int], sub_type: Optional[int]) -> str:
     t = int(msg_type or 0)
-    s = int(sub_type or 0)
-
-    if t == 1:
-        return "[文本]"
-    if t == 3:
-        return "[图片]"
-    if t == 34:
-        return "[语音]"
-    if t == 42:
-        return "[名片]"
-    if t == 43:
-        return "[视频]"
-    if t == 47:
-        return "[动画表情]"
-    if t == 48:
-        return "[位置]"
     if t == 49:
-        if s == 5:
-            return "[链接]"
-        if s == 6:
-            return "[文件]"
-        if s in (33, 36):
-            return "[小程序]"
-        if s == 57:
-            return "[引用消息]"
-        if s in (63, 88):
-            return "[直播]"
-        if s == 87:
-            return "[群公告]"
-        if s == 2000:
-            return "[转账]"
-        if s == 2003:
-            return "[红包]"
-        if s == 19:
-            return "[聊天记录]"
-        return "[消息]"
-    if t == 10000:
-        return "[系统消息]"
-    return "[消息]"
+        return _LAST_MESSAGE_BRIEF_BY_APP_SUBTYPE.get(int(sub_type or 0), "[消息]")
+    return _LAST_MESSAGE_BRIEF_BY_TYPE.get(t, "[消息]")
 
 
 def _infer_message_brief_by_local_type(local_type: Optional[int]) -> str:
-    t = int(local_type or 0)
-    if t == 1:
-        return ""
-    if t == 3:
-        return "[图片]"
-    if t == 34:
-        return "[语音]"
-    if t == 43:
-        return "[视频]"
-    if t == 47:
-        return "[动画表情]"
-    if t == 48:
-        return "[位置]"
-    if t == 50:
-        return "[通话]"
-    if t == 10000:
-        return "[系统消息]"
-    if t == 244813135921:
-        return "[引用消息]"
-    if t == 17179869233:
-        return "[链接]"
-    if t == 21474836529:
-        return "[文章]"
-    if t == 154618822705:
-        return "[小程序]"
-    if t == 12884901937:
-        return "[音乐]"
-    if t == 8594229559345:
-        return "[红包]"
-    if t == 81604378673:
-        return "[聊天记录]"
-    if t == 266287972401:
-        return "[拍一拍]"
-    if t == 8589934592049:
-        return "[转账]"
-    if t == 270582939697:
-        return "[直播]"
-    if t == 25769803825:
-        return "[文件]"
-    return "[消息]"
+    return _MESSAGE_BRIEF_BY_LOCAL_TYPE.get(int(local_type or 0), "[消息]")
 
 
 def _quote_ident(ident: str) -> str:
     return '"' + ident.replace('"', '""') + '"'
 
 
+# Per-database table listing, keyed by (db file, mtime_ns, PRAGMA schema_version) so a
+# re-decrypted file or a newly created msg table invalidates the entry.
+_TABLE_NAMES_CACHE_MAX = 64
+_TABLE_NAMES_CACHE_LOCK = threading.Lock()
+_TABLE_NAMES_CACHE: dict[tuple[str, int, int], dict[str, Any]] = {}
+
+
+def _table_names_cache_key(conn: sqlite3.Connection) -> Optional[tuple[str, int, int]]:
+    try:
+        row = conn.execute("PRAGMA database_list").fetchone()
+        db_file = str(row[2] or "") if row else ""
+        if not db_file:
+            return None
+        mtime_ns = int(os.stat(db_file).st_mtime_ns)
+        schema_version = int(conn.execute("PRAGMA schema_version").fetchone()[0])
+        return db_file, mtime_ns, schema_version
+    except Exception:
+        return None
+
+
+def _sqlite_table_entry(conn: sqlite3.Connection) -> dict[str, Any]:
+    key = _table_names_cache_key(conn)
+    if key is not None:
+        with _TABLE_NAMES_CACHE_LOCK:
+            cached = _TABLE_NAMES_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    entry: dict[str, Any] = {"names": tuple(str(r[0]) for r in rows if r and r[0]), "resolved": {}}
+    if key is not None:
+        with _TABLE_NAMES_CACHE_LOCK:
+            if len(_TABLE_NAMES_CACHE) >= _TABLE_NAMES_CACHE_MAX:
+                _TABLE_NAMES_CACHE.clear()
+            _TABLE_NAMES_CACHE[key] = entry
+    return entry
+
+
+def _sqlite_table_names(conn: sqlite3.Connection) -> tuple[str, ...]:
+    """Return all table names of `conn`'s main database (cached per file/schema version)."""
+    return _sqlite_table_entry(conn)["names"]
+
+
+@lru_cache(maxsize=4096)
+def _username_md5(username: str) -> str:
+    """md5 hex of a username; WeChat names per-chat msg tables and attach dirs by it."""
+    return hashlib.md5(username.encode("utf-8")).hexdigest()
+
+
 def _resolve_msg_table_name(conn: sqlite3.Connection, username: str) -> Optional[str]:
     if not username:
         return None
-    md5_hex = hashlib.md5(username.encode("utf-8")).hexdigest()
+    entry = _sqlite_table_entry(conn)
+    resolved: dict[str, Optional[str]] = entry["resolved"]
+    if username in resolved:
+        return resolved[username]
+    table_name = _resolve_msg_table_name_from_names(entry["names"], username)
+    resolved[username] = table_name
+    return table_name
+
+
+def _resolve_msg_table_name_from_names(names: tuple[str, ...], username: str) -> Optional[str]:
+    md5_hex = _username_md5(username)
     expected = f"msg_{md5_hex}".lower()
     expected_chat = f"chat_{md5_hex}".lower()
 
-    rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-    names = [r[0] for r in rows if r and r[0]]
-
     for name in names:
         if str(name).lower() == expected:
             return str(name)
@@ -315,6 +351,198 @@ def _resolve_msg_table_name(conn: sqlite3.Connection, username: str) -> Optional
     return None
 
 
+_READ_CONNECTION_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def _connect_sqlite_for_read(db_path: Path, *, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a decrypted DB for lookups only: mmap'd reads, bigger page cache, writes refused.
+
+    The journal mode is left untouched; switching it would rewrite the decrypted file.
+    """
+    conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=check_same_thread)
+    for pragma in _READ_CONNECTION_PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.Error:
+            pass
+    return conn
+
+
+def _begin_read_transaction(conn: sqlite3.Connection) -> None:
+    """在只读连接上显式开一个读事务，后续多条查询共用同一把共享锁和同一份快照。
+
+    自动提交模式下每条 SELECT 都要各自加锁/解锁并重新校验页缓存；关闭连接即结束该事务。
+    """
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+    except sqlite3.Error:
+        pass
+
+
+def _sqlite_file_stamp(db_path: Path) -> Optional[tuple[int, int, int, int]]:
+    """(size, mtime_ns) of the db file plus its -wal; None when the db itself is missing."""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    try:
+        wal = os.stat(f"{db_path}-wal")
+        wal_stamp = (int(wal.st_size), int(wal.st_mtime_ns))
+    except OSError:
+        wal_stamp = (0, 0)
+    return (int(st.st_size), int(st.st_mtime_ns), *wal_stamp)
+
+
+# 媒体/会话等高频接口的只读连接池：按库路径缓存少量空闲连接，省掉每个请求的 open + pager 初始化。
+# 库文件 stamp 变化（重新解密/实时同步）后旧连接全部作废；空闲超过 _READ_POOL_IDLE_SECONDS 的连接
+# 由后台定时器关闭，避免长期占着文件句柄（Windows 上会挡住解密时替换文件）。
+_READ_POOL: dict[str, tuple[tuple[int, int, int, int], list[tuple[float, sqlite3.Connection]]]] = {}
+_READ_POOL_LOCK = threading.Lock()
+_READ_POOL_MAX_IDLE = 4
+_READ_POOL_IDLE_SECONDS = 30.0
+_READ_POOL_REAPER: Optional[threading.Timer] = None
+
+
+def _close_quietly(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _reap_idle_read_connections() -> None:
+    global _READ_POOL_REAPER
+    cutoff = time.monotonic() - _READ_POOL_IDLE_SECONDS
+    expired: list[sqlite3.Connection] = []
+    with _READ_POOL_LOCK:
+        _READ_POOL_REAPER = None
+        for key in list(_READ_POOL):
+            stamp, idle = _READ_POOL[key]
+            keep = [(t, c) for t, c in idle if t >= cutoff]
+            expired.extend(c for t, c in idle if t < cutoff)
+            if keep:
+                _READ_POOL[key] = (stamp, keep)
+            else:
+                del _READ_POOL[key]
+        if _READ_POOL:
+            _schedule_read_pool_reaper_locked()
+    for conn in expired:
+        _close_quietly(conn)
+
+
+def _schedule_read_pool_reaper_locked() -> None:
+    global _READ_POOL_REAPER
+    if _READ_POOL_REAPER is not None:
+        return
+    timer = threading.Timer(_READ_POOL_IDLE_SECONDS, _reap_idle_read_connections)
+    timer.daemon = True
+    _READ_POOL_REAPER = timer
+    timer.start()
+
+
+def _read_pool_path_key(path: Path | str) -> str:
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def _close_pooled_read_connections(under: Optional[Path | str] = None) -> None:
+    """关闭空闲的池化连接（停机或需要释放文件句柄时调用）。
+
+    传入 `under` 时只关闭该库文件本身或该目录下的库的连接，例如重新解密写库、删除账号目录之前。
+    """
+    prefix = _read_pool_path_key(under) if under is not None else ""
+    with _READ_POOL_LOCK:
+        if not prefix:
+            keys = list(_READ_POOL)
+        else:
+            keys = [
+                k
+                for k in _READ_POOL
+                if (pk := _read_pool_path_key(k)) == prefix or pk.startswith(prefix.rstrip(os.sep) + os.sep)
+            ]
+        pools = [_READ_POOL.pop(k) for k in keys]
+    for _stamp, idle in pools:
+        for _t, conn in idle:
+            _close_quietly(conn)
+
+
+@contextmanager
+def _pooled_read_connection(db_path: Path) -> Iterator[sqlite3.Connection]:
+    """从连接池借一个 `_connect_sqlite_for_read` 连接，用完归还。
+
+    归还时会重置 row_factory/text_factory；使用中抛异常的连接直接关闭，不放回池里。
+    """
+    key = str(db_path)
+    stamp = _sqlite_file_stamp(db_path)
+    conn: Optional[sqlite3.Connection] = None
+    stale: list[tuple[float, sqlite3.Connection]] = []
+    with _READ_POOL_LOCK:
+        entry = _READ_POOL.get(key)
+        if entry is not None:
+            if entry[0] != stamp:
+                stale = entry[1]
+                del _READ_POOL[key]
+            elif entry[1]:
+                conn = entry[1].pop()[1]
+    for _t, old in stale:
+        _close_quietly(old)
+    if conn is None:
+        conn = _connect_sqlite_for_read(db_path, check_same_thread=False)
+
+    try:
+        yield conn
+    except BaseException:
+        _close_quietly(conn)
+        raise
+
+    try:
+        conn.row_factory = None
+        conn.text_factory = str
+        if conn.in_transaction:
+            conn.rollback()
+    except Exception:
+        _close_quietly(conn)
+        return
+    if stamp is None or _sqlite_file_stamp(db_path) != stamp:
+        _close_quietly(conn)
+        return
+    with _READ_POOL_LOCK:
+        entry = _READ_POOL.get(key)
+        if entry is None:
+            entry = (stamp, [])
+            _READ_POOL[key] = entry
+        if entry[0] == stamp and len(entry[1]) < _READ_POOL_MAX_IDLE:
+            entry[1].append((time.monotonic(), conn))
+            conn = None
+            _schedule_read_pool_reaper_locked()
+    if conn is not None:
+        _close_quietly(conn)
+
+
+def _select_where_username_in(conn: sqlite3.Connection, select_from: str, usernames: list[str]) -> list[Any]:
+    """执行 `{select_from} WHERE username IN (...)`，一次查完整个列表。"""
+    # 整个列表作为一个 JSON 参数传给 json_each：SQL 文本固定（语句缓存可复用），不受
+    # IN (?,?,...) 的变量个数上限影响；只读连接上也不需要建临时表。
+    try:
+        return conn.execute(
+            f"{select_from} WHERE username IN (SELECT value FROM json_each(?))",
+            (json.dumps(usernames, ensure_ascii=False),),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # 没有 JSON1 的旧 sqlite：退回分批 IN。
+        rows: list[Any] = []
+        for i in range(0, len(usernames), 500):
+            batch = usernames[i : i + 500]
+            placeholders = ",".join(["?"] * len(batch))
+            rows.extend(conn.execute(f"{select_from} WHERE username IN ({placeholders})", batch).fetchall())
+        return rows
+
+
 def _query_head_image_usernames(head_image_db_path: Path, usernames: list[str]) -> set[str]:
     uniq = list(dict.fromkeys([u for u in usernames if u]))
     if not uniq:
@@ -322,16 +550,9 @@ def _query_head_image_usernames(head_image_db_path: Path, usernames: list[str])
     if not head_image_db_path.exists():
         return set()
 
-    conn = sqlite3.connect(str(head_image_db_path))
-    try:
-        placeholders = ",".join(["?"] * len(uniq))
-        rows = conn.execute(
-            f"SELECT username FROM head_image WHERE username IN ({placeholders})",
-            uniq,
-        ).fetchall()
-        return {str(r[0]) for r in rows if r and r[0]}
-    finally:
-        conn.close()
+    with _pooled_read_connection(head_image_db_path) as conn:
+        rows = _select_where_username_in(conn, "SELECT username FROM head_image", uniq)
+    return {str(r[0]) for r in rows if r and r[0]}
 
 
 def _build_avatar_url(account_dir_name: str, username: str) -> str:
@@ -339,98 +560,123 @@ def _build_avatar_url(account_dir_name: str, username: str) -> str:
 
 
 def _decode_sqlite_text(value: Any) -> str:
+    # sqlite 返回的绝大多数是 str，先走精确类型判断的快路径。
+    value_type = type(value)
+    if value_type is str:
+        return value
     if value is None:
         return ""
     if isinstance(value, bytes):
-        try:
-            return value.decode("utf-8", errors="ignore")
-        except Exception:
-            return ""
+        return value.decode("utf-8", errors="ignore")
     if isinstance(value, memoryview):
-        try:
-            return bytes(value).decode("utf-8", errors="ignore")
-        except Exception:
-            return ""
+        return bytes(value).decode("utf-8", errors="ignore")
     return str(value)
 
 
+_TEXT_CONTROL_WHITESPACE = str.maketrans("", "", "\n\r\t")
+
+
 def _is_mostly_printable_text(s: str) -> bool:
     if not s:
         return False
     sample = s[:600]
     if not sample:
         return False
-    printable = sum(1 for ch in sample if ch.isprintable() or ch in {"\n", "\r", "\t"})
-    return (printable / len(sample)) >= 0.85
+    # 正常文本去掉换行/制表后整体 isprintable()，一次 C 调用即可判定；只有混了控制字符时才逐字计数。
+    visible = sample.translate(_TEXT_CONTROL_WHITESPACE)
+    if visible.isprintable():
+        return True
+    non_printable = sum(1 for ch in visible if not ch.isprintable())
+    return ((len(sample) - non_printable) / len(sample)) >= 0.85
+
+
+_LEADING_WS_RE = re.compile(r"\s*")
+_LEADING_QUOTES_WS_RE = re.compile(r'"*\s*')
+
+
+_APPMSG_TAG_RE = re.compile(r"<appmsg", re.IGNORECASE)
+
+
+def _has_appmsg_tag(s: str) -> bool:
+    """等价于 `"<appmsg" in s.lower()`，但不为整条消息体生成小写副本。"""
+    return bool(s) and _APPMSG_TAG_RE.search(s) is not None
 
 
 def _looks_like_xml(s: str) -> bool:
+    # 等价于 `s.lstrip()`（再剥掉成对的外层引号）后看首字符是否为 "<"，
+    # 但只移动下标，不为几十 KB 的消息体复制一份去掉空白的新字符串。
     if not s:
         return False
-    t = s.lstrip()
-    if t.startswith('"') and t.endswith('"'):
-        t = t.strip('"').lstrip()
-    return t.startswith("<")
+    i = _LEADING_WS_RE.match(s).end()
+    if i >= len(s):
+        return False
+    if s[i] == '"' and s[-1] == '"':
+        i = _LEADING_QUOTES_WS_RE.match(s, i).end()
+    return s.startswith("<", i)
+
+
+_HEX_TEXT_RE = re.compile(r"[0-9a-fA-F]+")
+_ZSTD_FRAME_MAGIC = b"\x28\xb5\x2f\xfd"
+# ZstdDecompressor 不能跨线程并发使用；每个线程复用一个，省去逐条消息创建解压上下文的开销。
+_ZSTD_LOCAL = threading.local()
+
+
+def _zstd_decompress(data: bytes, max_output_size: int = 0) -> bytes:
+    dctx = getattr(_ZSTD_LOCAL, "dctx", None)
+    if dctx is None:
+        dctx = zstd.ZstdDecompressor()
+        _ZSTD_LOCAL.dctx = dctx
+    return dctx.decompress(data, max_output_size=max_output_size)
+
+
+def _zstd_frame_text(raw: bytes) -> Optional[str]:
+    """解压一个 zstd 帧并做一次 decode/unescape/校验；不是 zstd 帧或解压失败返回 None。"""
+    if zstd is None or not raw.startswith(_ZSTD_FRAME_MAGIC):
+        return None
+    try:
+        out = _zstd_decompress(raw)
+    except zstd.ZstdError:
+        return None
+    s = html.unescape(out.decode("utf-8", errors="ignore").strip())
+    if _looks_like_xml(s) or _is_mostly_printable_text(s):
+        return s
+    return None
+
+
+def _decode_text_blob_bytes(raw: bytes) -> Optional[str]:
+    """hex/base64 解出的字节：zstd 帧优先解压；否则只接受仍像消息 XML 的内容。"""
+    s2 = _zstd_frame_text(raw)
+    if s2:
+        return s2
+    s2 = html.unescape(raw.decode("utf-8", errors="ignore").strip())
+    # Avoid decoding user-sent pure-hex text (e.g. "68656c6c6f") into arbitrary strings;
+    # only accept non-zstd hex if it still looks like a message XML payload.
+    s2_lower = s2.lower()
+    if _looks_like_xml(s2) or ("<msg" in s2_lower and "</msg>" in s2_lower) or "<appmsg" in s2_lower:
+        return s2
+    return None
 
 
 def _decode_message_content(compress_value: Any, message_value: Any) -> str:
     def try_decode_text_blob(text: str) -> Optional[str]:
         t = (text or "").strip()
-        if not t:
+        # hex/base64 只可能是 ASCII；isascii() 是 O(1) 的标志位检查，中文等普通文本直接跳过，
+        # 不必再让 fromhex / b64decode 各抛一次异常。
+        if not t or not t.isascii():
             return None
 
-        # zstd frame magic: 28 b5 2f fd
-        zstd_magic = b"\x28\xb5\x2f\xfd"
-
-        if len(t) >= 16 and len(t) % 2 == 0 and re.fullmatch(r"[0-9a-fA-F]+", t):
-            try:
-                raw = bytes.fromhex(t)
-                if zstd is not None and raw.startswith(zstd_magic):
-                    try:
-                        out = zstd.decompress(raw)
-                        s2 = out.decode("utf-8", errors="ignore")
-                        s2 = html.unescape(s2.strip())
-                        if _looks_like_xml(s2) or _is_mostly_printable_text(s2):
-                            return s2
-                    except Exception:
-                        pass
-                s2 = raw.decode("utf-8", errors="ignore")
-                s2 = html.unescape(s2.strip())
-                # Avoid decoding user-sent pure-hex text (e.g. "68656c6c6f") into arbitrary strings;
-                # only accept non-zstd hex if it still looks like a message XML payload.
-                s2_lower = s2.lower()
-                if (
-                    _looks_like_xml(s2)
-                    or ("<msg" in s2_lower and "</msg>" in s2_lower)
-                    or "<appmsg" in s2_lower
-                ):
-                    return s2
-            except Exception:
-                return None
+        # hex 只接受纯十六进制（fromhex 会放过空白分隔写法）；base64 交给 b64decode(validate=True) 判定字符集。
+        if len(t) >= 16 and len(t) % 2 == 0 and _HEX_TEXT_RE.fullmatch(t):
+            s2 = _decode_text_blob_bytes(bytes.fromhex(t))
+            if s2:
+                return s2
 
-        if len(t) >= 24 and len(t) % 4 == 0 and re.fullmatch(r"[A-Za-z0-9+/=]+", t):
+        if len(t) >= 24 and len(t) % 4 == 0:
             try:
-                raw = base64.b64decode(t)
-                if zstd is not None and raw.startswith(zstd_magic):
-                    try:
-                        out = zstd.decompress(raw)
-                        s2 = out.decode("utf-8", errors="ignore")
-                        s2 = html.unescape(s2.strip())
-                        if _looks_like_xml(s2) or _is_mostly_printable_text(s2):
-                            return s2
-                    except Exception:
-                        pass
-                s2 = raw.decode("utf-8", errors="ignore")
-                s2 = html.unescape(s2.strip())
-                s2_lower = s2.lower()
-                if (
-                    _looks_like_xml(s2)
-                    or ("<msg" in s2_lower and "</msg>" in s2_lower)
-                    or "<appmsg" in s2_lower
-                ):
-                    return s2
-            except Exception:
+                raw = base64.b64decode(t, validate=True)
+            except ValueError:
                 return None
+            return _decode_text_blob_bytes(raw)
 
         return None
 
@@ -447,15 +693,9 @@ def _decode_message_content(compress_value: Any, message_value: Any) -> str:
 
     if isinstance(message_value, (bytes, bytearray, memoryview)):
         raw = bytes(message_value) if isinstance(message_value, memoryview) else message_value
-        if raw.startswith(b"\x28\xb5\x2f\xfd") and zstd is not None:
-            try:
-                out = zstd.decompress(raw)
-                s = out.decode("utf-8", errors="ignore")
-                s = html.unescape(s.strip())
-                if _looks_like_xml(s) or _is_mostly_printable_text(s):
-                    msg_text = s
-            except Exception:
-                pass
+        s = _zstd_frame_text(raw)
+        if s:
+            msg_text = s
 
     if compress_value is None:
         return msg_text
@@ -478,15 +718,10 @@ def _decode_message_content(compress_value: Any, message_value: Any) -> str:
     if not data:
         return msg_text
 
-    if zstd is not None:
-        try:
-            out = zstd.decompress(data)
-            s = out.decode("utf-8", errors="ignore")
-            s = html.unescape(s.strip())
-            if _looks_like_xml(s) or _is_mostly_printable_text(s):
-                return s
-        except Exception:
-            pass
+    # 只有以 zstd 帧头开头的数据才尝试解压，普通文本不再白白抛一次 ZstdError。
+    s = _zstd_frame_text(data)
+    if s:
+        return s
 
     try:
         s = data.decode("utf-8", errors="ignore")
@@ -502,11 +737,23 @@ def _decode_message_content(compress_value: Any, message_value: Any) -> str:
     return msg_text
 
 
-_MD5_HEX_RE = re.compile(rb"(?i)[0-9a-f]{32}")
-_DAT_MD5_RE = re.compile(rb"(?i)([0-9a-f]{32})(?:[._][thbc])?\.dat")
+# 匹配前先把整个 blob 转成小写：大小写敏感的字符类比 (?i) 快，结果也不用再逐个 lower。
+_MD5_HEX_RE = re.compile(rb"[0-9a-f]{32}")
+_DAT_MD5_RE = re.compile(rb"([0-9a-f]{32})(?:[._][thbc])?\.dat")
 _PACKED_INFO_HEX_RE = re.compile(r"(?i)^[0-9a-f]+$")
 
 
+def _most_common_token(tokens: list[bytes]) -> bytes:
+    # 等价于 Counter(tokens).most_common(1)[0][0]：并列时取最先出现的（max 按 dict 插入顺序返回第一个）。
+    # packed_info 绝大多数只有一个候选，直接返回；其余情况用普通 dict 计数，省掉 Counter 的构造开销。
+    if len(tokens) == 1:
+        return tokens[0]
+    counts: dict[bytes, int] = {}
+    for tok in tokens:
+        counts[tok] = counts.get(tok, 0) + 1
+    return max(counts, key=counts.__getitem__)
+
+
 def _extract_md5_from_blob(blob: Any) -> str:
     if blob is None:
         return ""
@@ -522,25 +769,21 @@ def _extract_md5_from_blob(blob: Any) -> str:
 
     if not data:
         return ""
+    data = data.lower()
 
     # Prefer md5 that appears as an actual `.dat` filename (incl. _t.dat/.t.dat variants).
     # This matches echotrace's idea: packed_info often contains multiple 32-hex tokens, but only
     # the one referenced by a file path is the correct on-disk basename.
-    try:
+    if b".dat" in data:
         m2 = _DAT_MD5_RE.findall(data)
-    except Exception:
-        m2 = []
-    if m2:
-        best2 = Counter([x.lower() for x in m2]).most_common(1)[0][0]
-        try:
+        if m2:
+            best2 = _most_common_token(m2)
             return best2.decode("ascii", errors="ignore")
-        except Exception:
-            return ""
 
     m = _MD5_HEX_RE.findall(data)
     if not m:
         return ""
-    best = Counter([x.lower() for x in m]).most_common(1)[0][0]
+    best = _most_common_token(m)
     try:
         return best.decode("ascii", errors="ignore")
     except Exception:
@@ -601,6 +844,71 @@ def _resource_lookup_chat_id(resource_conn: sqlite3.Connection, username: str) -
     return None
 
 
+class _LazyReadConnection:
+    """第一次 execute 时才打开的 `_connect_sqlite_for_read` 连接（row_factory=sqlite3.Row）。
+
+    message_resource.db 只有图片/视频/表情行才会查到；纯文本的消息页不必为它开库。
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def opened(self) -> bool:
+        return self._conn is not None
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        if self._conn is None:
+            conn = _connect_sqlite_for_read(self.db_path)
+            conn.row_factory = sqlite3.Row
+            # 一个请求里的资源查询（预取 + 回退 + 引用）放在同一个读事务里
+            _begin_read_transaction(conn)
+            self._conn = conn
+        return self._conn.execute(sql, parameters)
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            _close_quietly(conn)
+
+
+# (message_resource.db 路径, username) -> (库文件 stamp, chat_id)；库文件变化后重新查。
+_RESOURCE_CHAT_ID_CACHE: dict[tuple[str, str], tuple[tuple[int, int, int, int], Optional[int]]] = {}
+_RESOURCE_CHAT_ID_CACHE_MAX_ENTRIES = 4096
+
+
+def _open_message_resource(db_path: Path, username: str) -> tuple[Optional[_LazyReadConnection], Optional[int]]:
+    """返回 message_resource.db 的延迟连接和会话 chat_id；库不存在时返回 (None, None)。
+
+    chat_id 按库文件 stamp 缓存，命中时整个请求都可能不需要真正打开这个库。
+    """
+    stamp = _sqlite_file_stamp(db_path)
+    if stamp is None:
+        return None, None
+    resource_conn = _LazyReadConnection(db_path)
+    key = (str(db_path), str(username or ""))
+    hit = _RESOURCE_CHAT_ID_CACHE.get(key)
+    if hit is not None and hit[0] == stamp:
+        return resource_conn, hit[1]
+    chat_id = _resource_lookup_chat_id(resource_conn, username)
+    if len(_RESOURCE_CHAT_ID_CACHE) >= _RESOURCE_CHAT_ID_CACHE_MAX_ENTRIES:
+        _RESOURCE_CHAT_ID_CACHE.clear()
+    _RESOURCE_CHAT_ID_CACHE[key] = (stamp, chat_id)
+    return resource_conn, chat_id
+
+
+@lru_cache(maxsize=None)
+def _resource_md5_sql(by_server_id: bool, has_chat: bool, has_type: bool) -> str:
+    # 只有 8 种组合；固定 SQL 文本，sqlite3 的语句缓存每种只 prepare 一次，调用方也不必每次拼串。
+    where = "message_svr_id = ?" if by_server_id else "message_local_id = ? AND message_create_time = ?"
+    if has_chat:
+        where += " AND chat_id = ?"
+    if has_type:
+        where += " AND message_local_type = ?"
+    return f"SELECT packed_info FROM MessageResourceInfo WHERE {where} ORDER BY message_id DESC LIMIT 1"
+
+
 def _lookup_resource_md5(
     resource_conn: sqlite3.Connection,
     chat_id: Optional[int],
@@ -612,25 +920,19 @@ def _lookup_resource_md5(
     if server_id <= 0 and local_id <= 0:
         return ""
 
-    where_chat = ""
-    params_prefix: list[Any] = []
-    if chat_id is not None and int(chat_id) > 0:
-        where_chat = " AND chat_id = ?"
-        params_prefix.append(int(chat_id))
-
-    where_type = ""
-    if int(message_local_type) > 0:
-        where_type = " AND message_local_type = ?"
-        params_prefix.append(int(message_local_type))
+    has_chat = chat_id is not None and int(chat_id) > 0
+    has_type = int(message_local_type) > 0
+    params_suffix: tuple[int, ...] = ()
+    if has_chat:
+        params_suffix += (int(chat_id),)
+    if has_type:
+        params_suffix += (int(message_local_type),)
 
     try:
         if server_id > 0:
             row = resource_conn.execute(
-                "SELECT packed_info FROM MessageResourceInfo WHERE message_svr_id = ?"
-                + where_chat
-                + where_type
-                + " ORDER BY message_id DESC LIMIT 1",
-                [int(server_id)] + params_prefix,
+                _resource_md5_sql(True, has_chat, has_type),
+                (int(server_id), *params_suffix),
             ).fetchone()
             if row and row[0] is not None:
                 md5 = _extract_md5_from_blob(row[0])
@@ -642,11 +944,8 @@ def _lookup_resource_md5(
     try:
         if local_id > 0 and create_time > 0:
             row = resource_conn.execute(
-                "SELECT packed_info FROM MessageResourceInfo WHERE message_local_id = ? AND message_create_time = ?"
-                + where_chat
-                + where_type
-                + " ORDER BY message_id DESC LIMIT 1",
-                [int(local_id), int(create_time)] + params_prefix,
+                _resource_md5_sql(False, has_chat, has_type),
+                (int(local_id), int(create_time), *params_suffix),
             ).fetchone()
             if row and row[0] is not None:
                 return _extract_md5_from_blob(row[0])
@@ -656,6 +955,137 @@ def _lookup_resource_md5(
     return ""
 
 
+_RESOURCE_MD5_BATCH_SIZE = 500
+_RESOURCE_MD5_LOCAL_TYPES = frozenset({3, 43, 47, 62})
+
+
+def _lookup_resource_md5_batch(
+    resource_conn: sqlite3.Connection,
+    chat_id: Optional[int],
+    keys: Iterable[tuple[int, int, int, int]],
+) -> dict[tuple[int, int, int, int], str]:
+    """批量版 `_lookup_resource_md5`：keys 为 (local_type, server_id, local_id, create_time)。
+
+    每种 local_type、每批 id 只发一次查询；结果与逐条查询一致（server_id 命中且有 md5 优先，
+    否则回退 local_id + create_time），查不到的 key 也会以 "" 写入，方便调用方区分“已查过”。
+    """
+    has_chat = chat_id is not None and int(chat_id) > 0
+    by_type: dict[int, list[tuple[int, int, int]]] = {}
+    out: dict[tuple[int, int, int, int], str] = {}
+    for local_type, server_id, local_id, create_time in keys:
+        key = (int(local_type), int(server_id), int(local_id), int(create_time))
+        if key in out:
+            continue
+        out[key] = ""
+        if key[1] > 0 or key[2] > 0:
+            by_type.setdefault(key[0], []).append(key[1:])
+
+    for local_type, items in by_type.items():
+        where_suffix = ""
+        params_suffix: tuple[int, ...] = ()
+        if has_chat:
+            where_suffix += " AND chat_id = ?"
+            params_suffix += (int(chat_id),)
+        if local_type > 0:
+            where_suffix += " AND message_local_type = ?"
+            params_suffix += (local_type,)
+
+        # 同一 id 可能有多行，按逐条查询的 ORDER BY message_id DESC LIMIT 1 语义保留 message_id 最大的一行。
+        by_server: dict[int, tuple[int, Any]] = {}
+        server_ids = sorted({sid for sid, _, _ in items if sid > 0})
+        sql = (
+            "SELECT message_svr_id, message_id, packed_info FROM MessageResourceInfo "
+            f"WHERE message_svr_id IN (SELECT value FROM json_each(?)){where_suffix}"
+        )
+        for i in range(0, len(server_ids), _RESOURCE_MD5_BATCH_SIZE):
+            chunk = server_ids[i : i + _RESOURCE_MD5_BATCH_SIZE]
+            for sid, mid, packed in resource_conn.execute(sql, (json.dumps(chunk), *params_suffix)):
+                sid = int(sid or 0)
+                mid = int(mid or 0)
+                prev = by_server.get(sid)
+                if prev is None or mid > prev[0]:
+                    by_server[sid] = (mid, packed)
+
+        by_local: dict[tuple[int, int], tuple[int, Any]] = {}
+        local_pairs = {(lid, ct) for _, lid, ct in items if lid > 0 and ct > 0}
+        local_ids = sorted({lid for lid, _ in local_pairs})
+        sql = (
+            "SELECT message_local_id, message_create_time, message_id, packed_info FROM MessageResourceInfo "
+            f"WHERE message_local_id IN (SELECT value FROM json_each(?)){where_suffix}"
+        )
+        for i in range(0, len(local_ids), _RESOURCE_MD5_BATCH_SIZE):
+            chunk = local_ids[i : i + _RESOURCE_MD5_BATCH_SIZE]
+            for lid, ct, mid, packed in resource_conn.execute(sql, (json.dumps(chunk), *params_suffix)):
+                pair = (int(lid or 0), int(ct or 0))
+                if pair not in local_pairs:
+                    continue
+                mid = int(mid or 0)
+                prev = by_local.get(pair)
+                if prev is None or mid > prev[0]:
+                    by_local[pair] = (mid, packed)
+
+        for server_id, local_id, create_time in items:
+            md5 = ""
+            hit = by_server.get(server_id) if server_id > 0 else None
+            if hit is not None and hit[1] is not None:
+                md5 = _extract_md5_from_blob(hit[1])
+            if not md5:
+                hit = by_local.get((local_id, create_time))
+                if hit is not None and hit[1] is not None:
+                    md5 = _extract_md5_from_blob(hit[1])
+            out[(local_type, server_id, local_id, create_time)] = md5
+
+    return out
+
+
+def _prefetch_resource_md5(
+    resource_conn: Optional[sqlite3.Connection],
+    chat_id: Optional[int],
+    rows: Iterable[Any],
+) -> Optional[dict[tuple[int, int, int, int], str]]:
+    """为一页消息行（需有 local_type/server_id/local_id/create_time）预取图片/视频/表情的资源 md5。
+
+    失败时返回 None，调用方回退到逐条 `_lookup_resource_md5`。
+    """
+    if resource_conn is None:
+        return None
+    try:
+        keys = []
+        for r in rows:
+            local_type = int(r["local_type"] or 0)
+            if local_type not in _RESOURCE_MD5_LOCAL_TYPES:
+                continue
+            keys.append((local_type, int(r["server_id"] or 0), int(r["local_id"] or 0), int(r["create_time"] or 0)))
+        if not keys:
+            return {}
+        return _lookup_resource_md5_batch(resource_conn, chat_id, keys)
+    except Exception:
+        return None
+
+
+def _lookup_resource_md5_prefetched(
+    prefetched: Optional[dict[tuple[int, int, int, int], str]],
+    resource_conn: sqlite3.Connection,
+    chat_id: Optional[int],
+    message_local_type: int,
+    server_id: int,
+    local_id: int,
+    create_time: int,
+) -> str:
+    if prefetched is not None:
+        hit = prefetched.get((int(message_local_type), int(server_id), int(local_id), int(create_time)))
+        if hit is not None:
+            return hit
+    return _lookup_resource_md5(
+        resource_conn,
+        chat_id,
+        message_local_type=message_local_type,
+        server_id=server_id,
+        local_id=local_id,
+        create_time=create_time,
+    )
+
+
 def _strip_cdata(s: str) -> str:
     if not s:
         return ""
@@ -674,6 +1104,14 @@ def _normalize_xml_url(url: str) -> str:
         return u.replace("&amp;", "&").strip()
 
 
+_HTTP_URL_PREFIXES = ("http://", "https://")
+
+
+def _is_http_url(value: Any) -> bool:
+    """不区分大小写判断是否为 http(s) 链接；只对开头 8 个字符做 lower，不复制整条 URL。"""
+    return str(value or "").lstrip()[:8].lower().startswith(_HTTP_URL_PREFIXES)
+
+
 def _is_mp_weixin_article_url(url: str) -> bool:
     u = str(url or "").strip()
     if not u:
@@ -741,14 +1179,57 @@ def _classify_link_share(*, app_type: int, url: str, source_username: str, desc:
     return link_type, link_style
 
 
+# 标签/属性名集合很小，按名字缓存编译结果，避免每条消息都走 re 模块的全局缓存查找。
+@lru_cache(maxsize=256)
+def _xml_tag_re(tag: str) -> re.Pattern[str]:
+    return re.compile(rf"<{re.escape(tag)}>(.*?)</{re.escape(tag)}>", re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
+def _xml_attr_re(attr: str) -> re.Pattern[str]:
+    return re.compile(rf"{re.escape(attr)}\s*=\s*['\"]([^'\"]+)['\"]", re.IGNORECASE)
+
+
+# IGNORECASE 会关掉 re 的字面量前缀快速查找，比普通 search 慢数倍。纯 ASCII 文本改为
+# 在小写副本上用大小写敏感的模式匹配，再按同一 span 从原文取值，结果与 IGNORECASE 一致。
+@lru_cache(maxsize=256)
+def _xml_tag_re_lower(tag: str) -> re.Pattern[str]:
+    t = re.escape(tag.lower())
+    return re.compile(rf"<{t}>(.*?)</{t}>", re.DOTALL)
+
+
+@lru_cache(maxsize=256)
+def _xml_attr_re_lower(attr: str) -> re.Pattern[str]:
+    return re.compile(rf"{re.escape(attr.lower())}\s*=\s*['\"]([^'\"]+)['\"]")
+
+
+# 同一条消息会连续查多个标签/属性，只缓存最近一段文本的小写副本。
+_XML_LOWER_LAST: tuple[str, str] = ("", "")
+
+
+def _ascii_xml_lower(xml_text: str) -> Optional[str]:
+    global _XML_LOWER_LAST
+
+    if not xml_text.isascii():
+        return None
+    last = _XML_LOWER_LAST
+    if last[0] is xml_text:
+        return last[1]
+    lowered = xml_text.lower()
+    _XML_LOWER_LAST = (xml_text, lowered)
+    return lowered
+
+
 def _extract_xml_tag_text(xml_text: str, tag: str) -> str:
     if not xml_text or not tag:
         return ""
-    m = re.search(
-        rf"<{re.escape(tag)}>(.*?)</{re.escape(tag)}>",
-        xml_text,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    lowered = _ascii_xml_lower(xml_text)
+    if lowered is not None and tag.isascii():
+        m = _xml_tag_re_lower(tag).search(lowered)
+        if not m:
+            return ""
+        return _strip_cdata(xml_text[m.start(1) : m.end(1)])
+    m = _xml_tag_re(tag).search(xml_text)
     if not m:
         return ""
     return _strip_cdata(m.group(1) or "")
@@ -757,7 +1238,11 @@ def _extract_xml_tag_text(xml_text: str, tag: str) -> str:
 def _extract_xml_attr(xml_text: str, attr: str) -> str:
     if not xml_text or not attr:
         return ""
-    m = re.search(rf"{re.escape(attr)}\s*=\s*['\"]([^'\"]+)['\"]", xml_text, flags=re.IGNORECASE)
+    lowered = _ascii_xml_lower(xml_text)
+    if lowered is not None and attr.isascii():
+        m = _xml_attr_re_lower(attr).search(lowered)
+        return xml_text[m.start(1) : m.end(1)].strip() if m else ""
+    m = _xml_attr_re(attr).search(xml_text)
     return (m.group(1) or "").strip() if m else ""
 
 
@@ -977,10 +1462,18 @@ def _parse_system_message_content(
     return content_text or "[系统消息]"
 
 
+_REFERMSG_BLOCK_RE = re.compile(r"(<refermsg[^>]*>.*?</refermsg>)", re.IGNORECASE | re.DOTALL)
+_RECORDITEM_BLOCK_RE = re.compile(r"(<recorditem[^>]*>.*?</recorditem>)", re.IGNORECASE | re.DOTALL)
+_REFERMSG_CDATA_CONTENT_RE = re.compile(
+    r"<content\b[^>]*>\s*<!\[CDATA\[(.*?)\]\]>\s*</content>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
 def _extract_refermsg_block(xml_text: str) -> str:
     if not xml_text:
         return ""
-    m = re.search(r"(<refermsg[^>]*>.*?</refermsg>)", xml_text, flags=re.IGNORECASE | re.DOTALL)
+    m = _REFERMSG_BLOCK_RE.search(xml_text)
     return (m.group(1) or "").strip() if m else ""
 
 
@@ -988,11 +1481,7 @@ def _extract_refermsg_content(refer_block: str) -> str:
     if not refer_block:
         return ""
 
-    cdata_match = re.search(
-        r"<content\b[^>]*>\s*<!\[CDATA\[(.*?)\]\]>\s*</content>",
-        refer_block,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    cdata_match = _REFERMSG_CDATA_CONTENT_RE.search(refer_block)
     if cdata_match:
         return str(cdata_match.group(1) or "").strip()
 
@@ -1085,6 +1574,9 @@ def _infer_transfer_status_text(
     return "转账"
 
 
+_WHITESPACE_CHAR_RE = re.compile(r"\s")
+
+
 def _split_group_sender_prefix(
     text: str,
     known_sender_username: str = "",
@@ -1096,27 +1588,22 @@ def _split_group_sender_prefix(
     if sep <= 0:
         return "", text
     prefix = text[:sep].strip()
-    body = text[sep + 2 :].lstrip("\n")
     if not prefix or len(prefix) > 128:
         return "", text
-    if re.search(r"\s", prefix):
+    if _WHITESPACE_CHAR_RE.search(prefix):
         return "", text
 
+    # 正文可能是几十 KB 的 XML：先在原串上判断，只有确定要拆分时才切出 body。
     strong_hint = prefix.startswith("wxid_") or prefix.endswith("@chatroom") or "@" in prefix
-    probe = body.lstrip()
-    body_is_xml = probe.startswith("<") or probe.startswith('"<')
+    i = _LEADING_WS_RE.match(text, sep + 2).end()
+    body_is_xml = text.startswith("<", i) or text.startswith('"<', i)
 
     known_values = {str(known_sender_username or "").strip(), str(known_sender_alias or "").strip()}
     known_values.discard("")
-    if known_values:
-        if prefix in known_values:
-            return prefix, body
-        if strong_hint or body_is_xml:
-            return prefix, body
+    if known_values and prefix not in known_values and not (strong_hint or body_is_xml):
         return "", text
-
-    if strong_hint or body_is_xml:
-        return prefix, body
+    if known_values or strong_hint or body_is_xml:
+        return prefix, text[sep + 2 :].lstrip("\n")
     return "", text
 
 
@@ -1127,12 +1614,7 @@ def _extract_sender_from_group_xml(xml_text: str) -> str:
     probe_text = xml_text
     try:
         # Avoid picking nested quoted-message sender from <refermsg>.
-        probe_text = re.sub(
-            r"(<refermsg[^>]*>.*?</refermsg>)",
-            "",
-            xml_text,
-            flags=re.IGNORECASE | re.DOTALL,
-        )
+        probe_text = _REFERMSG_BLOCK_RE.sub("", xml_text)
     except Exception:
         probe_text = xml_text
 
@@ -1145,11 +1627,27 @@ def _extract_sender_from_group_xml(xml_text: str) -> str:
     return ""
 
 
+def _iter_template_placeholders(template: str) -> Iterator[str]:
+    """逐个产出拍一拍模板中 ${...} 占位符里的名字（与 r"\$\{([^}]+)\}" 等价，但只用 str.find）。"""
+    find = template.find
+    pos = 0
+    while True:
+        start = find("${", pos)
+        if start < 0:
+            return
+        end = find("}", start + 2)
+        if end < 0:
+            return
+        if end > start + 2:
+            yield template[start + 2 : end]
+        pos = end + 1
+
+
 def _parse_pat_message(text: str, contact_rows: dict[str, sqlite3.Row]) -> str:
     template = _extract_xml_tag_text(text, "template")
     if not template:
         return "[拍一拍]"
-    wxids = list({m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", template) if m.group(1)})
+    wxids = list(set(_iter_template_placeholders(template)))
     rendered = template
     for wxid in wxids:
         row = contact_rows.get(wxid)
@@ -1168,13 +1666,24 @@ def _parse_quote_message(text: str) -> str:
     return "[引用消息]"
 
 
+_APPMSG_BODY_RE = re.compile(r"<appmsg\b[^>]*>(.*?)</appmsg>", re.IGNORECASE | re.DOTALL)
+# appmsg 内部可能自带 <type> 的嵌套块，提取直系 <type> 前依次剔除。
+_APPMSG_NESTED_BLOCK_RES = tuple(
+    re.compile(rf"(<{tag}\b[^>]*>.*?</{tag}>)", re.IGNORECASE | re.DOTALL)
+    for tag in ("refermsg", "patmsg", "recorditem", "weappinfo", "wxaappinfo")
+)
+
+
+_PATMSG_TYPE_ATTR_RE = re.compile(r"<(?:sysmsg|appmsg)\b[^>]*\btype=['\"]patmsg['\"]")
+
+
 def _parse_app_message(text: str) -> dict[str, Any]:
     def _extract_appmsg_type(xml_text: str) -> int:
         """提取 <appmsg> 直系子节点的 <type>，避免被 refermsg/recorditem/weappinfo 等嵌套块里的 <type> 干扰。"""
 
         probe = str(xml_text or "")
         try:
-            m = re.search(r"<appmsg\b[^>]*>(.*?)</appmsg>", probe, flags=re.IGNORECASE | re.DOTALL)
+            m = _APPMSG_BODY_RE.search(probe)
         except Exception:
             m = None
 
@@ -1182,11 +1691,8 @@ def _parse_app_message(text: str) -> dict[str, Any]:
             inner = str(m.group(1) or "")
             # 一些嵌套块内部也会出现 <type>，先剔除再提取。
             try:
-                inner = re.sub(r"(<refermsg\b[^>]*>.*?</refermsg>)", "", inner, flags=re.IGNORECASE | re.DOTALL)
-                inner = re.sub(r"(<patmsg\b[^>]*>.*?</patmsg>)", "", inner, flags=re.IGNORECASE | re.DOTALL)
-                inner = re.sub(r"(<recorditem\b[^>]*>.*?</recorditem>)", "", inner, flags=re.IGNORECASE | re.DOTALL)
-                inner = re.sub(r"(<weappinfo\b[^>]*>.*?</weappinfo>)", "", inner, flags=re.IGNORECASE | re.DOTALL)
-                inner = re.sub(r"(<wxaappinfo\b[^>]*>.*?</wxaappinfo>)", "", inner, flags=re.IGNORECASE | re.DOTALL)
+                for nested_re in _APPMSG_NESTED_BLOCK_RES:
+                    inner = nested_re.sub("", inner)
             except Exception:
                 pass
 
@@ -1211,15 +1717,9 @@ def _parse_app_message(text: str) -> dict[str, Any]:
     #   <sourceusername>gh_xxx</sourceusername>
     #   <sourcedisplayname>公众号名</sourcedisplayname>
     # We'll surface that as `from` so the frontend can render the publisher line like WeChat.
-    source_display_name = (
-        _extract_xml_tag_text(text, "sourcedisplayname")
-        or _extract_xml_tag_text(text, "sourceDisplayName")
-        or _extract_xml_tag_text(text, "appname")
-    )
-    source_username = (
-        _extract_xml_tag_text(text, "sourceusername")
-        or _extract_xml_tag_text(text, "sourceUsername")
-    )
+    # 标签/属性匹配本身大小写不敏感，不再按大小写变体重复整段扫描。
+    source_display_name = _extract_xml_tag_text(text, "sourcedisplayname") or _extract_xml_tag_text(text, "appname")
+    source_username = _extract_xml_tag_text(text, "sourceusername")
 
     lower = text.lower()
 
@@ -1300,9 +1800,7 @@ def _parse_app_message(text: str) -> dict[str, Any]:
             or _extract_xml_tag_or_attr(text, "cdnthumburl")
             or _extract_xml_tag_or_attr(text, "coverurl")
             or _extract_xml_tag_or_attr(text, "cover")
-            or (_extract_xml_tag_or_attr(finder_feed, "thumbUrl") if finder_feed else "")
             or (_extract_xml_tag_or_attr(finder_feed, "thumburl") if finder_feed else "")
-            or (_extract_xml_tag_or_attr(finder_feed, "coverUrl") if finder_feed else "")
             or (_extract_xml_tag_or_attr(finder_feed, "coverurl") if finder_feed else "")
         )
 
@@ -1401,29 +1899,24 @@ def _parse_app_message(text: str) -> dict[str, Any]:
         # 合并转发聊天记录/其它 appmsg 里可能在 recorditem CDATA 内包含 refermsg，
         # 需要先剔除 recorditem 再判断是否为真正的引用消息。
         try:
-            refermsg_probe = re.sub(
-                r"(<recorditem[^>]*>.*?</recorditem>)",
-                "",
-                text,
-                flags=re.IGNORECASE | re.DOTALL,
-            ).lower()
+            refermsg_probe = _RECORDITEM_BLOCK_RE.sub("", text).lower()
         except Exception:
             refermsg_probe = lower
 
     if app_type == 57 or "<refermsg" in refermsg_probe:
-        refer_block = _extract_refermsg_block(text)
-
-        try:
-            text_wo_refer = re.sub(
-                r"(<refermsg[^>]*>.*?</refermsg>)",
-                "",
-                text,
-                flags=re.IGNORECASE | re.DOTALL,
-            )
-        except Exception:
+        # 一次 search 同时拿到引用块和它的位置；通常只有一个 refermsg，直接按位置拼接剔除。
+        refer_match = _REFERMSG_BLOCK_RE.search(text)
+        if refer_match is None:
+            refer_block = ""
             text_wo_refer = text
+        else:
+            refer_block = (refer_match.group(1) or "").strip()
+            if _REFERMSG_BLOCK_RE.search(text, refer_match.end()) is None:
+                text_wo_refer = text[: refer_match.start()] + text[refer_match.end() :]
+            else:
+                text_wo_refer = _REFERMSG_BLOCK_RE.sub("", text)
 
-        reply_text = _extract_xml_tag_text(text_wo_refer, "title") or _extract_xml_tag_text(text, "title")
+        reply_text = _extract_xml_tag_text(text_wo_refer, "title") or title
         refer_displayname = _extract_xml_tag_or_attr(refer_block, "displayname")
         refer_fromusr = (
             _extract_xml_tag_or_attr(refer_block, "fromusr")
@@ -1507,12 +2000,12 @@ def _parse_app_message(text: str) -> dict[str, Any]:
 
     # Some versions may mark pat messages via sysmsg/appmsg tag attribute: <sysmsg type="patmsg">...</sysmsg>.
     # Be strict here: lots of non-pat appmsg payloads still carry a nested <patMsg>...</patMsg> metadata block.
-    patmsg_attr = bool(re.search(r"<(sysmsg|appmsg)\b[^>]*\btype=['\"]patmsg['\"]", lower))
+    patmsg_attr = "patmsg" in lower and _PATMSG_TYPE_ATTR_RE.search(lower) is not None
     if app_type == 62 or patmsg_attr:
         return {"renderType": "system", "content": "[拍一拍]"}
 
     if app_type == 2000 or (
-        "<wcpayinfo" in text and ("transfer" in text.lower() or "paysubtype" in text.lower())
+        "<wcpayinfo" in text and ("transfer" in lower or "paysubtype" in lower)
     ):
         feedesc = _extract_xml_tag_or_attr(text, "feedesc")
         pay_memo = _extract_xml_tag_or_attr(text, "pay_memo")
@@ -1546,7 +2039,7 @@ def _parse_app_message(text: str) -> dict[str, Any]:
         }
 
     if app_type in (2001, 2003) or (
-        "<wcpayinfo" in text and ("redenvelope" in text.lower() or "sendertitle" in text.lower())
+        "<wcpayinfo" in text and ("redenvelope" in lower or "sendertitle" in lower)
     ):
         sendertitle = _extract_xml_tag_text(text, "sendertitle")
         receivertitle = _extract_xml_tag_text(text, "receivertitle")
@@ -1566,6 +2059,9 @@ def _parse_app_message(text: str) -> dict[str, Any]:
     return {"renderType": "text", "content": "[应用消息]"}
 
 
+_MESSAGE_DB_NAME_RE = re.compile(r"^(?:biz_)?message(?:_\d+)?\.db$")
+
+
 def _iter_message_db_paths(account_dir: Path) -> list[Path]:
     if not account_dir.exists():
         return []
@@ -1581,10 +2077,7 @@ def _iter_message_db_paths(account_dir: Path) -> list[Path]:
         if ln == "message_fts.db":
             continue
 
-        if re.match(r"^message(_\d+)?\.db$", ln):
-            candidates.append(p)
-            continue
-        if re.match(r"^biz_message(_\d+)?\.db$", ln):
+        if _MESSAGE_DB_NAME_RE.match(ln):
             candidates.append(p)
             continue
         if "message" in ln and ln.endswith(".db"):
@@ -1597,7 +2090,7 @@ def _iter_message_db_paths(account_dir: Path) -> list[Path]:
 def _resolve_msg_table_name_by_map(lower_to_actual: dict[str, str], username: str) -> Optional[str]:
     if not username:
         return None
-    md5_hex = hashlib.md5(username.encode("utf-8")).hexdigest()
+    md5_hex = _username_md5(username)
     expected = f"msg_{md5_hex}".lower()
     expected_chat = f"chat_{md5_hex}".lower()
 
@@ -2118,6 +2611,13 @@ def _pick_avatar_url(contact_row: Optional[Any]) -> Optional[str]:
     return None
 
 
+# 导出/分页会对同一批发送者反复查 contact.db；按库文件 (size, mtime_ns) 记住已查过的用户名
+# （查不到的记为 None），只有未命中的才去开连接查询，库被重新解密/同步后整体失效。
+_CONTACT_ROWS_CACHE: dict[str, tuple[tuple[int, int, int, int], dict[str, Optional[dict[str, Any]]]]] = {}
+_CONTACT_ROWS_CACHE_LOCK = threading.Lock()
+_CONTACT_ROWS_CACHE_MAX_USERS = 20000
+
+
 def _load_contact_rows(contact_db_path: Path, usernames: list[str]) -> dict[str, dict[str, Any]]:
     uniq = list(dict.fromkeys([u for u in usernames if u]))
     if not uniq:
@@ -2125,14 +2625,37 @@ def _load_contact_rows(contact_db_path: Path, usernames: list[str]) -> dict[str,
 
     result: dict[str, dict[str, Any]] = {}
 
-    if not contact_db_path.exists():
+    stamp = _sqlite_file_stamp(contact_db_path)
+    if stamp is None:
         return result
 
-    conn = sqlite3.connect(str(contact_db_path))
-    conn.row_factory = sqlite3.Row
-    conn.text_factory = bytes
-    try:
+    cache_key = str(contact_db_path)
+    with _CONTACT_ROWS_CACHE_LOCK:
+        entry = _CONTACT_ROWS_CACHE.get(cache_key)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, {})
+            _CONTACT_ROWS_CACHE[cache_key] = entry
+        cached = entry[1]
+        missing: list[str] = []
+        for u in uniq:
+            if u in cached:
+                item = cached[u]
+                if item is not None:
+                    # 返回副本，调用方改动不会污染缓存。
+                    result[u] = dict(item)
+            else:
+                missing.append(u)
+    if not missing:
+        return result
+
+    fetched: dict[str, dict[str, Any]] = {}
+    ok = True
+    with _pooled_read_connection(contact_db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        conn.text_factory = bytes
+
         def query_table(table: str, targets: list[str]) -> None:
+            nonlocal ok
             if not targets:
                 return
             try:
@@ -2142,30 +2665,42 @@ def _load_contact_rows(contact_db_path: Path, usernames: list[str]) -> dict[str,
                 ).fetchone()
             except Exception:
                 exists = None
+                ok = False
             if not exists:
                 return
-            placeholders = ",".join(["?"] * len(targets))
-            sql = f"""
-                SELECT username, remark, nick_name, alias, big_head_url, small_head_url
-                FROM {table}
-                WHERE username IN ({placeholders})
-            """
             try:
-                rows = conn.execute(sql, targets).fetchall()
+                rows = _select_where_username_in(
+                    conn,
+                    f"SELECT username, remark, nick_name, alias, big_head_url, small_head_url FROM {table}",
+                    targets,
+                )
             except Exception:
+                ok = False
                 return
             for r in rows:
                 item = _contact_row_to_dict(r)
                 username = str(item.get("username") or "").strip()
                 if username:
-                    result[username] = item
+                    fetched[username] = item
 
-        query_table("contact", uniq)
-        missing = [u for u in uniq if u not in result]
-        query_table("stranger", missing)
-        return result
-    finally:
-        conn.close()
+        query_table("contact", missing)
+        query_table("stranger", [u for u in missing if u not in fetched])
+
+    for username, item in fetched.items():
+        result[username] = dict(item)
+
+    # 查询出错时不缓存“查不到”，下次仍会重试。
+    with _CONTACT_ROWS_CACHE_LOCK:
+        entry = _CONTACT_ROWS_CACHE.get(cache_key)
+        if entry is not None and entry[0] == stamp:
+            cached = entry[1]
+            if len(cached) + len(missing) > _CONTACT_ROWS_CACHE_MAX_USERS:
+                cached.clear()
+            cached.update(fetched)
+            if ok:
+                for u in missing:
+                    cached.setdefault(u, None)
+    return result
 
 
 def _load_group_nickname_map_from_contact_db(
@@ -2641,8 +3176,8 @@ def _row_to_search_hit(
         if not content_text:
             content_text = _infer_message_brief_by_local_type(local_type)
         else:
-            if content_text.startswith("<") or content_text.startswith('"<'):
-                if "<appmsg" in content_text.lower():
+            if content_text.startswith(("<", '"<')):
+                if _has_appmsg_tag(content_text):
                     parsed = _parse_app_message(content_text)
                     rt = str(parsed.get("renderType") or "")
                     if rt and rt != "text":
@@ -45,7 +45,7 @@ PAGE_EXECUTE_WRITECOPY = 0x80
 PAGE_GUARD = 0x100
 
 MAX_MEMORY_REGION_SIZE = 50 * 1024 * 1024
-MEMORY_CHUNK_SIZE = 4 * 1024 * 1024
+MEMORY_CHUNK_SIZE = 16 * 1024 * 1024
 # 68 bytes retain both boundaries around a 32-character UTF-16LE run.
 MEMORY_CHUNK_OVERLAP = 68
 MAX_USER_ADDRESS = 0x7FFF_FFFF_FFFF
@@ -58,8 +58,10 @@ _WRITABLE_PROTECTIONS = frozenset(
         PAGE_EXECUTE_WRITECOPY,
     )
 )
-_ASCII_RUN_RE = re.compile(rb"[A-Za-z0-9]+")
-_UTF16_RUN_RE = re.compile(rb"(?:[A-Za-z0-9]\x00)+")
+# Match only maximal runs of exactly 32 characters. The lookarounds keep the regex
+# engine (C) from handing every short alphanumeric run back to the Python loop.
+_ASCII_RUN_RE = re.compile(rb"(?<![A-Za-z0-9])[A-Za-z0-9]{32}(?![A-Za-z0-9])")
+_UTF16_RUN_RE = re.compile(rb"(?<![A-Za-z0-9]\x00)(?:[A-Za-z0-9]\x00){32}(?![A-Za-z0-9]\x00)")
 
 ProgressCallback = Callable[[str], None]
 
@@ -153,6 +155,10 @@ class _Win32MemoryApi:
         self._close_handle.argtypes = (ctypes.c_void_p,)
         self._close_handle.restype = ctypes.c_int
 
+        # One read buffer per scanner, grown on demand, instead of a fresh zeroed
+        # allocation for every chunk of every region.
+        self._read_buffer: ctypes.Array[ctypes.c_char] | None = None
+
     def open_process(self, pid: int) -> object | None:
         return self._open_process(
             PROCESS_QUERY_INFORMATION | PROCESS_VM_READ,
@@ -180,7 +186,9 @@ class _Win32MemoryApi:
     def read_memory(self, handle: object, address: int, size: int) -> bytes:
         if size <= 0:
             return b""
-        buffer = ctypes.create_string_buffer(size)
+        buffer = self._read_buffer
+        if buffer is None or len(buffer) < size:
+            buffer = self._read_buffer = (ctypes.c_char * size)()
         bytes_read = ctypes.c_size_t(0)
         success = self._read_process_memory(
             handle,
@@ -191,7 +199,8 @@ class _Win32MemoryApi:
         )
         if not success or bytes_read.value <= 0:
             return b""
-        return buffer.raw[: min(bytes_read.value, size)]
+        # string_at copies only the bytes read, not the whole (possibly larger) buffer.
+        return ctypes.string_at(buffer, min(bytes_read.value, size))
 
     def close_handle(self, handle: object) -> None:
         self._close_handle(handle)
@@ -314,8 +323,6 @@ def iter_memory_aes_candidates(
 
     for match in _ASCII_RUN_RE.finditer(data):
         start, end = match.span()
-        if end - start != 32:
-            continue
         if start == 0 and not allow_start_boundary:
             continue
         if end == len(data) and not allow_end_boundary:
@@ -327,8 +334,6 @@ def iter_memory_aes_candidates(
 
     for match in _UTF16_RUN_RE.finditer(data):
         start, end = match.span()
-        if end - start != 64:
-            continue
         if start == 0 and not allow_start_boundary:
             continue
         if end == len(data) and not allow_end_boundary:
@@ -357,6 +362,9 @@ def find_verified_aes_key_in_chunk(
         allow_start_boundary=allow_start_boundary,
         allow_end_boundary=allow_end_boundary,
     ):
+        # 图片 AES key 取自 md5 hexdigest，只会是小写；含大写的候选无需解密。
+        if aes_key.lower() != aes_key:
+            continue
         if trusted_xor_for_verified_aes_key(aes_key, template_scan) is not None:
             return ProcessMemoryKeyMatch(
                 aes_key=aes_key,
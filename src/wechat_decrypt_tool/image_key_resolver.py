@@ -12,7 +12,9 @@ import heapq
 import os
 import re
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Sequence
 
@@ -28,6 +30,7 @@ _MONTH_DIR_RE = re.compile(r"^\d{4}-\d{2}$")
 _SUFFIXED_WXID_RE = re.compile(r"^(wxid_[^_]+)(?:_.+)$", re.IGNORECASE)
 _MAX_CODE = 0xFFFFFFFF
 _MAX_PREFERRED_DIRS = 2_000
+_TEMPLATE_READ_WORKERS = 8
 _SKIPPED_FALLBACK_DIR_PARTS = ("thumb", "emoticon")
 @dataclass(frozen=True, slots=True)
 class DerivedImageKeys:
@@ -150,9 +153,15 @@ def _decrypt_aes_block(aes_key: str | bytes, ciphertext: bytes) -> bytes | None:
         return None
     if len(key_bytes) < AES_BLOCK_SIZE or len(ciphertext) != AES_BLOCK_SIZE:
         return None
+    return _decrypt_aes_block_cached(key_bytes[:AES_BLOCK_SIZE], bytes(ciphertext))
 
+
+# 内存扫描会反复命中相同的候选 key（同一字符串在多个 arena 中各有一份），
+# 构造 AES cipher 的开销远大于单块解密，按 (key, ciphertext) 去重。
+@lru_cache(maxsize=65536)
+def _decrypt_aes_block_cached(key16: bytes, ciphertext: bytes) -> bytes | None:
     try:
-        decryptor = Cipher(algorithms.AES(key_bytes[:AES_BLOCK_SIZE]), modes.ECB()).decryptor()
+        decryptor = Cipher(algorithms.AES(key16), modes.ECB()).decryptor()
         return decryptor.update(ciphertext) + decryptor.finalize()
     except (TypeError, ValueError):
         return None
@@ -319,33 +328,60 @@ def _collect_fallback_paths(
     return _recent_paths(heap)
 
 
+def _read_v2_template_file(path: Path) -> V2Template | None:
+    """Read header block + 2-byte trailer of one candidate; None if it is not V2."""
+    header_size = V2_CIPHERTEXT_START + AES_BLOCK_SIZE
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return None
+    try:
+        st = os.fstat(fd)
+        if st.st_size < header_size:
+            return None
+        if hasattr(os, "pread"):
+            header = os.pread(fd, header_size, 0)
+            tail = os.pread(fd, 2, st.st_size - 2)
+        else:
+            header = os.read(fd, header_size)
+            os.lseek(fd, -2, os.SEEK_END)
+            tail = os.read(fd, 2)
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.close(fd)
+
+    if len(header) < header_size or not header.startswith(V2_MAGIC):
+        return None
+    return V2Template(
+        path=path,
+        ciphertext=header[V2_CIPHERTEXT_START:header_size],
+        mtime_ns=st.st_mtime_ns,
+        tail_xor_key=infer_xor_key_from_v2_tails((tail,)),
+        tail_bytes=tail,
+    )
+
+
 def _read_v2_templates(paths: Sequence[Path], limit: int) -> tuple[tuple[V2Template, ...], int]:
+    """Read candidates in order until `limit` templates are found.
+
+    Each candidate costs two independent seeks, so a batch of still-needed files is
+    read concurrently; results are consumed in input order, so the outcome (and
+    `files_scanned`) is the same as a serial scan.
+    """
     templates: list[V2Template] = []
     files_scanned = 0
-    for path in paths:
-        if len(templates) >= limit:
-            break
-        files_scanned += 1
-        try:
-            with path.open("rb") as stream:
-                header = stream.read(V2_CIPHERTEXT_START + AES_BLOCK_SIZE)
-                if len(header) < V2_CIPHERTEXT_START + AES_BLOCK_SIZE or not header.startswith(V2_MAGIC):
-                    continue
-                stream.seek(-2, os.SEEK_END)
-                tail = stream.read(2)
-        except (OSError, ValueError):
-            continue
-
-        tail_xor_key = infer_xor_key_from_v2_tails((tail,))
-        templates.append(
-            V2Template(
-                path=path,
-                ciphertext=header[V2_CIPHERTEXT_START : V2_CIPHERTEXT_START + AES_BLOCK_SIZE],
-                mtime_ns=_safe_mtime_ns(path),
-                tail_xor_key=tail_xor_key,
-                tail_bytes=tail,
-            )
-        )
+    index = 0
+    with ThreadPoolExecutor(max_workers=_TEMPLATE_READ_WORKERS) as pool:
+        while index < len(paths) and len(templates) < limit:
+            batch = paths[index : index + max(limit - len(templates), _TEMPLATE_READ_WORKERS)]
+            index += len(batch)
+            for template in pool.map(_read_v2_template_file, batch):
+                if len(templates) >= limit:
+                    break
+                files_scanned += 1
+                if template is not None:
+                    templates.append(template)
     return tuple(templates), files_scanned
 
 
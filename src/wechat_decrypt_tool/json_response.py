@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - depends on optional runtime package availability
+    orjson = None  # type: ignore[assignment]
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` rendered with orjson (C encoder) when it is installed.
+
+    Output matches Starlette's compact UTF-8 encoding. Payloads orjson rejects
+    (e.g. ints wider than 64 bits) fall back to the stdlib encoder, so behaviour
+    never regresses compared to the default response class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass
+        return super().render(content)
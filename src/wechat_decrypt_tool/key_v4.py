@@ -276,18 +276,40 @@ def get_key_inner(pid, process_infos):
     return keys
 
 
+# 大内存区域切成固定大小的块再分发，避免某个 worker 独自扫描 1GiB 堆而其它 worker 早早空闲。
+SCAN_CHUNK_SIZE = 32 * 1024 * 1024
+# 需覆盖一个完整的 32 字节 GetKeyAddrStub 匹配跨块的情况。
+SCAN_CHUNK_OVERLAP = 64
+
+
+def plan_scan_work(process_infos, group_count, chunk_size=SCAN_CHUNK_SIZE, overlap=SCAN_CHUNK_OVERLAP):
+    """把内存区域切块并按字节数均衡分组（最长处理时间优先的贪心分配）。"""
+    items = []
+    for base_address, region_size in process_infos:
+        base = int(base_address or 0)
+        size = int(region_size or 0)
+        for offset in range(0, size, chunk_size):
+            items.append((base + offset, min(chunk_size + overlap, size - offset)))
+
+    group_count = max(1, min(int(group_count), len(items)))
+    groups = [[] for _ in range(group_count)]
+    loads = [0] * group_count
+    for item in sorted(items, key=lambda it: it[1], reverse=True):
+        idx = loads.index(min(loads))
+        groups[idx].append(item)
+        loads[idx] += item[1]
+    return [g for g in groups if g]
+
+
 def get_key(pid, process_handle, buf, internal_db_key=None):
     """获取密钥：扫描进程内存，寻找有效的密钥"""
     process_infos = get_memory_regions(process_handle)
 
-    def split_list(lst, n):
-        k, m = divmod(len(lst), n)
-        return (lst[i * k + min(i, m):(i + 1) * k + min(i + 1, m)] for i in range(n))
+    worker_count = max(1, min(multiprocessing.cpu_count() // 2, 16))
+    work_groups = plan_scan_work(process_infos, worker_count * 4)
 
-    keys = []
-    pool = multiprocessing.Pool(processes=multiprocessing.cpu_count() // 2)
-    results = pool.starmap(get_key_inner, ((pid, process_info_) for process_info_ in
-                                           split_list(process_infos, min(len(process_infos), 40))))
+    pool = multiprocessing.Pool(processes=worker_count)
+    results = pool.starmap(get_key_inner, ((pid, group) for group in work_groups))
     pool.close()
     pool.join()
     
@@ -108,7 +108,6 @@ class WeChatLogger:
         from .app_paths import get_output_dir
 
         log_dir = get_output_dir() / "logs" / str(now.year) / f"{now.month:02d}" / f"{now.day:02d}"
-        log_dir.mkdir(parents=True, exist_ok=True)
         
         # 设置日志文件名
         date_str = now.strftime("%d")
@@ -144,6 +143,9 @@ class WeChatLogger:
                 self.log_file = desired_log_file
                 return self.log_file
 
+        # Only create the directory once we know handlers must be (re)built; repeated
+        # calls with an unchanged config return above without touching the filesystem.
+        log_dir.mkdir(parents=True, exist_ok=True)
         self.log_file = desired_log_file
         
         # 清除现有的处理器
@@ -266,10 +268,11 @@ def setup_logging(log_level: str = "INFO") -> Path:
 
 def get_logger(name: str) -> logging.Logger:
     """获取日志器的便捷函数"""
-    logger_manager = WeChatLogger()
+    # `logging.getLogger` already caches loggers by name; only touch the manager
+    # singleton when logging still needs to be initialized.
     if not WeChatLogger._initialized:
-        logger_manager.setup_logging()
-    return logger_manager.get_logger(name)
+        WeChatLogger().setup_logging()
+    return logging.getLogger(name)
 
 
 def get_log_file_path() -> Path:
@@ -1,5 +1,7 @@
+import concurrent.futures
 import ctypes
 import datetime
+import fnmatch
 import glob
 import hashlib
 import ipaddress
@@ -9,7 +11,9 @@ import os
 import re
 import sqlite3
 import struct
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
@@ -18,9 +22,15 @@ from urllib.parse import urlparse
 
 from fastapi import HTTPException
 
-from .app_paths import get_output_databases_dir
+from .app_paths import get_account_keys_path, get_output_databases_dir
 from .chat_accounts import list_chat_account_names, resolve_chat_account_context
-from .chat_helpers import _decode_message_content
+from .chat_helpers import (
+    _connect_sqlite_for_read,
+    _decode_message_content,
+    _pooled_read_connection,
+    _sqlite_table_names,
+    _username_md5,
+)
 from .logging_config import get_logger
 from .sqlite_diagnostics import is_usable_sqlite_db
 
@@ -80,18 +90,25 @@ def _detect_image_media_type(data: bytes) -> str:
     if not data:
         return "application/octet-stream"
 
-    if data.startswith(b"\x89PNG\r\n\x1a\n"):
-        return "image/png"
-    if data.startswith(b"\xff\xd8\xff") and len(data) >= 4:
-        marker = data[3]
-        # Most JPEG marker types are in 0xC0..0xFE (APP, SOF, DQT, DHT, SOS, COM, etc.).
-        # This avoids false positives where random bytes start with 0xFFD8FF.
-        if marker not in (0x00, 0xFF) and marker >= 0xC0:
-            return "image/jpeg"
-    if data.startswith(b"GIF87a") or data.startswith(b"GIF89a"):
-        return "image/gif"
-    if data.startswith(b"RIFF") and len(data) >= 12 and data[8:12] == b"WEBP":
-        return "image/webp"
+    # Dispatch on the first byte so only the one plausible signature is compared
+    # (this runs for every media read, mostly on encrypted/non-image bytes).
+    lead = data[0]
+    if lead == 0x89:
+        if data.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "image/png"
+    elif lead == 0xFF:
+        if data.startswith(b"\xff\xd8\xff") and len(data) >= 4:
+            marker = data[3]
+            # Most JPEG marker types are in 0xC0..0xFE (APP, SOF, DQT, DHT, SOS, COM, etc.).
+            # This avoids false positives where random bytes start with 0xFFD8FF.
+            if marker not in (0x00, 0xFF) and marker >= 0xC0:
+                return "image/jpeg"
+    elif lead == 0x47:
+        if data.startswith((b"GIF87a", b"GIF89a")):
+            return "image/gif"
+    elif lead == 0x52:
+        if data.startswith(b"RIFF") and len(data) >= 12 and data[8:12] == b"WEBP":
+            return "image/webp"
     return "application/octet-stream"
 
 
@@ -1358,27 +1375,56 @@ def _resolve_account_db_storage_dir(account_dir: Path) -> Optional[Path]:
     return None
 
 
+# 账号目录 -> (wxid_dir, db_storage_dir)；解析要读 _source.json/密钥库并探测多级目录，
+# 媒体接口每个请求都会用到，按这两个文件的 stat 失效，另设 TTL 兜底目录增删。
+_ACCOUNT_MEDIA_DIRS_CACHE: dict[str, tuple[tuple[Any, Any], float, Optional[Path], Optional[Path]]] = {}
+_ACCOUNT_MEDIA_DIRS_CACHE_LOCK = threading.Lock()
+_ACCOUNT_MEDIA_DIRS_TTL_SECONDS = 30.0
+
+
+def _path_stat_token(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _resolve_account_media_dirs(account_dir: Path) -> tuple[Optional[Path], Optional[Path]]:
+    """Cached `(_resolve_account_wxid_dir, _resolve_account_db_storage_dir)` for an account."""
+    key = str(account_dir)
+    token = (
+        _path_stat_token(Path(account_dir) / "_source.json"),
+        _path_stat_token(get_account_keys_path()),
+    )
+    now = time.monotonic()
+    with _ACCOUNT_MEDIA_DIRS_CACHE_LOCK:
+        hit = _ACCOUNT_MEDIA_DIRS_CACHE.get(key)
+    if hit is not None and hit[0] == token and hit[1] > now:
+        return hit[2], hit[3]
+
+    wxid_dir = _resolve_account_wxid_dir(account_dir)
+    db_storage_dir = _resolve_account_db_storage_dir(account_dir)
+    with _ACCOUNT_MEDIA_DIRS_CACHE_LOCK:
+        if len(_ACCOUNT_MEDIA_DIRS_CACHE) >= 64:
+            _ACCOUNT_MEDIA_DIRS_CACHE.clear()
+        _ACCOUNT_MEDIA_DIRS_CACHE[key] = (token, now + _ACCOUNT_MEDIA_DIRS_TTL_SECONDS, wxid_dir, db_storage_dir)
+    return wxid_dir, db_storage_dir
+
+
 def _quote_ident(ident: str) -> str:
     return '"' + ident.replace('"', '""') + '"'
 
 
 def _resolve_hardlink_table_name(conn: sqlite3.Connection, prefix: str) -> Optional[str]:
-    rows = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ? ORDER BY name DESC",
-        (f"{prefix}%",),
-    ).fetchall()
-    if not rows:
-        return None
-    return str(rows[0][0]) if rows[0] and rows[0][0] else None
+    # Same pick as `name LIKE '<prefix>%' ORDER BY name DESC`, off the shared table-name cache.
+    prefix_lower = str(prefix or "").lower()
+    matches = [name for name in _sqlite_table_names(conn) if name.lower().startswith(prefix_lower)]
+    return max(matches) if matches else None
 
 
 def _resolve_hardlink_dir2id_table_name(conn: sqlite3.Connection) -> Optional[str]:
-    rows = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'dir2id%' ORDER BY name DESC"
-    ).fetchall()
-    if not rows:
-        return None
-    return str(rows[0][0]) if rows[0] and rows[0][0] else None
+    return _resolve_hardlink_table_name(conn, "dir2id")
 
 
 @dataclass(slots=True)
@@ -1431,6 +1477,93 @@ def _iter_md5_candidates_from_name(name: str) -> list[str]:
     return candidates
 
 
+# dir2id rarely changes; keep one map per hardlink.db (path, mtime_ns, size) instead of
+# re-reading the whole table on every media lookup.
+_HARDLINK_DIR2ID_CACHE_MAX = 16
+_HARDLINK_DIR2ID_CACHE_LOCK = threading.Lock()
+_HARDLINK_DIR2ID_CACHE: dict[tuple[str, int, int], dict[int, str]] = {}
+
+
+def _get_hardlink_dir2id_map(conn: sqlite3.Connection, hardlink_db_path: Path) -> dict[int, str]:
+    try:
+        st = hardlink_db_path.stat()
+        key: Optional[tuple[str, int, int]] = (str(hardlink_db_path), int(st.st_mtime_ns), int(st.st_size))
+    except OSError:
+        key = None
+    if key is not None:
+        with _HARDLINK_DIR2ID_CACHE_LOCK:
+            cached = _HARDLINK_DIR2ID_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    mapping = _build_hardlink_dir2id_map(conn)
+    if key is not None:
+        with _HARDLINK_DIR2ID_CACHE_LOCK:
+            if len(_HARDLINK_DIR2ID_CACHE) >= _HARDLINK_DIR2ID_CACHE_MAX:
+                _HARDLINK_DIR2ID_CACHE.clear()
+            _HARDLINK_DIR2ID_CACHE[key] = mapping
+    return mapping
+
+
+# Per-hardlink.db locks so concurrent index builds for different accounts don't serialize.
+_HARDLINK_MD5_INDEX_LOCKS: dict[str, threading.Lock] = {}
+_HARDLINK_MD5_INDEX_LOCKS_GUARD = threading.Lock()
+
+
+def _hardlink_md5_index_lock(hardlink_db_path: Path) -> threading.Lock:
+    key = str(hardlink_db_path)
+    with _HARDLINK_MD5_INDEX_LOCKS_GUARD:
+        lock = _HARDLINK_MD5_INDEX_LOCKS.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _HARDLINK_MD5_INDEX_LOCKS[key] = lock
+        return lock
+
+
+def build_hardlink_md5_indexes(account_dir: Path) -> int:
+    """Add `(md5, modify_time DESC)` indexes to the decrypted hardlink.db after decryption.
+
+    Media lookups run `WHERE md5 = ? ORDER BY modify_time DESC` per thumbnail; the index
+    turns that into a seek. The decrypted hardlink.db is our own copy, so adding an index
+    is safe. This runs once per decrypt, off the media request path; failures (read-only
+    output dir, locked file) are logged and leave lookups on a table scan.
+    Returns the number of tables that now have the index.
+    """
+    hardlink_db_path = Path(account_dir) / "hardlink.db"
+    if not hardlink_db_path.exists():
+        return 0
+
+    built = 0
+    with _hardlink_md5_index_lock(hardlink_db_path):
+        try:
+            conn = sqlite3.connect(str(hardlink_db_path), timeout=5)
+        except sqlite3.Error as e:
+            logger.warning("[hardlink] md5 index skipped path=%s err=%s", hardlink_db_path, e)
+            return 0
+        try:
+            tables = [
+                str(r[0])
+                for r in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '%hardlink_info%'"
+                ).fetchall()
+            ]
+            for table_name in tables:
+                quoted = _quote_ident(table_name)
+                try:
+                    cols = {str(c[1]).lower() for c in conn.execute(f"PRAGMA table_info({quoted})").fetchall()}
+                    if not {"md5", "modify_time"} <= cols:
+                        continue
+                    index_name = _quote_ident(f"ix_{table_name}_md5_mtime")
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {quoted}(md5, modify_time DESC)")
+                    conn.commit()
+                    built += 1
+                except sqlite3.Error as e:
+                    logger.warning("[hardlink] md5 index not created table=%s err=%s", table_name, e)
+        finally:
+            conn.close()
+    return built
+
+
 def _build_hardlink_dir2id_map(conn: sqlite3.Connection) -> dict[int, str]:
     table_name = _resolve_hardlink_dir2id_table_name(conn)
     if not table_name:
@@ -1668,7 +1801,7 @@ def _resolve_hardlink_entry_path(
                     continue
 
         if username:
-            chat_hash = hashlib.md5(str(username).encode()).hexdigest()
+            chat_hash = _username_md5(str(username))
             for variant in file_variants:
                 attach = (root / "msg" / "attach" / chat_hash / dir_name / "Img" / variant).resolve()
                 try:
@@ -2288,7 +2421,7 @@ class MediaPathIndex:
             return
 
         try:
-            conn = sqlite3.connect(str(hardlink_db_path))
+            conn = _connect_sqlite_for_read(hardlink_db_path)
             conn.row_factory = sqlite3.Row
         except Exception:
             return
@@ -2427,7 +2560,7 @@ class MediaPathIndex:
 
             if usernames:
                 for username in usernames:
-                    chat_hash = hashlib.md5(username.encode()).hexdigest()
+                    chat_hash = _username_md5(username)
                     directory = attach_root / chat_hash
                     try:
                         if directory.exists() and directory.is_dir():
@@ -2679,15 +2812,14 @@ def _resolve_media_path_from_hardlink(
     else:
         return None
 
-    conn = sqlite3.connect(str(hardlink_db_path))
-    conn.row_factory = sqlite3.Row
-    try:
-        dir2id_map = _build_hardlink_dir2id_map(conn)
+    # 单行查询直接解包 tuple，不用 sqlite3.Row；dir2id 映射按库文件缓存，只在命中行后才取。
+    # 连接取自只读连接池，各媒体接口的每次查找不再重新打开 hardlink.db。
+    with _pooled_read_connection(hardlink_db_path) as conn:
+        dir2id_map: Optional[dict[int, str]] = None
         for prefix in prefixes:
             table_name = _resolve_hardlink_table_name(conn, prefix)
             if not table_name:
                 continue
-
             quoted = _quote_ident(table_name)
             try:
                 row = conn.execute(
@@ -2699,13 +2831,16 @@ def _resolve_media_path_from_hardlink(
             if not row:
                 continue
 
+            dir1, dir2, file_name, file_size, modify_time = row
+            if dir2id_map is None:
+                dir2id_map = _get_hardlink_dir2id_map(conn, hardlink_db_path)
             entry = _HardlinkEntry(
-                file_name=str(row["file_name"] or "").strip(),
-                file_size=int(row["file_size"] or 0),
-                modify_time=int(row["modify_time"] or 0),
-                dir1=int(row["dir1"] or 0),
-                dir2=int(row["dir2"] or 0),
-                dir_name=str(dir2id_map.get(int(row["dir2"] or 0)) or str(row["dir2"] or "")).strip(),
+                file_name=str(file_name or "").strip(),
+                file_size=int(file_size or 0),
+                modify_time=int(modify_time or 0),
+                dir1=int(dir1 or 0),
+                dir2=int(dir2 or 0),
+                dir_name=str(dir2id_map.get(int(dir2 or 0)) or str(dir2 or "")).strip(),
             )
             resolved = _resolve_hardlink_entry_path(
                 kind=kind_key,
@@ -2718,8 +2853,6 @@ def _resolve_media_path_from_hardlink(
                 return resolved
 
         return None
-    finally:
-        conn.close()
 
 
 @lru_cache(maxsize=4096)
@@ -2868,25 +3001,199 @@ def _fallback_search_media_by_md5(weixin_root_str: str, md5: str, kind: str = ""
             f"{md5}*.mp4",
         ]
 
+    existing_dirs: list[str] = []
     for d in search_dirs:
         try:
-            if not d.exists() or not d.is_dir():
-                continue
+            if d.exists() and d.is_dir():
+                existing_dirs.append(str(d))
         except Exception:
             continue
-        for pat in patterns:
+    if not existing_dirs:
+        return None
+    if len(existing_dirs) == 1:
+        return _indexed_scan_for_md5_patterns(existing_dirs[0], md5, patterns)
+
+    # The trees are independent and the walk is I/O bound, so scan them concurrently.
+    # Earlier dirs keep priority: a hit in dir i only cancels the scans of dirs after i.
+    stops = [threading.Event() for _ in existing_dirs]
+    results: list[Optional[str]] = [None] * len(existing_dirs)
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(4, len(existing_dirs)),
+        thread_name_prefix="media-md5-search",
+    ) as executor:
+        future_to_index = {
+            executor.submit(_indexed_scan_for_md5_patterns, d, md5, patterns, stops[i]): i
+            for i, d in enumerate(existing_dirs)
+        }
+        for future in concurrent.futures.as_completed(future_to_index):
+            i = future_to_index[future]
             try:
-                for p in d.rglob(pat):
-                    try:
-                        if p.is_file():
-                            return str(p)
-                    except Exception:
-                        continue
+                results[i] = future.result()
             except Exception:
-                continue
+                results[i] = None
+            if results[i]:
+                for later in range(i + 1, len(existing_dirs)):
+                    stops[later].set()
+    for hit in results:
+        if hit:
+            return hit
     return None
 
 
+def _scan_tree_for_md5_patterns(
+    root_dir: str,
+    md5: str,
+    patterns: list[str],
+    stop: Optional[threading.Event] = None,
+) -> Optional[str]:
+    """Walk `root_dir` once and return the file matching the earliest pattern in `patterns`.
+
+    Equivalent to trying `Path.rglob(pat)` for each pattern in turn, but the tree is
+    listed a single time via `os.scandir` (no per-pattern re-walk / extra stat calls).
+    Returns None early once `stop` is set.
+    """
+    needle = os.path.normcase(md5)
+    best: Optional[str] = None
+    best_rank = len(patterns)
+    stack = [root_dir]
+    while stack:
+        if stop is not None and stop.is_set():
+            return None
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                name = entry.name
+                if needle not in os.path.normcase(name):
+                    continue
+                for rank in range(best_rank):
+                    if fnmatch.fnmatch(name, patterns[rank]):
+                        if entry.is_file():
+                            best, best_rank = entry.path, rank
+                        break
+            except OSError:
+                continue
+            if best_rank == 0:
+                return best
+    return best
+
+
+# 按搜索根目录缓存的“文件名里含 md5 的文件”索引：{目录: (mtime_ns, 子目录列表, {32位hex: [(文件名, 路径, 是否文件)]})}。
+# 每次查询只 stat 各目录，mtime 没变就复用上次的列目录结果；新文件会改动所在目录的 mtime，
+# 新建子目录会改动父目录的 mtime，所以增量刷新能看到所有变化，不必每个 md5 都重新遍历整棵树。
+_MD5_HEX_RUN_RE = re.compile(r"[0-9a-fA-F]{32,}")
+_MD5_NEEDLE_RE = re.compile(r"[0-9a-fA-F]{32}")
+_MEDIA_MD5_INDEX: dict[str, dict[str, tuple[int, list[str], dict[str, list[tuple[str, str, bool]]]]]] = {}
+_MEDIA_MD5_INDEX_CHECKED: dict[str, float] = {}
+_MEDIA_MD5_INDEX_LOCKS: dict[str, threading.Lock] = {}
+_MEDIA_MD5_INDEX_GUARD = threading.Lock()
+# 同一页里的多个回退查询共用一次校验。
+_MEDIA_MD5_INDEX_RECHECK_SECONDS = 1.0
+
+
+def _list_dir_md5_entries(dir_path: str) -> Optional[tuple[list[str], dict[str, list[tuple[str, str, bool]]]]]:
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except OSError:
+        return None
+    subdirs: list[str] = []
+    hits: dict[str, list[tuple[str, str, bool]]] = {}
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            name = entry.name
+            keys: set[str] = set()
+            for m in _MD5_HEX_RUN_RE.finditer(os.path.normcase(name)):
+                run = m.group(0)
+                for i in range(len(run) - 31):
+                    keys.add(run[i : i + 32])
+            if not keys:
+                continue
+            item = (name, entry.path, entry.is_file())
+        except OSError:
+            continue
+        for k in keys:
+            hits.setdefault(k, []).append(item)
+    return subdirs, hits
+
+
+def _refresh_media_md5_index(root_dir: str) -> dict[str, tuple[int, list[str], dict[str, list[tuple[str, str, bool]]]]]:
+    with _MEDIA_MD5_INDEX_GUARD:
+        lock = _MEDIA_MD5_INDEX_LOCKS.setdefault(root_dir, threading.Lock())
+    with lock:
+        now = time.monotonic()
+        cached = _MEDIA_MD5_INDEX.get(root_dir)
+        if cached is not None and now - _MEDIA_MD5_INDEX_CHECKED.get(root_dir, 0.0) < _MEDIA_MD5_INDEX_RECHECK_SECONDS:
+            return cached
+        old = cached or {}
+        fresh: dict[str, tuple[int, list[str], dict[str, list[tuple[str, str, bool]]]]] = {}
+        stack = [root_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            node = old.get(current)
+            if node is None or node[0] != mtime_ns:
+                listed = _list_dir_md5_entries(current)
+                if listed is None:
+                    continue
+                node = (mtime_ns, listed[0], listed[1])
+            fresh[current] = node
+            stack.extend(node[1])
+        _MEDIA_MD5_INDEX[root_dir] = fresh
+        _MEDIA_MD5_INDEX_CHECKED[root_dir] = time.monotonic()
+        return fresh
+
+
+def _indexed_scan_for_md5_patterns(
+    root_dir: str,
+    md5: str,
+    patterns: list[str],
+    stop: Optional[threading.Event] = None,
+) -> Optional[str]:
+    """Same result as `_scan_tree_for_md5_patterns`, answered from the incremental per-root index.
+
+    The cached tree is visited in the same depth-first order as the live walk, so ties between
+    equally ranked matches resolve the same way. Non-md5 needles fall back to the live walk.
+    """
+    needle = os.path.normcase(md5)
+    if not _MD5_NEEDLE_RE.fullmatch(needle):
+        return _scan_tree_for_md5_patterns(root_dir, md5, patterns, stop)
+
+    index = _refresh_media_md5_index(root_dir)
+    best: Optional[str] = None
+    best_rank = len(patterns)
+    stack = [root_dir]
+    while stack:
+        if stop is not None and stop.is_set():
+            return None
+        node = index.get(stack.pop())
+        if node is None:
+            continue
+        stack.extend(node[1])
+        for name, path, is_file in node[2].get(needle, ()):
+            for rank in range(best_rank):
+                if fnmatch.fnmatch(name, patterns[rank]):
+                    if is_file:
+                        best, best_rank = path, rank
+                    break
+            if best_rank == 0:
+                return best
+    return best
+
+
 def _guess_media_type_by_path(path: Path, fallback: str = "application/octet-stream") -> str:
     try:
         mt = mimetypes.guess_type(str(path.name))[0]
@@ -2897,6 +3204,16 @@ def _guess_media_type_by_path(path: Path, fallback: str = "application/octet-str
     return fallback
 
 
+@lru_cache(maxsize=256)
+def _xor_translate_table(key: int) -> bytes:
+    return bytes(i ^ key for i in range(256))
+
+
+def _xor_bytes(data: bytes, key: int) -> bytes:
+    """Single-byte XOR via `bytes.translate` (C loop; avoids a per-byte Python generator)."""
+    return bytes(data).translate(_xor_translate_table(int(key) & 0xFF))
+
+
 def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[str]]:
     if not data:
         return None, None
@@ -2932,18 +3249,15 @@ def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[st
         if len(data) < offset + len(magic):
             continue
         key = data[offset] ^ magic[0]
-        ok = True
-        for i in range(len(magic)):
-            if (data[offset + i] ^ key) != magic[i]:
-                ok = False
-                break
-        if not ok:
+        if _xor_bytes(data[offset : offset + len(magic)], key) != magic:
             continue
 
-        decoded = bytes(b ^ key for b in data)
+        # Sniff on a decoded head first; only XOR the whole buffer once a candidate is confirmed.
+        head = _xor_bytes(data[:64], key)
 
         if magic == b"wxgf":
             try:
+                decoded = _xor_bytes(data, key)
                 payload = decoded[offset:] if offset > 0 else decoded
                 converted = _wxgf_to_image_bytes(payload)
                 if converted:
@@ -2955,22 +3269,21 @@ def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[st
             continue
 
         if offset == 0 and magic == b"RIFF":
-            if len(decoded) >= 12 and decoded[8:12] == b"WEBP":
+            if len(head) >= 12 and head[8:12] == b"WEBP":
+                decoded = _xor_bytes(data, key)
                 if _is_probably_valid_image(decoded, "image/webp"):
                     return decoded, "image/webp"
             continue
 
         if mt == "video/mp4":
-            try:
-                if len(decoded) >= 8 and decoded[4:8] == b"ftyp":
-                    return decoded, "video/mp4"
-            except Exception:
-                pass
+            if len(head) >= 8 and head[4:8] == b"ftyp":
+                return _xor_bytes(data, key), "video/mp4"
             continue
 
-        mt2 = _detect_image_media_type(decoded[:32])
+        mt2 = _detect_image_media_type(head[:32])
         if mt2 != mt:
             continue
+        decoded = _xor_bytes(data, key)
         if not _is_probably_valid_image(decoded, mt2):
             continue
         return decoded, mt2
@@ -2984,7 +3297,7 @@ def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[st
     if preview_len > 0:
         for key in range(256):
             try:
-                pv = bytes(b ^ key for b in data[:preview_len])
+                pv = _xor_bytes(data[:preview_len], key)
             except Exception:
                 continue
             try:
@@ -2998,7 +3311,7 @@ def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[st
                     or (scan.find(b"RIFF") >= 0)
                     or (scan.find(b"ftyp") >= 0)
                 ):
-                    decoded = bytes(b ^ key for b in data)
+                    decoded = _xor_bytes(data, key)
                     dec2, mt2 = _try_strip_media_prefix(decoded)
                     if mt2 != "application/octet-stream":
                         if mt2.startswith("image/") and (not _is_probably_valid_image(dec2, mt2)):
@@ -3010,15 +3323,16 @@ def _try_xor_decrypt_by_magic(data: bytes) -> tuple[Optional[bytes], Optional[st
     return None, None
 
 
+_WECHAT_DAT_SIGNATURE_VERSIONS = {
+    b"\x07\x08V1\x08\x07": 1,
+    b"\x07\x08V2\x08\x07": 2,
+}
+
+
 def _detect_wechat_dat_version(data: bytes) -> int:
     if not data or len(data) < 6:
         return -1
-    sig = data[:6]
-    if sig == b"\x07\x08V1\x08\x07":
-        return 1
-    if sig == b"\x07\x08V2\x08\x07":
-        return 2
-    return 0
+    return _WECHAT_DAT_SIGNATURE_VERSIONS.get(bytes(data[:6]), 0)
 
 @lru_cache(maxsize=4096)
 def _fallback_search_media_by_file_id(
@@ -3048,7 +3362,7 @@ def _fallback_search_media_by_file_id(
     search_dirs: list[Path] = []
     if username:
         try:
-            chat_hash = hashlib.md5(str(username).encode()).hexdigest()
+            chat_hash = _username_md5(str(username))
             search_dirs.append(root / "msg" / "attach" / chat_hash)
         except Exception:
             pass
@@ -3135,27 +3449,32 @@ def _save_media_keys(account_dir: Path, xor_key: int, aes_key16: Optional[bytes]
 
 
 def _decrypt_wechat_dat_v3(data: bytes, xor_key: int) -> bytes:
-    return bytes(b ^ xor_key for b in data)
+    return _xor_bytes(data, xor_key)
 
 
 def _decrypt_wechat_dat_v4(data: bytes, xor_key: int, aes_key: bytes) -> bytes:
-    from Crypto.Cipher import AES
-    from Crypto.Util import Padding
+    # `cryptography` (OpenSSL) has less per-call overhead than PyCryptodome for the
+    # one-shot ECB decrypt done on every V4 media read.
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+    block_size = 16
     header, rest = data[:0xF], data[0xF:]
     signature, aes_size, xor_size = struct.unpack("<6sLLx", header)
-    aes_size += AES.block_size - aes_size % AES.block_size
+    aes_size += block_size - aes_size % block_size
 
     aes_data = rest[:aes_size]
     raw_data = rest[aes_size:]
 
-    cipher = AES.new(aes_key[:16], AES.MODE_ECB)
-    decrypted_data = Padding.unpad(cipher.decrypt(aes_data), AES.block_size)
+    decryptor = Cipher(algorithms.AES(bytes(aes_key[:16])), modes.ECB()).decryptor()
+    padded = decryptor.update(aes_data) + decryptor.finalize()
+    unpadder = padding.PKCS7(block_size * 8).unpadder()
+    decrypted_data = unpadder.update(padded) + unpadder.finalize()
 
     if xor_size > 0:
         raw_data = rest[aes_size:-xor_size]
         xor_data = rest[-xor_size:]
-        xored_data = bytes(b ^ xor_key for b in xor_data)
+        xored_data = _xor_bytes(xor_data, xor_key)
     else:
         xored_data = b""
 
@@ -3310,22 +3629,45 @@ def _try_find_decrypted_resource(account_dir: Path, md5: str) -> Optional[Path]:
     return None
 
 
+def _probe_plain_image_file(path: Path) -> str:
+    """只读文件头尾判断是否为可直接下发的明文图片；返回 media type，否则返回空串。"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+            mt = _detect_image_media_type(head)
+            if mt == "application/octet-stream":
+                return ""
+            # _is_probably_valid_image 只看文件头和结尾标记，大文件读头尾即可
+            size = os.fstat(f.fileno()).st_size
+            if size <= len(head) + 4096:
+                f.seek(0)
+                sample = f.read()
+            else:
+                f.seek(-4096, os.SEEK_END)
+                sample = head + f.read()
+    except OSError:
+        return ""
+    return mt if _is_probably_valid_image(sample, mt) else ""
+
+
 def _read_and_maybe_decrypt_media(
     path: Path,
     account_dir: Optional[Path] = None,
     weixin_root: Optional[Path] = None,
 ) -> tuple[bytes, str]:
-    # Fast path: already a normal image
+    # Read the file once; every branch below needs the full payload anyway, and
+    # re-reading it per attempt multiplied disk I/O for large media.
     with open(path, "rb") as f:
-        head = f.read(64)
+        data = f.read()
+    head = data[:64]
 
+    # Fast path: already a normal image
     mt = _detect_image_media_type(head)
     if mt != "application/octet-stream":
-        return path.read_bytes(), mt
+        return data, mt
 
     if head.startswith(b"wxgf"):
-        data0 = path.read_bytes()
-        converted0 = _wxgf_to_image_bytes(data0)
+        converted0 = _wxgf_to_image_bytes(data)
         if converted0:
             mt0 = _detect_image_media_type(converted0[:32])
             if mt0 != "application/octet-stream":
@@ -3337,9 +3679,7 @@ def _read_and_maybe_decrypt_media(
         idx = -1
     if 0 < idx <= 4:
         try:
-            data0 = path.read_bytes()
-            payload0 = data0[idx:]
-            converted0 = _wxgf_to_image_bytes(payload0)
+            converted0 = _wxgf_to_image_bytes(data[idx:])
             if converted0:
                 mt0 = _detect_image_media_type(converted0[:32])
                 if mt0 != "application/octet-stream":
@@ -3348,10 +3688,9 @@ def _read_and_maybe_decrypt_media(
             pass
 
     try:
-        data_pref = path.read_bytes()
         # Only accept prefix stripping when it looks like a real image/video,
         # otherwise encrypted/random bytes may trigger false positives.
-        stripped, mtp = _try_strip_media_prefix(data_pref)
+        stripped, mtp = _try_strip_media_prefix(data)
         if mtp != "application/octet-stream":
             if mtp.startswith("image/") and (not _is_probably_valid_image(stripped, mtp)):
                 pass
@@ -3360,8 +3699,6 @@ def _read_and_maybe_decrypt_media(
     except Exception:
         pass
 
-    data = path.read_bytes()
-
     # Try WeChat .dat v1/v2 decrypt.
     version = _detect_wechat_dat_version(data)
     if version in (0, 1, 2):
@@ -3621,6 +3958,30 @@ def _decrypt_and_save_resource(
         return False, str(e)
 
 
+# 语音转码结果缓存：同一条语音反复播放/导出时跳过 pilk 解码和 ffmpeg 子进程
+_VOICE_AUDIO_CACHE: "OrderedDict[tuple[bytes, bool], tuple[bytes, str, str]]" = OrderedDict()
+_VOICE_AUDIO_CACHE_LOCK = threading.Lock()
+_VOICE_AUDIO_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_voice_audio_cache_bytes = 0
+
+
+def _remember_voice_audio(key: tuple[bytes, bool], result: tuple[bytes, str, str]) -> None:
+    global _voice_audio_cache_bytes
+
+    size = len(result[0])
+    if size > _VOICE_AUDIO_CACHE_MAX_BYTES:
+        return
+    with _VOICE_AUDIO_CACHE_LOCK:
+        old = _VOICE_AUDIO_CACHE.pop(key, None)
+        if old is not None:
+            _voice_audio_cache_bytes -= len(old[0])
+        _VOICE_AUDIO_CACHE[key] = result
+        _voice_audio_cache_bytes += size
+        while _voice_audio_cache_bytes > _VOICE_AUDIO_CACHE_MAX_BYTES and _VOICE_AUDIO_CACHE:
+            _, evicted = _VOICE_AUDIO_CACHE.popitem(last=False)
+            _voice_audio_cache_bytes -= len(evicted[0])
+
+
 def _convert_silk_to_wav(silk_data: bytes) -> bytes:
     """Convert SILK audio data to WAV format for browser playback."""
     import tempfile
@@ -3632,30 +3993,15 @@ def _convert_silk_to_wav(silk_data: bytes) -> bytes:
         return silk_data
 
     try:
-        # pilk.silk_to_wav works with file paths, so use temp files
-        with tempfile.NamedTemporaryFile(suffix=".silk", delete=False) as silk_file:
-            silk_file.write(silk_data)
-            silk_path = silk_file.name
-
-        wav_path = silk_path.replace(".silk", ".wav")
-
-        try:
+        # pilk.silk_to_wav 只接受文件路径；临时目录退出时一并清理
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            silk_path = os.path.join(tmp_dir, "voice.silk")
+            wav_path = os.path.join(tmp_dir, "voice.wav")
+            with open(silk_path, "wb") as silk_file:
+                silk_file.write(silk_data)
             pilk.silk_to_wav(silk_path, wav_path, rate=24000)
             with open(wav_path, "rb") as wav_file:
-                wav_data = wav_file.read()
-            return wav_data
-        finally:
-            # Clean up temp files
-            import os
-
-            try:
-                os.unlink(silk_path)
-            except Exception:
-                pass
-            try:
-                os.unlink(wav_path)
-            except Exception:
-                pass
+                return wav_file.read()
     except Exception as e:
         logger.warning(f"SILK to WAV conversion failed: {e}")
         return silk_data
@@ -3758,15 +4104,25 @@ def _convert_silk_to_browser_audio(
     if _looks_like_mp3(data):
         return data, "mp3", "audio/mpeg"
 
+    want_mp3 = str(preferred_format or "").strip().lower() == "mp3"
+    cache_key = (hashlib.blake2b(data, digest_size=16).digest(), want_mp3)
+    with _VOICE_AUDIO_CACHE_LOCK:
+        cached = _VOICE_AUDIO_CACHE.get(cache_key)
+        if cached is not None:
+            _VOICE_AUDIO_CACHE.move_to_end(cache_key)
+            return cached
+
     wav_data = data if data.startswith(b"RIFF") else _convert_silk_to_wav(data)
-    if wav_data.startswith(b"RIFF"):
-        if str(preferred_format or "").strip().lower() == "mp3":
-            mp3_data = _convert_wav_to_mp3(wav_data)
-            if mp3_data:
-                return mp3_data, "mp3", "audio/mpeg"
-        return wav_data, "wav", "audio/wav"
+    if not wav_data.startswith(b"RIFF"):
+        return data, "silk", "audio/silk"
 
-    return data, "silk", "audio/silk"
+    result = (wav_data, "wav", "audio/wav")
+    if want_mp3:
+        mp3_data = _convert_wav_to_mp3(wav_data)
+        if mp3_data:
+            result = (mp3_data, "mp3", "audio/mpeg")
+    _remember_voice_audio(cache_key, result)
+    return result
 
 
 def _resolve_media_path_for_kind(
@@ -3789,9 +4145,8 @@ def _resolve_media_path_for_kind(
             return decrypted_path
 
     # 回退到原始逻辑：从微信数据目录查找
-    wxid_dir = _resolve_account_wxid_dir(account_dir)
+    wxid_dir, db_storage_dir = _resolve_account_media_dirs(account_dir)
     hardlink_db_path = account_dir / "hardlink.db"
-    db_storage_dir = _resolve_account_db_storage_dir(account_dir)
 
     roots: list[Path] = []
     if wxid_dir:
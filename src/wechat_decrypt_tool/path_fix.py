@@ -1,7 +1,7 @@
 import json
 import os
 import re
-from typing import Callable, Optional
+from typing import Any, Callable, Optional, Union
 
 from fastapi import HTTPException, Request
 from fastapi.routing import APIRoute
@@ -9,8 +9,75 @@ from fastapi.routing import APIRoute
 from .logging_config import get_logger
 from .request_logging import redact_sensitive_log_data
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - depends on optional runtime package availability
+    orjson = None  # type: ignore[assignment]
+
 logger = get_logger(__name__)
 
+_WINDOWS_ABS_PATH_RE = re.compile(r'^[A-Za-z]:[/\\]')
+
+
+def _find_first_storage_db(path: str) -> Optional[str]:
+    """返回 db_storage 目录下找到的第一个 .db 文件（排除 key_info.db），没有则返回 None。
+
+    与原先 os.walk 的判定一致（不跟随目录软链接、忽略无法访问的目录），但命中即返回。
+    """
+    stack = [path]
+    while stack:
+        root = stack.pop()
+        try:
+            it = os.scandir(root)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    try:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                # 只处理db_storage目录下的数据库文件，排除不需要解密的数据库（与自动检测逻辑一致）
+                name = entry.name
+                if "db_storage" in root and name.endswith(".db") and name != "key_info.db":
+                    return entry.path
+        # 逆序压栈，保持与 os.walk 相同的先序遍历顺序
+        stack.extend(reversed(subdirs))
+    return None
+
+
+def _loads_json(data: Union[str, bytes]) -> Any:
+    """优先用 orjson 解析；orjson 拒绝而标准库接受的输入（NaN/Infinity 等）回退到 json.loads。
+
+    结果只用于路径校验，原始 body 原样交给路由，数值精度上的差异不影响行为。
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+# 匹配引号内包含反斜杠的路径（不管是否以盘符开头）
+_QUOTED_BACKSLASH_VALUE_RE = re.compile(r'"([^"]*?\\[^"]*?)"')
+# 单个反斜杠（前后都不是反斜杠），即尚未转义的反斜杠
+_LONE_BACKSLASH_RE = re.compile(r'(?<!\\)\\(?!\\)')
+
+
+def _fix_quoted_backslash_value(match: "re.Match[str]") -> str:
+    # 将单个反斜杠替换为双反斜杠，但避免替换已经转义的反斜杠
+    fixed_path = _LONE_BACKSLASH_RE.sub(r'\\\\', match.group(1))
+    return f'"{fixed_path}"'
+
 
 class PathFixRequest(Request):
     """自定义Request类，自动修复JSON中的路径问题并检测相对路径"""
@@ -21,7 +88,7 @@ class PathFixRequest(Request):
             return False
 
         # Windows绝对路径：以盘符开头 (C:\, D:\, etc.)
-        if re.match(r'^[A-Za-z]:[/\\]', path):
+        if _WINDOWS_ABS_PATH_RE.match(path):
             return True
 
         # Unix-like系统绝对路径：以 / 开头
@@ -84,29 +151,15 @@ class PathFixRequest(Request):
             else:
                 logger.info(f"路径存在，使用递归方式检查数据库文件")
                 try:
-                    # 使用与自动检测相同的逻辑：递归查找.db文件
-                    db_files = []
-                    for root, dirs, files in os.walk(path):
-                        # 只处理db_storage目录下的数据库文件（与自动检测逻辑一致）
-                        if "db_storage" not in root:
-                            continue
-                        for file_name in files:
-                            if not file_name.endswith(".db"):
-                                continue
-                            # 排除不需要解密的数据库（与自动检测逻辑一致）
-                            if file_name in ["key_info.db"]:
-                                continue
-                            db_path = os.path.join(root, file_name)
-                            db_files.append(db_path)
-
-                    logger.info(f"递归查找到的数据库文件: {db_files}")
-                    if not db_files:
+                    # 使用与自动检测相同的逻辑：递归查找.db文件；找到第一个就够了，不必遍历整棵目录树
+                    first_db = _find_first_storage_db(path)
+                    if not first_db:
                         error_msg = f"路径存在但没有找到有效的数据库文件: {path}\n" \
                                    f"请确保该目录或其子目录包含微信数据库文件(.db文件)。\n" \
                                    f"注意：key_info.db文件会被自动排除。"
                         logger.info(f"返回错误: 递归查找未找到有效.db文件")
                         return error_msg
-                    logger.info(f"路径验证通过，递归找到{len(db_files)}个有效数据库文件")
+                    logger.info(f"路径验证通过，找到有效数据库文件: {first_db}")
                 except PermissionError:
                     error_msg = f"无法访问路径: {path}\n" \
                                f"权限不足，请检查文件夹权限。"
@@ -136,8 +189,10 @@ class PathFixRequest(Request):
             body_str = body.decode('utf-8')
 
             # 首先尝试解析JSON以验证路径
+            parsed_ok = False
             try:
-                json_data = json.loads(body_str)
+                json_data = _loads_json(body)
+                parsed_ok = True
                 path_error = self._validate_paths_in_json(json_data)
                 if path_error:
                     logger.info(f"检测到路径错误: {path_error}")
@@ -150,22 +205,21 @@ class PathFixRequest(Request):
                 logger.info(f"JSON解析失败，尝试修复: {e}")
                 pass
 
+            # 没有反斜杠就没有可修复的内容（下面的正则必须匹配到反斜杠），原样返回
+            if "\\" not in body_str:
+                self.state._pathfix_body_bytes = body
+                return body
+
             # 使用正则表达式安全地处理Windows路径中的反斜杠
             # 需要处理两种情况：
             # 1. 以盘符开头的绝对路径：D:\path\to\file
             # 2. 不以盘符开头的相对路径：wechatMSG\xwechat_files\...
+            fixed_body_str = _QUOTED_BACKSLASH_VALUE_RE.sub(_fix_quoted_backslash_value, body_str)
 
-            # 匹配引号内包含反斜杠的路径（不管是否以盘符开头）
-            pattern = r'"([^"]*?\\[^"]*?)"'
-
-            def fix_path(match):
-                path = match.group(1)
-                # 将单个反斜杠替换为双反斜杠，但避免替换已经转义的反斜杠
-                fixed_path = re.sub(r'(?<!\\)\\(?!\\)', r'\\\\', path)
-                return f'"{fixed_path}"'
-
-            # 应用修复
-            fixed_body_str = re.sub(pattern, fix_path, body_str)
+            # 原本就是合法 JSON 且修复没有改动任何内容：上面已经校验过，不必再解析/校验一遍
+            if parsed_ok and fixed_body_str == body_str:
+                self.state._pathfix_body_bytes = body
+                return body
 
             # 记录修复信息（仅在有修改时）
             if fixed_body_str != body_str:
@@ -177,7 +231,7 @@ class PathFixRequest(Request):
 
             # 修复后重新验证路径
             try:
-                json_data = json.loads(fixed_body_str)
+                json_data = _loads_json(fixed_body_str)
                 logger.info(f"修复后解析JSON成功，开始验证路径")
                 path_error = self._validate_paths_in_json(json_data)
                 if path_error:
@@ -217,14 +271,18 @@ class PathFixRoute(APIRoute):
         original_route_handler = super().get_route_handler()
 
         async def custom_route_handler(request: Request) -> any:
+            # 非 JSON 请求（绝大多数 GET/媒体请求）无需修复路径，直接交给原处理器，
+            # 避免每个请求额外构造一次 Request。
+            content_type = (request.headers.get("content-type", "") or "").lower()
+            if "application/json" not in content_type:
+                return await original_route_handler(request)
+
             # 将Request替换为我们的自定义Request
             custom_request = PathFixRequest(request.scope, request.receive)
 
             # 仅对 JSON 请求预读 body，以触发路径修复/校验逻辑，并在发现错误时提前返回 400。
             try:
-                content_type = (custom_request.headers.get("content-type", "") or "").lower()
-                if "application/json" in content_type:
-                    await custom_request.body()
+                await custom_request.body()
             except Exception:
                 pass
 
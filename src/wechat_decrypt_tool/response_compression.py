@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import gzip
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Only buffered text payloads are worth compressing. Media (images/video/voice),
+# export archives and SSE streams are either already compressed or must not be
+# buffered, so they always pass through untouched.
+_COMPRESSIBLE_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "image/svg+xml",
+)
+
+
+class GZipTextMiddleware:
+    """Gzip single-message JSON/HTML/text responses when the client accepts it.
+
+    Unlike Starlette's `GZipMiddleware`, streaming bodies (`more_body=True`),
+    non-200 responses and non-text content types are never touched, so SSE
+    progress streams, range requests and `FileResponse` media keep working as-is.
+    """
+
+    def __init__(self, app: ASGIApp, *, minimum_size: int = 1024, compresslevel: int = 5) -> None:
+        self.app = app
+        self.minimum_size = int(minimum_size)
+        self.compresslevel = int(compresslevel)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        if "gzip" not in request_headers.get("accept-encoding", "").lower() or "range" in request_headers:
+            await self.app(scope, receive, send)
+            return
+
+        pending_start: dict[str, Any] | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal pending_start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers") or [])
+                content_type = headers.get("content-type", "").lower()
+                if (
+                    int(message.get("status") or 0) != 200
+                    or "content-encoding" in headers
+                    or not content_type.startswith(_COMPRESSIBLE_CONTENT_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                pending_start = message
+                return
+
+            start = pending_start
+            pending_start = None
+            passthrough = True
+            if start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"") if message["type"] == "http.response.body" else b""
+            if (
+                message["type"] != "http.response.body"
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+            start = dict(start)
+            start["headers"] = list(start.get("headers") or [])
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
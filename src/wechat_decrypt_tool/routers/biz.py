@@ -8,7 +8,7 @@ import urllib
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 
-from ..chat_helpers import _quote_ident, _resolve_account_dir
+from ..chat_helpers import _quote_ident, _resolve_account_dir, _zstd_decompress
 from ..media_helpers import _resolve_account_db_storage_dir
 from ..path_fix import PathFixRoute
 from ..logging_config import get_logger
@@ -230,8 +230,7 @@ def decompress_zstd_content(data: bytes, source_id: str, local_id: int) -> Optio
         return None
     try:
         if zstd:
-            dctx = zstd.ZstdDecompressor()
-            return dctx.decompress(data, max_output_size=10 * 1024 * 1024)
+            return _zstd_decompress(data, max_output_size=10 * 1024 * 1024)
     except Exception as e:
         error_msg = f"❌ [解压失败] 服务号id: {source_id}, local_id: {local_id} -> {e}"
         print(error_msg)
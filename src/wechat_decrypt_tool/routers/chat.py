@@ -6,7 +6,9 @@ import json
 import shutil
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from operator import itemgetter
 from os import scandir
 from pathlib import Path
 from typing import Any, Optional
@@ -25,6 +27,7 @@ from ..chat_helpers import (
     _build_avatar_url,
     _build_latest_message_preview,
     _build_fts_query,
+    _close_pooled_read_connections,
     _decode_message_content,
     _decode_sqlite_text,
     _extract_chatroom_top_message_metadata,
@@ -34,10 +37,14 @@ from ..chat_helpers import (
     _extract_xml_tag_or_attr,
     _extract_xml_tag_text,
     _format_session_time,
+    _has_appmsg_tag,
     _infer_last_message_brief,
     _infer_message_brief_by_local_type,
     _infer_transfer_status_text,
+    _is_http_url,
+    _is_mostly_printable_text,
     _iter_message_db_paths,
+    _iter_template_placeholders,
     _list_decrypted_accounts,
     _make_search_tokens,
     _make_snippet,
@@ -50,8 +57,12 @@ from ..chat_helpers import (
     _normalize_session_preview_text,
     _extract_group_preview_sender_username,
     _replace_preview_sender_prefix,
-    _lookup_resource_md5,
+    _lookup_resource_md5_prefetched,
+    _pooled_read_connection,
+    _sqlite_file_stamp,
+    _prefetch_resource_md5,
     _normalize_xml_url,
+    _open_message_resource,
     _parse_app_message,
     _parse_location_message,
     _parse_system_message_content,
@@ -180,16 +191,6 @@ def _bytes_to_hex(value: bytes) -> str:
     return "0x" + value.hex()
 
 
-def _is_mostly_printable_text(s: str) -> bool:
-    if not s:
-        return False
-    sample = s[:600]
-    if not sample:
-        return False
-    printable = sum(1 for ch in sample if ch.isprintable() or ch in {"\n", "\r", "\t"})
-    return (printable / len(sample)) >= 0.85
-
-
 def _jsonify_db_value(key: str, value: Any) -> Any:
     """Convert sqlite row values into JSON-friendly values (best-effort)."""
     if value is None:
@@ -3210,6 +3211,11 @@ async def chat_search_index_senders(
     }
 
 
+# 消息列表排序键：createTime/sortSeq/localId 在 _append_full_messages_from_rows 里已是 int，
+# 直接用 itemgetter 取值，排序时不必为每条消息调用一次 Python 函数。
+_MESSAGE_ORDER_KEY = itemgetter("createTime", "sortSeq", "localId")
+
+
 def _append_full_messages_from_rows(
     *,
     merged: list[dict[str, Any]],
@@ -3236,6 +3242,12 @@ def _append_full_messages_from_rows(
         except Exception:
             contact_conn = None
 
+    # 一页消息的资源 md5 一次批量查完，循环里按 key 取，避免每条图片/视频/表情各查两次库。
+    resource_md5_prefetched = _prefetch_resource_md5(resource_conn, resource_chat_id, rows)
+    # 自己的 wxid 对整页不变，循环外取一次。
+    my_username = account_dir.name
+    my_username_lower = str(my_username or "").strip().lower()
+
     for r in rows:
         effective_db_path = db_path
         effective_table_name = table_name
@@ -3310,8 +3322,7 @@ def _append_full_messages_from_rows(
             if not is_sent:
                 try:
                     su = str(sender_username or "").strip().lower()
-                    me = str(account_dir.name or "").strip().lower()
-                    if su and me and su == me:
+                    if su and my_username_lower and su == my_username_lower:
                         is_sent = True
                 except Exception:
                     pass
@@ -3344,9 +3355,9 @@ def _append_full_messages_from_rows(
                 sender_username = xml_sender
 
         if is_sent:
-            sender_username = account_dir.name
-        elif (not is_group) and (not sender_username):
-            sender_username = username
+            sender_username = my_username
+        elif not is_group:
+            sender_username = sender_username or username
 
         if sender_username:
             sender_usernames.append(sender_username)
@@ -3445,9 +3456,7 @@ def _append_full_messages_from_rows(
             render_type = "system"
             template = _extract_xml_tag_text(raw_text, "template")
             if template:
-                pat_usernames.update(
-                    {m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", template) if m.group(1)}
-                )
+                pat_usernames.update(_iter_template_placeholders(template))
                 content_text = "[拍一拍]"
             else:
                 content_text = "[拍一拍]"
@@ -3488,7 +3497,8 @@ def _append_full_messages_from_rows(
             # (especially for *_t.dat thumbnails), causing the media endpoint to 404.
             if resource_conn is not None:
                 try:
-                    resource_md5 = _lookup_resource_md5(
+                    resource_md5 = _lookup_resource_md5_prefetched(
+                        resource_md5_prefetched,
                         resource_conn,
                         resource_chat_id,
                         message_local_type=local_type,
@@ -3526,7 +3536,7 @@ def _append_full_messages_from_rows(
             )
             _cdn_url_or_id = _normalize_xml_url(_cdn_url_or_id)
             image_url = (
-                _cdn_url_or_id if str(_cdn_url_or_id).lower().startswith(("http://", "https://")) else ""
+                _cdn_url_or_id if _is_http_url(_cdn_url_or_id) else ""
             )
             if (not image_url) and _cdn_url_or_id:
                 image_file_id = _cdn_url_or_id
@@ -3553,18 +3563,19 @@ def _append_full_messages_from_rows(
 
             video_thumb_url = (
                 video_thumb_url_or_id
-                if str(video_thumb_url_or_id or "").strip().lower().startswith(("http://", "https://"))
+                if _is_http_url(video_thumb_url_or_id)
                 else ""
             )
             video_url = (
                 video_url_or_id
-                if str(video_url_or_id or "").strip().lower().startswith(("http://", "https://"))
+                if _is_http_url(video_url_or_id)
                 else ""
             )
             video_thumb_file_id = "" if video_thumb_url else (str(video_thumb_url_or_id or "").strip() or "")
             video_file_id = "" if video_url else (str(video_url_or_id or "").strip() or "")
             if (not video_thumb_md5) and resource_conn is not None:
-                video_thumb_md5 = _lookup_resource_md5(
+                video_thumb_md5 = _lookup_resource_md5_prefetched(
+                    resource_md5_prefetched,
                     resource_conn,
                     resource_chat_id,
                     message_local_type=local_type,
@@ -3599,7 +3610,8 @@ def _append_full_messages_from_rows(
                 emoji_url = _extract_xml_tag_text(raw_text, "cdn_url")
             emoji_url = _normalize_xml_url(emoji_url)
             if (not emoji_md5) and resource_conn is not None:
-                emoji_md5 = _lookup_resource_md5(
+                emoji_md5 = _lookup_resource_md5_prefetched(
+                    resource_md5_prefetched,
                     resource_conn,
                     resource_chat_id,
                     message_local_type=local_type,
@@ -3641,9 +3653,9 @@ def _append_full_messages_from_rows(
             if not content_text:
                 content_text = _infer_message_brief_by_local_type(local_type)
             else:
-                if content_text.startswith("<") or content_text.startswith('"<'):
+                if content_text.startswith(("<", '"<')):
                     parsed_special = False
-                    if "<appmsg" in content_text.lower():
+                    if _has_appmsg_tag(content_text):
                         parsed = _parse_app_message(content_text)
                         rt = str(parsed.get("renderType") or "")
                         if rt and rt != "text":
@@ -4065,6 +4077,11 @@ def _postprocess_full_messages(
         sender_usernames=uniq_senders,
     )
 
+    # 媒体回退 URL 里账号和会话两段对整页都一样，循环外 quote 一次
+    media_base = base_url + "/api/chat/media/"
+    account_q = quote(account_dir.name)
+    username_q = quote(username)
+
     for m in merged:
         # If appmsg doesn't provide sourcedisplayname, try mapping sourceusername to display name.
         if (not str(m.get("from") or "").strip()) and str(m.get("fromUsername") or "").strip():
@@ -4161,13 +4178,13 @@ def _postprocess_full_messages(
                     file_id = str(m.get("imageFileId") or "").strip()
                     if md5:
                         m["imageUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
                     elif file_id:
                         m["imageUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&file_id={quote(file_id)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&file_id={quote(file_id)}&username={username_q}"
                         )
             elif rt == "emoji":
                 md5 = str(m.get("emojiMd5") or "")
@@ -4189,47 +4206,47 @@ def _postprocess_full_messages(
                             pass
 
                         m["emojiUrl"] = (
-                            base_url
-                            + f"/api/chat/media/emoji?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"emoji?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
                     elif (not str(m.get("emojiUrl") or "")):
                         m["emojiUrl"] = (
-                            base_url
-                            + f"/api/chat/media/emoji?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"emoji?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
             elif rt == "video":
                 video_thumb_url = str(m.get("videoThumbUrl") or "").strip()
                 video_thumb_md5 = str(m.get("videoThumbMd5") or "").strip()
                 video_thumb_file_id = str(m.get("videoThumbFileId") or "").strip()
                 if (not video_thumb_url) or (
-                    not video_thumb_url.lower().startswith(("http://", "https://"))
+                    not _is_http_url(video_thumb_url)
                 ):
                     if video_thumb_md5:
                         m["videoThumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video_thumb?account={quote(account_dir.name)}&md5={quote(video_thumb_md5)}&username={quote(username)}"
+                            media_base
+                            + f"video_thumb?account={account_q}&md5={quote(video_thumb_md5)}&username={username_q}"
                             + (f"&file_id={quote(video_thumb_file_id)}" if video_thumb_file_id else "")
                         )
                     elif video_thumb_file_id:
                         m["videoThumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video_thumb?account={quote(account_dir.name)}&file_id={quote(video_thumb_file_id)}&username={quote(username)}"
+                            media_base
+                            + f"video_thumb?account={account_q}&file_id={quote(video_thumb_file_id)}&username={username_q}"
                         )
 
                 video_url = str(m.get("videoUrl") or "").strip()
                 video_md5 = str(m.get("videoMd5") or "").strip()
                 video_file_id = str(m.get("videoFileId") or "").strip()
-                if (not video_url) or (not video_url.lower().startswith(("http://", "https://"))):
+                if (not video_url) or (not _is_http_url(video_url)):
                     if video_md5:
                         m["videoUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video?account={quote(account_dir.name)}&md5={quote(video_md5)}&username={quote(username)}"
+                            media_base
+                            + f"video?account={account_q}&md5={quote(video_md5)}&username={username_q}"
                             + (f"&file_id={quote(video_file_id)}" if video_file_id else "")
                         )
                     elif video_file_id:
                         m["videoUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video?account={quote(account_dir.name)}&file_id={quote(video_file_id)}&username={quote(username)}"
+                            media_base
+                            + f"video?account={account_q}&file_id={quote(video_file_id)}&username={username_q}"
                         )
             elif rt == "link":
                 # Some appmsg link cards (notably Bilibili shares) carry a non-HTTP `<thumburl>` payload
@@ -4237,7 +4254,7 @@ def _postprocess_full_messages(
                 #   msg/attach/{md5(conv_username)}/.../Img/{local_id}_{create_time}_t.dat
                 # Expose it via the existing image endpoint using file_id.
                 thumb_url = str(m.get("thumbUrl") or "").strip()
-                if thumb_url and (not thumb_url.lower().startswith(("http://", "https://"))):
+                if thumb_url and (not _is_http_url(thumb_url)):
                     try:
                         lid = int(m.get("localId") or 0)
                     except Exception:
@@ -4249,14 +4266,14 @@ def _postprocess_full_messages(
                     if lid > 0 and ct > 0:
                         file_id = f"{lid}_{ct}"
                         m["thumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&file_id={quote(file_id)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&file_id={quote(file_id)}&username={username_q}"
                         )
             elif rt == "voice":
                 if str(m.get("serverId") or ""):
                     sid = int(m.get("serverId") or 0)
                     if sid:
-                        m["voiceUrl"] = base_url + f"/api/chat/media/voice?account={quote(account_dir.name)}&server_id={sid}"
+                        m["voiceUrl"] = media_base + f"voice?account={account_q}&server_id={sid}"
         except Exception:
             pass
 
@@ -4475,6 +4492,8 @@ def delete_chat_account(account: str):
             # Ignore export cleanup failure; account dir removal is the core operation.
             pass
 
+    # 先释放连接池里该账号各库的空闲句柄，否则 Windows 上 rmtree 会因文件被占用失败
+    _close_pooled_read_connections(account_dir)
     try:
         shutil.rmtree(account_dir)
     except Exception as e:
@@ -4491,6 +4510,11 @@ def delete_chat_account(account: str):
     }
 
 
+_SESSION_WS_RUN_RE = re.compile(r"\s+")
+_SESSION_SENDER_PREFIX_RE = re.compile(r"^([^:\n]{1,128}):\s*(.+)$")
+_SESSION_LOCATION_PREFIX_RE = re.compile(r"^\[location\]", re.IGNORECASE)
+
+
 @router.get("/api/chat/sessions", summary="获取会话列表（聊天左侧列表）")
 def list_chat_sessions(
     request: Request,
@@ -4614,9 +4638,8 @@ def list_chat_sessions(
 
     if source_norm != "realtime":
         session_db_path = account_dir / "session.db"
-        sconn = sqlite3.connect(str(session_db_path))
-        sconn.row_factory = sqlite3.Row
-        try:
+        with _pooled_read_connection(session_db_path) as sconn:
+            sconn.row_factory = sqlite3.Row
             try:
                 rows = sconn.execute(
                     """
@@ -4654,8 +4677,6 @@ def list_chat_sessions(
                     ORDER BY sort_timestamp DESC
                     """
                 ).fetchall()
-        finally:
-            sconn.close()
 
     trace(
         "rows:loaded",
@@ -4894,18 +4915,36 @@ def list_chat_sessions(
         unresolvedGroupSenderCount=len(unresolved),
     )
 
+    # 每行都要用的时间基准在循环外算好。
+    now = datetime.now()
+
+    def summary_or_brief(row: Any) -> str:
+        summary_text = _SESSION_WS_RUN_RE.sub(" ", _decode_sqlite_text(row["summary"]).strip()).strip()
+        if summary_text:
+            return summary_text
+        return _infer_last_message_brief(row["last_msg_type"], row["last_msg_sub_type"])
+
     sessions: list[dict[str, Any]] = []
+    # 循环每行都会用到的绑定方法先取到局部变量，省掉重复的属性/全局查找。
+    append_session = sessions.append
+    get_contact_row = contact_rows.get
+    get_wcdb_display_name = wcdb_display_names.get
+    get_last_meta = session_last_meta.get
+    get_last_preview = last_previews.get
+    get_top_flag = top_flags.get
     for r in filtered:
         username = r["username"]
-        latest_meta = session_last_meta.get(str(username or "").strip()) or {}
+        username_key = str(username or "").strip()
+        is_group = str(username or "").endswith("@chatroom")
+        latest_meta = get_last_meta(username_key) or {}
         latest_meta_ts = _to_int(latest_meta.get("create_time"))
         row_sort_ts = _to_int(_session_row_get(r, "sort_timestamp", 0))
         row_last_ts = _to_int(_session_row_get(r, "last_timestamp", 0))
         latest_meta_preview = str(latest_meta.get("preview") or "").strip()
-        c_row = contact_rows.get(username)
+        c_row = get_contact_row(username)
 
         display_name = _pick_display_name(c_row, username)
-        wd = str(wcdb_display_names.get(username) or "").strip()
+        wd = str(get_wcdb_display_name(username) or "").strip()
         if source_norm == "realtime" and wd and wd != username:
             display_name = wd
         elif display_name == username:
@@ -4924,32 +4963,18 @@ def list_chat_sessions(
         if preview_mode == "session":
             draft_text = _decode_sqlite_text(r["draft"]).strip()
             if draft_text:
-                draft_text = re.sub(r"\s+", " ", draft_text).strip()
+                draft_text = _SESSION_WS_RUN_RE.sub(" ", draft_text).strip()
                 last_message = f"[草稿] {draft_text}" if draft_text else "[草稿]"
             else:
-                summary_text = _decode_sqlite_text(r["summary"]).strip()
-                summary_text = re.sub(r"\s+", " ", summary_text).strip()
-                if summary_text:
-                    last_message = summary_text
-                else:
-                    last_message = _infer_last_message_brief(r["last_msg_type"], r["last_msg_sub_type"])
+                last_message = summary_or_brief(r)
         elif preview_mode in {"latest", "db"}:
-            if str(last_previews.get(username) or "").strip():
-                last_message = str(last_previews.get(username) or "").strip()
-            elif preview_mode != "none":
-                summary_text = _decode_sqlite_text(r["summary"]).strip()
-                summary_text = re.sub(r"\s+", " ", summary_text).strip()
-                if summary_text:
-                    last_message = summary_text
-                else:
-                    last_message = _infer_last_message_brief(r["last_msg_type"], r["last_msg_sub_type"])
-        elif preview_mode != "none":
-            summary_text = _decode_sqlite_text(r["summary"]).strip()
-            summary_text = re.sub(r"\s+", " ", summary_text).strip()
-            if summary_text:
-                last_message = summary_text
+            latest_preview = str(get_last_preview(username) or "").strip()
+            if latest_preview:
+                last_message = latest_preview
             else:
-                last_message = _infer_last_message_brief(r["last_msg_type"], r["last_msg_sub_type"])
+                last_message = summary_or_brief(r)
+        elif preview_mode != "none":
+            last_message = summary_or_brief(r)
 
         # SessionTable can lag behind message_*.db. If the parsed latest-message cache is newer,
         # prefer it for the sidebar preview even in realtime/session preview mode.
@@ -4975,17 +5000,17 @@ def list_chat_sessions(
             if last_msg_type == 81604378673 or (last_msg_type == 49 and last_msg_sub_type == 19):
                 last_message = "[聊天记录]"
             elif last_msg_type == 48:
-                text = re.sub(r"\s+", " ", str(last_message or "").strip()).strip()
-                text = re.sub(r"^\[location\]", "", text, flags=re.IGNORECASE).strip()
+                text = _SESSION_WS_RUN_RE.sub(" ", str(last_message or "").strip()).strip()
+                text = _SESSION_LOCATION_PREFIX_RE.sub("", text).strip()
                 text = re.sub(r"^\[位置\]", "", text).strip()
                 last_message = f"[位置]{text}" if text else "[位置]"
 
         last_message = _normalize_session_preview_text(
             last_message,
-            is_group=bool(str(username or "").endswith("@chatroom")),
+            is_group=is_group,
             sender_display_names=group_sender_display_names,
         )
-        if str(username or "").endswith("@chatroom") and str(last_message or "") and not str(last_message).startswith("[草稿]"):
+        if is_group and str(last_message or "") and not str(last_message).startswith("[草稿]"):
             # Prefer group card nickname when available. In realtime mode, WCDB session rows can provide
             # `last_sender_display_name`, but we may still get a summary that doesn't include "sender:".
             # Also guard against URL schemes like "https://..." being mis-parsed as "https: //...".
@@ -4999,11 +5024,11 @@ def list_chat_sessions(
                     raw_sender_display = ""
             sender_display = _decode_sqlite_text(raw_sender_display).strip()
             if sender_display:
-                text = re.sub(r"\s+", " ", str(last_message or "").strip()).strip()
-                match = re.match(r"^([^:\n]{1,128}):\s*(.+)$", text)
+                text = _SESSION_WS_RUN_RE.sub(" ", str(last_message or "").strip()).strip()
+                match = _SESSION_SENDER_PREFIX_RE.match(text)
                 if match:
                     prefix = str(match.group(1) or "").strip()
-                    body = re.sub(r"\s+", " ", str(match.group(2) or "").strip()).strip()
+                    body = _SESSION_WS_RUN_RE.sub(" ", str(match.group(2) or "").strip()).strip()
                     if prefix.lower() in {"http", "https"} and body.startswith("//"):
                         last_message = f"{sender_display}: {text}"
                     else:
@@ -5011,9 +5036,9 @@ def list_chat_sessions(
                 else:
                     last_message = f"{sender_display}: {text}"
 
-        last_time = _format_session_time(max(row_sort_ts, row_last_ts, latest_meta_ts))
+        last_time = _format_session_time(max(row_sort_ts, row_last_ts, latest_meta_ts), now=now)
 
-        sessions.append(
+        append_session(
             {
                 "id": username,
                 "username": username,
@@ -5022,8 +5047,8 @@ def list_chat_sessions(
                 "lastMessage": last_message,
                 "lastMessageTime": last_time,
                 "unreadCount": int(r["unread_count"] or 0),
-                "isGroup": bool(username.endswith("@chatroom")),
-                "isTop": bool(top_flags.get(str(username or "").strip(), False)),
+                "isGroup": is_group,
+                "isTop": bool(get_top_flag(username_key, False)),
             }
         )
 
@@ -5046,6 +5071,222 @@ def list_chat_sessions(
     }
 
 
+# (db 路径, 表名) -> (库文件 stamp, 带 Name2Id JOIN 的 SQL 或 "", 不 JOIN 的 SQL)。
+# SQL 文本固定后，池化连接上 sqlite3 自带的语句缓存就能直接复用已 prepare 的语句；
+# 列探测（PRAGMA table_info）和 Name2Id 是否存在也只在库文件变化后才重新做。
+_MESSAGE_PAGE_SQL_CACHE: dict[tuple[str, str], tuple[Optional[tuple[int, int, int, int]], str, str]] = {}
+_MESSAGE_PAGE_SQL_CACHE_LOCK = threading.Lock()
+
+
+def _message_page_sql(conn: sqlite3.Connection, db_path: Path, table_name: str) -> tuple[str, str]:
+    key = (str(db_path), table_name)
+    stamp = _sqlite_file_stamp(db_path)
+    with _MESSAGE_PAGE_SQL_CACHE_LOCK:
+        cached = _MESSAGE_PAGE_SQL_CACHE.get(key)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        return cached[1], cached[2]
+
+    quoted_table = _quote_ident(table_name)
+    has_packed_info_data = False
+    has_msg_source = False
+    try:
+        cols = conn.execute(f"PRAGMA table_info({quoted_table})").fetchall()
+        col_names = {str(c[1] or "").strip().lower() for c in cols}
+        has_packed_info_data = "packed_info_data" in col_names
+        has_msg_source = "source" in col_names
+    except Exception:
+        has_packed_info_data = False
+        has_msg_source = False
+    try:
+        has_name2id = (
+            conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='Name2Id' LIMIT 1").fetchone()
+            is not None
+        )
+    except Exception:
+        has_name2id = True
+
+    packed_select = (
+        "m.packed_info_data AS packed_info_data, " if has_packed_info_data else "NULL AS packed_info_data, "
+    )
+    source_select = "m.source AS msg_source, " if has_msg_source else "NULL AS msg_source, "
+    sql_with_join = (
+        "SELECT "
+        "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
+        "m.message_content, m.compress_content, "
+        + packed_select
+        + source_select
+        + "n.user_name AS sender_username "
+        f"FROM {quoted_table} m "
+        "LEFT JOIN Name2Id n ON m.real_sender_id = n.rowid "
+        "ORDER BY m.create_time DESC, m.sort_seq DESC, m.local_id DESC "
+        "LIMIT ?"
+    )
+    sql_no_join = (
+        "SELECT "
+        "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
+        "m.message_content, m.compress_content, "
+        + packed_select
+        + source_select
+        + "'' AS sender_username "
+        f"FROM {quoted_table} m "
+        "ORDER BY m.create_time DESC, m.sort_seq DESC, m.local_id DESC "
+        "LIMIT ?"
+    )
+    if not has_name2id:
+        sql_with_join = ""
+
+    if stamp is not None:
+        with _MESSAGE_PAGE_SQL_CACHE_LOCK:
+            if len(_MESSAGE_PAGE_SQL_CACHE) >= 512:
+                _MESSAGE_PAGE_SQL_CACHE.clear()
+            _MESSAGE_PAGE_SQL_CACHE[key] = (stamp, sql_with_join, sql_no_join)
+    return sql_with_join, sql_no_join
+
+
+_MESSAGE_FETCH_MAX_WORKERS = 8
+
+
+# (db 路径, 会话 username, 自己的 wxid) -> (库文件 stamp, 消息表名, 自己在 Name2Id 里的 rowid)。
+# 两者只随库文件变化；命中时翻页请求省掉表名解析（PRAGMA 探测）和 Name2Id 查询。
+_MESSAGE_PAGE_META_CACHE: dict[tuple[str, str, str], tuple[tuple[int, int, int, int], Optional[str], Optional[int]]] = {}
+_MESSAGE_PAGE_META_CACHE_LOCK = threading.Lock()
+_MESSAGE_PAGE_META_CACHE_MAX_ENTRIES = 4096
+
+
+def _message_page_meta(
+    conn: sqlite3.Connection,
+    db_path: Path,
+    *,
+    username: str,
+    my_wxid: str,
+) -> tuple[Optional[str], Optional[int]]:
+    key = (str(db_path), username, my_wxid)
+    stamp = _sqlite_file_stamp(db_path)
+    with _MESSAGE_PAGE_META_CACHE_LOCK:
+        cached = _MESSAGE_PAGE_META_CACHE.get(key)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        return cached[1], cached[2]
+
+    table_name = _resolve_msg_table_name(conn, username)
+    my_rowid = None
+    if table_name:
+        try:
+            r = conn.execute(
+                "SELECT rowid FROM Name2Id WHERE user_name = ? LIMIT 1",
+                (my_wxid,),
+            ).fetchone()
+            if r is not None:
+                my_rowid = int(r[0])
+        except Exception:
+            my_rowid = None
+
+    if stamp is not None:
+        with _MESSAGE_PAGE_META_CACHE_LOCK:
+            if len(_MESSAGE_PAGE_META_CACHE) >= _MESSAGE_PAGE_META_CACHE_MAX_ENTRIES:
+                _MESSAGE_PAGE_META_CACHE.clear()
+            _MESSAGE_PAGE_META_CACHE[key] = (stamp, table_name, my_rowid)
+    return table_name, my_rowid
+
+
+def _fetch_message_page(
+    db_path: Path,
+    *,
+    username: str,
+    my_wxid: str,
+    take_probe: int,
+) -> Optional[tuple[str, Optional[int], list[sqlite3.Row]]]:
+    """单个 message_*.db 的取数部分：解析表名、自己的 rowid，按页 SELECT。
+
+    返回 `(table_name, my_rowid, rows)`；库里没有该会话的表时返回 None。
+    """
+    with _pooled_read_connection(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        table_name, my_rowid = _message_page_meta(conn, db_path, username=username, my_wxid=my_wxid)
+        if not table_name:
+            return None
+
+        sql_with_join, sql_no_join = _message_page_sql(conn, db_path, table_name)
+
+        # Force sqlite3 to return TEXT as raw bytes for this query, so we can zstd-decompress
+        # compress_content reliably.
+        conn.text_factory = bytes
+
+        rows = None
+        if sql_with_join:
+            try:
+                rows = conn.execute(sql_with_join, (take_probe,)).fetchall()
+            except Exception:
+                rows = None
+        if rows is None:
+            rows = conn.execute(sql_no_join, (take_probe,)).fetchall()
+    return table_name, my_rowid, rows
+
+
+def _fetch_message_pages(
+    db_paths: list[Path],
+    *,
+    username: str,
+    my_wxid: str,
+    take_probe: int,
+) -> list[Any]:
+    """按 db_paths 顺序返回每个库的 `_fetch_message_page` 结果；损坏的库返回对应的 DatabaseError。
+
+    多个分库时并发取数（sqlite 执行查询期间会释放 GIL），耗时取决于最慢的库而不是各库之和。
+    """
+
+    def fetch(db_path: Path) -> Any:
+        try:
+            return _fetch_message_page(db_path, username=username, my_wxid=my_wxid, take_probe=take_probe)
+        except sqlite3.DatabaseError as e:
+            return e
+
+    if len(db_paths) <= 1:
+        return [fetch(p) for p in db_paths]
+    with ThreadPoolExecutor(max_workers=min(_MESSAGE_FETCH_MAX_WORKERS, len(db_paths))) as pool:
+        return list(pool.map(fetch, db_paths))
+
+
+def _limit_message_pages(pages: list[Any], take: int) -> bool:
+    """把各分库的页裁到调用方最终会用到的行，返回是否还有更多消息。
+
+    每个库各取了 take+1 行，但合并后按 (create_time, sort_seq, local_id) 倒序只会用到全局
+    最新的 take 行；在逐行解码（zstd 解压、XML 解析）之前就把其余行丢掉。原地修改 pages。
+    """
+    has_more = False
+    live: list[int] = []
+    for i, page in enumerate(pages):
+        if not isinstance(page, tuple):
+            continue
+        table_name, my_rowid, rows = page
+        if len(rows) > take:
+            has_more = True
+            rows = rows[:take]
+            pages[i] = (table_name, my_rowid, rows)
+        if rows:
+            live.append(i)
+    if len(live) <= 1:
+        return has_more
+
+    ranked: list[tuple[tuple[int, int, int], int, int]] = []
+    for i in live:
+        for j, r in enumerate(pages[i][2]):
+            sort_seq = int(r["sort_seq"] or 0) if r["sort_seq"] is not None else 0
+            ranked.append(((int(r["create_time"] or 0), sort_seq, int(r["local_id"] or 0)), i, j))
+    if len(ranked) <= take:
+        return has_more
+
+    # 与 list_chat_messages 的排序一致（稳定排序，并列时保持库顺序）。
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    keep: dict[int, set[int]] = {i: set() for i in live}
+    for _key, i, j in ranked[:take]:
+        keep[i].add(j)
+    for i in live:
+        table_name, my_rowid, rows = pages[i]
+        kept = keep[i]
+        pages[i] = (table_name, my_rowid, [r for j, r in enumerate(rows) if j in kept])
+    return True
+
+
 def _collect_chat_messages(
     *,
     username: str,
@@ -5057,6 +5298,7 @@ def _collect_chat_messages(
     want_types: Optional[set[str]],
 ) -> tuple[list[dict[str, Any]], bool, list[str], list[str], set[str]]:
     is_group = bool(username.endswith("@chatroom"))
+    my_username = account_dir.name
     take = int(take)
     if take < 0:
         take = 0
@@ -5066,7 +5308,6 @@ def _collect_chat_messages(
     sender_usernames: list[str] = []
     quote_usernames: list[str] = []
     pat_usernames: set[str] = set()
-    has_more_any = False
 
     contact_conn: Optional[sqlite3.Connection] = None
     alias_cache: dict[str, str] = {}
@@ -5078,78 +5319,17 @@ def _collect_chat_messages(
         except Exception:
             contact_conn = None
 
-    for db_path in db_paths:
-        conn: Optional[sqlite3.Connection] = None
+    pages = _fetch_message_pages(db_paths, username=username, my_wxid=my_username, take_probe=take_probe)
+    has_more_any = _limit_message_pages(pages, take)
+    for db_path, page in zip(db_paths, pages):
         try:
-            conn = sqlite3.connect(str(db_path))
-            conn.row_factory = sqlite3.Row
-            table_name = _resolve_msg_table_name(conn, username)
-            if not table_name:
+            if isinstance(page, BaseException):
+                raise page
+            if page is None:
                 continue
+            table_name, my_rowid, rows = page
 
-            my_wxid = account_dir.name
-            my_rowid = None
-            try:
-                r = conn.execute(
-                    "SELECT rowid FROM Name2Id WHERE user_name = ? LIMIT 1",
-                    (my_wxid,),
-                ).fetchone()
-                if r is not None:
-                    my_rowid = int(r[0])
-            except Exception:
-                my_rowid = None
-
-            quoted_table = _quote_ident(table_name)
-            has_packed_info_data = False
-            has_msg_source = False
-            try:
-                cols = conn.execute(f"PRAGMA table_info({quoted_table})").fetchall()
-                col_names = {str(c[1] or "").strip().lower() for c in cols}
-                has_packed_info_data = "packed_info_data" in col_names
-                has_msg_source = "source" in col_names
-            except Exception:
-                has_packed_info_data = False
-                has_msg_source = False
-
-            packed_select = (
-                "m.packed_info_data AS packed_info_data, " if has_packed_info_data else "NULL AS packed_info_data, "
-            )
-            source_select = "m.source AS msg_source, " if has_msg_source else "NULL AS msg_source, "
-            sql_with_join = (
-                "SELECT "
-                "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
-                "m.message_content, m.compress_content, "
-                + packed_select
-                + source_select
-                + "n.user_name AS sender_username "
-                f"FROM {quoted_table} m "
-                "LEFT JOIN Name2Id n ON m.real_sender_id = n.rowid "
-                "ORDER BY m.create_time DESC, m.sort_seq DESC, m.local_id DESC "
-                "LIMIT ?"
-            )
-            sql_no_join = (
-                "SELECT "
-                "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
-                "m.message_content, m.compress_content, "
-                + packed_select
-                + source_select
-                + "'' AS sender_username "
-                f"FROM {quoted_table} m "
-                "ORDER BY m.create_time DESC, m.sort_seq DESC, m.local_id DESC "
-                "LIMIT ?"
-            )
-
-            # Force sqlite3 to return TEXT as raw bytes for this query, so we can zstd-decompress
-            # compress_content reliably.
-            conn.text_factory = bytes
-
-            try:
-                rows = conn.execute(sql_with_join, (take_probe,)).fetchall()
-            except Exception:
-                rows = conn.execute(sql_no_join, (take_probe,)).fetchall()
-            if len(rows) > take:
-                has_more_any = True
-                rows = rows[:take]
+            resource_md5_prefetched = _prefetch_resource_md5(resource_conn, resource_chat_id, rows)
 
             for r in rows:
                 local_id = int(r["local_id"] or 0)
@@ -5193,9 +5373,9 @@ def _collect_chat_messages(
                         sender_username = xml_sender
 
                 if is_sent:
-                    sender_username = account_dir.name
-                elif (not is_group) and (not sender_username):
-                    sender_username = username
+                    sender_username = my_username
+                elif not is_group:
+                    sender_username = sender_username or username
 
                 render_type = "text"
                 content_text = raw_text
@@ -5291,8 +5471,7 @@ def _collect_chat_messages(
                     render_type = "system"
                     template = _extract_xml_tag_text(raw_text, "template")
                     if template:
-                        # import re
-                        pat_usernames.update({m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", template) if m.group(1)})
+                        pat_usernames.update(_iter_template_placeholders(template))
                         content_text = "[拍一拍]"
                     else:
                         content_text = "[拍一拍]"
@@ -5333,7 +5512,8 @@ def _collect_chat_messages(
                     # (especially for *_t.dat thumbnails), causing the media endpoint to 404.
                     if resource_conn is not None:
                         try:
-                            resource_md5 = _lookup_resource_md5(
+                            resource_md5 = _lookup_resource_md5_prefetched(
+                                resource_md5_prefetched,
                                 resource_conn,
                                 resource_chat_id,
                                 message_local_type=local_type,
@@ -5385,18 +5565,19 @@ def _collect_chat_messages(
 
                     video_thumb_url = (
                         video_thumb_url_or_id
-                        if str(video_thumb_url_or_id or "").strip().lower().startswith(("http://", "https://"))
+                        if _is_http_url(video_thumb_url_or_id)
                         else ""
                     )
                     video_url = (
                         video_url_or_id
-                        if str(video_url_or_id or "").strip().lower().startswith(("http://", "https://"))
+                        if _is_http_url(video_url_or_id)
                         else ""
                     )
                     video_thumb_file_id = "" if video_thumb_url else (str(video_thumb_url_or_id or "").strip() or "")
                     video_file_id = "" if video_url else (str(video_url_or_id or "").strip() or "")
                     if (not video_thumb_md5) and resource_conn is not None:
-                        video_thumb_md5 = _lookup_resource_md5(
+                        video_thumb_md5 = _lookup_resource_md5_prefetched(
+                            resource_md5_prefetched,
                             resource_conn,
                             resource_chat_id,
                             message_local_type=local_type,
@@ -5434,7 +5615,8 @@ def _collect_chat_messages(
                     if not emoji_url:
                         emoji_url = _extract_xml_tag_text(raw_text, "cdn_url")
                     if (not emoji_md5) and resource_conn is not None:
-                        emoji_md5 = _lookup_resource_md5(
+                        emoji_md5 = _lookup_resource_md5_prefetched(
+                            resource_md5_prefetched,
                             resource_conn,
                             resource_chat_id,
                             message_local_type=local_type,
@@ -5477,9 +5659,9 @@ def _collect_chat_messages(
                     if not content_text:
                         content_text = _infer_message_brief_by_local_type(local_type)
                     else:
-                        if content_text.startswith("<") or content_text.startswith('"<'):
+                        if content_text.startswith(("<", '"<')):
                             parsed_special = False
-                            if "<appmsg" in content_text.lower():
+                            if _has_appmsg_tag(content_text):
                                 parsed = _parse_app_message(content_text)
                                 rt = str(parsed.get("renderType") or "")
                                 if rt and rt != "text":
@@ -5614,9 +5796,6 @@ def _collect_chat_messages(
                 format_sqlite_diagnostics(collect_sqlite_diagnostics(db_path, quick_check=True)),
             )
             continue
-        finally:
-            if conn is not None:
-                conn.close()
 
     if contact_conn is not None:
         try:
@@ -6141,7 +6320,8 @@ def get_chat_message_anchor(
     return resp
 
 
-@router.get("/api/chat/messages", summary="获取会话消息列表")
+# 消息页较大：声明 dict[str, Any] 让 FastAPI 走 pydantic-core 序列化，跳过逐层递归的 jsonable_encoder
+@router.get("/api/chat/messages", summary="获取会话消息列表", response_model=dict[str, Any])
 def list_chat_messages(
     request: Request,
     username: str,
@@ -6211,21 +6391,8 @@ def list_chat_messages(
                 "message": "No message databases found for this account.",
             }
 
-    resource_conn: Optional[sqlite3.Connection] = None
-    resource_chat_id: Optional[int] = None
-    try:
-        if message_resource_db_path.exists():
-            resource_conn = sqlite3.connect(str(message_resource_db_path))
-            resource_conn.row_factory = sqlite3.Row
-            resource_chat_id = _resource_lookup_chat_id(resource_conn, username)
-    except Exception:
-        if resource_conn is not None:
-            try:
-                resource_conn.close()
-            except Exception:
-                pass
-        resource_conn = None
-        resource_chat_id = None
+    # 延迟连接：只有真的要查图片/视频/表情的资源 md5 时才打开 message_resource.db。
+    resource_conn, resource_chat_id = _open_message_resource(message_resource_db_path, username)
 
     trace(
         "resource-db:resolved",
@@ -6991,13 +7158,7 @@ def list_chat_messages(
 
     _postprocess_transfer_messages(merged)
 
-    def sort_key(m: dict[str, Any]) -> tuple[int, int, int]:
-        sseq = int(m.get("sortSeq") or 0)
-        cts = int(m.get("createTime") or 0)
-        lid = int(m.get("localId") or 0)
-        return (cts, sseq, lid)
-
-    merged.sort(key=sort_key, reverse=True)
+    merged.sort(key=_MESSAGE_ORDER_KEY, reverse=True)
     next_scan_offset: Optional[int] = None
     next_filter_offset: Optional[int] = None
     if progressive_filter:
@@ -7090,7 +7251,7 @@ def list_chat_messages(
         template = _extract_xml_tag_text(raw, "template")
         if not template:
             continue
-        pat_usernames_in_page.update({mm.group(1) for mm in re.finditer(r"\$\{([^}]+)\}", template) if mm.group(1)})
+        pat_usernames_in_page.update(_iter_template_placeholders(template))
 
     system_usernames_in_page: set[str] = set()
     for m in messages_window:
@@ -7170,6 +7331,11 @@ def list_chat_messages(
         groupNicknameCount=len(group_nicknames),
     )
 
+    # 媒体回退 URL 里账号和会话两段对整页都一样，循环外 quote 一次
+    media_base = base_url + "/api/chat/media/"
+    account_q = quote(account_dir.name)
+    username_q = quote(username)
+
     for m in messages_window:
         # If appmsg doesn't provide sourcedisplayname, try mapping sourceusername to display name.
         if (not str(m.get("from") or "").strip()) and str(m.get("fromUsername") or "").strip():
@@ -7229,13 +7395,13 @@ def list_chat_messages(
                     file_id = str(m.get("imageFileId") or "").strip()
                     if md5:
                         m["imageUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
                     elif file_id:
                         m["imageUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&file_id={quote(file_id)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&file_id={quote(file_id)}&username={username_q}"
                         )
             elif rt == "emoji":
                 md5 = str(m.get("emojiMd5") or "")
@@ -7256,51 +7422,51 @@ def list_chat_messages(
                             pass
 
                         m["emojiUrl"] = (
-                            base_url
-                            + f"/api/chat/media/emoji?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"emoji?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
                     elif (not str(m.get("emojiUrl") or "")):
                         m["emojiUrl"] = (
-                            base_url
-                            + f"/api/chat/media/emoji?account={quote(account_dir.name)}&md5={quote(md5)}&username={quote(username)}"
+                            media_base
+                            + f"emoji?account={account_q}&md5={quote(md5)}&username={username_q}"
                         )
             elif rt == "video":
                 video_thumb_url = str(m.get("videoThumbUrl") or "").strip()
                 video_thumb_md5 = str(m.get("videoThumbMd5") or "").strip()
                 video_thumb_file_id = str(m.get("videoThumbFileId") or "").strip()
                 if (not video_thumb_url) or (
-                    not video_thumb_url.lower().startswith(("http://", "https://"))
+                    not _is_http_url(video_thumb_url)
                 ):
                     if video_thumb_md5:
                         m["videoThumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video_thumb?account={quote(account_dir.name)}&md5={quote(video_thumb_md5)}&username={quote(username)}"
+                            media_base
+                            + f"video_thumb?account={account_q}&md5={quote(video_thumb_md5)}&username={username_q}"
                             + (f"&file_id={quote(video_thumb_file_id)}" if video_thumb_file_id else "")
                         )
                     elif video_thumb_file_id:
                         m["videoThumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video_thumb?account={quote(account_dir.name)}&file_id={quote(video_thumb_file_id)}&username={quote(username)}"
+                            media_base
+                            + f"video_thumb?account={account_q}&file_id={quote(video_thumb_file_id)}&username={username_q}"
                         )
 
                 video_url = str(m.get("videoUrl") or "").strip()
                 video_md5 = str(m.get("videoMd5") or "").strip()
                 video_file_id = str(m.get("videoFileId") or "").strip()
-                if (not video_url) or (not video_url.lower().startswith(("http://", "https://"))):
+                if (not video_url) or (not _is_http_url(video_url)):
                     if video_md5:
                         m["videoUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video?account={quote(account_dir.name)}&md5={quote(video_md5)}&username={quote(username)}"
+                            media_base
+                            + f"video?account={account_q}&md5={quote(video_md5)}&username={username_q}"
                             + (f"&file_id={quote(video_file_id)}" if video_file_id else "")
                         )
                     elif video_file_id:
                         m["videoUrl"] = (
-                            base_url
-                            + f"/api/chat/media/video?account={quote(account_dir.name)}&file_id={quote(video_file_id)}&username={quote(username)}"
+                            media_base
+                            + f"video?account={account_q}&file_id={quote(video_file_id)}&username={username_q}"
                         )
             elif rt == "link":
                 thumb_url = str(m.get("thumbUrl") or "").strip()
-                if thumb_url and (not thumb_url.lower().startswith(("http://", "https://"))):
+                if thumb_url and (not _is_http_url(thumb_url)):
                     try:
                         lid = int(m.get("localId") or 0)
                     except Exception:
@@ -7312,14 +7478,14 @@ def list_chat_messages(
                     if lid > 0 and ct > 0:
                         file_id = f"{lid}_{ct}"
                         m["thumbUrl"] = (
-                            base_url
-                            + f"/api/chat/media/image?account={quote(account_dir.name)}&file_id={quote(file_id)}&username={quote(username)}"
+                            media_base
+                            + f"image?account={account_q}&file_id={quote(file_id)}&username={username_q}"
                         )
             elif rt == "voice":
                 if str(m.get("serverId") or ""):
                     sid = int(m.get("serverId") or 0)
                     if sid:
-                        m["voiceUrl"] = base_url + f"/api/chat/media/voice?account={quote(account_dir.name)}&server_id={sid}"
+                        m["voiceUrl"] = media_base + f"voice?account={account_q}&server_id={sid}"
         except Exception:
             pass
 
@@ -8108,7 +8274,7 @@ async def search_chat_messages(
 
 
 
-@router.get("/api/chat/messages/around", summary="定位到某条消息并返回上下文")
+@router.get("/api/chat/messages/around", summary="定位到某条消息并返回上下文", response_model=dict[str, Any])
 async def get_chat_messages_around(
     request: Request,
     username: str,
@@ -8218,21 +8384,8 @@ async def get_chat_messages_around(
             end = min(len(rows_asc), int(anchor_index_all) + int(after) + 1)
             window_rows = rows_asc[start:end]
 
-            resource_conn: Optional[sqlite3.Connection] = None
-            resource_chat_id: Optional[int] = None
-            try:
-                if message_resource_db_path.exists():
-                    resource_conn = sqlite3.connect(str(message_resource_db_path))
-                    resource_conn.row_factory = sqlite3.Row
-                    resource_chat_id = _resource_lookup_chat_id(resource_conn, username)
-            except Exception:
-                if resource_conn is not None:
-                    try:
-                        resource_conn.close()
-                    except Exception:
-                        pass
-                resource_conn = None
-                resource_chat_id = None
+            # 延迟连接：只有真的要查图片/视频/表情的资源 md5 时才打开 message_resource.db。
+            resource_conn, resource_chat_id = _open_message_resource(message_resource_db_path, username)
 
             return_messages: list[dict[str, Any]] = []
             sender_usernames_win: list[str] = []
@@ -8342,22 +8495,8 @@ async def get_chat_messages_around(
         )
         raise HTTPException(status_code=404, detail="Anchor database not found.")
 
-    # Open resource DB once (optional), and reuse for all message DBs.
-    resource_conn: Optional[sqlite3.Connection] = None
-    resource_chat_id: Optional[int] = None
-    try:
-        if message_resource_db_path.exists():
-            resource_conn = sqlite3.connect(str(message_resource_db_path))
-            resource_conn.row_factory = sqlite3.Row
-            resource_chat_id = _resource_lookup_chat_id(resource_conn, username)
-    except Exception:
-        if resource_conn is not None:
-            try:
-                resource_conn.close()
-            except Exception:
-                pass
-        resource_conn = None
-        resource_chat_id = None
+    # Open resource DB once (optional, lazily on first query), and reuse for all message DBs.
+    resource_conn, resource_chat_id = _open_message_resource(message_resource_db_path, username)
 
     # Resolve anchor message tuple from its DB.
     anchor_ct = 0
@@ -8682,16 +8821,8 @@ async def get_chat_messages_around(
         merged = deduped
 
     def sort_key_global(m: dict[str, Any]) -> tuple[int, int, str, int]:
-        cts = int(m.get("createTime") or 0)
-        sseq = int(m.get("sortSeq") or 0)
-        lid = int(m.get("localId") or 0)
-        mid = str(m.get("id") or "")
-        stem2 = ""
-        try:
-            stem2 = mid.split(":", 1)[0] if ":" in mid else ""
-        except Exception:
-            stem2 = ""
-        return (cts, sseq, stem2, lid)
+        stem2, sep, _rest = str(m.get("id") or "").partition(":")
+        return (m["createTime"], m["sortSeq"], stem2 if sep else "", m["localId"])
 
     merged.sort(key=sort_key_global, reverse=False)
 
@@ -8739,7 +8870,7 @@ async def get_chat_messages_around(
             template = _extract_xml_tag_text(raw, "template")
             if not template:
                 continue
-            pat_usernames_win.update({mm.group(1) for mm in re.finditer(r"\$\{([^}]+)\}", template) if mm.group(1)})
+            pat_usernames_win.update(_iter_template_placeholders(template))
     except Exception:
         pat_usernames_win = set()
 
@@ -14,18 +14,6 @@ from typing import Any, Callable, Literal, Optional
 from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 
-try:
-    from pypinyin import Style, lazy_pinyin
-except Exception:  # pragma: no cover - depends on optional runtime package availability
-    class Style:  # type: ignore[no-redef]
-        NORMAL = "normal"
-
-    def lazy_pinyin(value: Any, *args: Any, **kwargs: Any) -> list[str]:  # type: ignore[no-redef]
-        text = str(value or "")
-        # Fallback without pypinyin: keep ASCII segments for deterministic sorting,
-        # and place CJK/emoji under '#'. This keeps contacts API usable in minimal envs.
-        return [text] if text.isascii() else []
-
 from ..chat_helpers import (
     _build_avatar_url,
     _pick_avatar_url,
@@ -58,6 +46,28 @@ from ..wcdb_realtime import (
 router = APIRouter(route_class=PathFixRoute)
 
 
+def _fallback_lazy_pinyin(value: Any, *args: Any, **kwargs: Any) -> list[str]:
+    text = str(value or "")
+    # Fallback without pypinyin: keep ASCII segments for deterministic sorting,
+    # and place CJK/emoji under '#'. This keeps contacts API usable in minimal envs.
+    return [text] if text.isascii() else []
+
+
+@lru_cache(maxsize=1)
+def _load_lazy_pinyin() -> Callable[..., list[str]]:
+    # pypinyin loads its phrase dictionaries on import (hundreds of ms); defer it
+    # until a contact list actually needs pinyin keys instead of at API startup.
+    try:
+        from pypinyin import Style, lazy_pinyin
+    except Exception:  # pragma: no cover - depends on optional runtime package availability
+        return _fallback_lazy_pinyin
+
+    def _convert(value: str, *, errors: str = "default") -> list[str]:
+        return lazy_pinyin(value, style=Style.NORMAL, errors=errors)
+
+    return _convert
+
+
 _SYSTEM_USERNAMES = {
     "filehelper",
     "fmessage",
@@ -457,9 +467,9 @@ def _build_contact_pinyin_key(name: str) -> str:
         rest = text[1:]
         parts = [override]
         if rest:
-            parts.extend(lazy_pinyin(rest, style=Style.NORMAL, errors="default"))
+            parts.extend(_load_lazy_pinyin()(rest, errors="default"))
     else:
-        parts = lazy_pinyin(text, style=Style.NORMAL, errors="default")
+        parts = _load_lazy_pinyin()(text, errors="default")
     out: list[str] = []
     for part in parts:
         cleaned = _PINYIN_CLEAN_RE.sub("", _normalize_text(part).lower())
@@ -485,7 +495,7 @@ def _build_contact_pinyin_initial(name: str) -> str:
         return override[0].upper()
 
     # For CJK, try to convert the first character to pinyin initial.
-    parts = lazy_pinyin(first, style=Style.NORMAL, errors="ignore")
+    parts = _load_lazy_pinyin()(first, errors="ignore")
     if parts:
         m = _PINYIN_ALPHA_RE.search(parts[0])
         if m:
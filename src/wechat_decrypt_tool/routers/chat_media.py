@@ -12,7 +12,7 @@ import sys
 import time
 import re
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from urllib.parse import urlparse
 
 import requests
@@ -53,9 +53,11 @@ from ..media_helpers import (
     _iter_emoji_source_candidates,
     _iter_media_source_candidates,
     _order_media_candidates,
+    _probe_plain_image_file,
     _read_and_maybe_decrypt_media,
     _resolve_account_db_storage_dir,
     _resolve_account_dir,
+    _resolve_account_media_dirs,
     _resolve_account_wxid_dir,
     _resolve_media_path_for_kind,
     _resolve_media_path_from_hardlink,
@@ -63,7 +65,13 @@ from ..media_helpers import (
     _try_find_decrypted_resource,
     _try_strip_media_prefix,
 )
-from ..chat_helpers import _extract_md5_from_packed_info, _load_contact_rows, _pick_avatar_url
+from ..chat_helpers import (
+    _extract_md5_from_packed_info,
+    _load_contact_rows,
+    _pick_avatar_url,
+    _pooled_read_connection,
+    _username_md5,
+)
 from ..path_fix import PathFixRoute
 from ..perf_trace import create_perf_trace
 from ..wcdb_realtime import WCDB_REALTIME, exec_query as _wcdb_exec_query, get_avatar_urls as _wcdb_get_avatar_urls
@@ -74,6 +82,8 @@ router = APIRouter(route_class=PathFixRoute)
 
 
 CHAT_MEDIA_BROWSER_CACHE_SECONDS = 24 * 60 * 60
+# 按 md5 寻址的媒体内容不会变化，浏览器可长期缓存且无需重新验证
+CHAT_MEDIA_IMMUTABLE_CACHE_SECONDS = 365 * 24 * 60 * 60
 
 VIDEO_DIR_INDEX_TTL_SECONDS = 90.0
 _VIDEO_DIR_INDEX_CACHE: dict[str, tuple[float, dict[str, dict[str, str]]]] = {}
@@ -338,6 +348,68 @@ def _build_cached_media_response(request: Optional[Request], data: bytes, media_
     return Response(content=payload, media_type=media_type, headers=headers)
 
 
+def _md5_media_etag(md5: Optional[str]) -> str:
+    v = str(md5 or "").strip().lower()
+    if len(v) != 32 or any(c not in "0123456789abcdef" for c in v):
+        return ""
+    return f'"{v}"'
+
+
+def _immutable_media_headers(etag: str) -> dict[str, str]:
+    return {
+        "Cache-Control": f"private, max-age={CHAT_MEDIA_IMMUTABLE_CACHE_SECONDS}, immutable",
+        "ETag": etag,
+    }
+
+
+def _if_none_match_hit(request: Optional[Request], etag: str) -> bool:
+    if (not etag) or request is None:
+        return False
+    try:
+        raw = str(request.headers.get("if-none-match") or "")
+    except Exception:
+        return False
+    for token in raw.split(","):
+        token = token.strip()
+        if token.startswith("W/"):
+            token = token[2:]
+        if token == etag:
+            return True
+    return False
+
+
+def _not_modified_response(request: Optional[Request], etag: str) -> Optional[Response]:
+    # 资源已按 md5 定位到（解密缓存 / hardlink）后才调用：命中 If-None-Match 时省掉读取和解密，直接 304。
+    # md5 ETag 与长期缓存只给按 md5 定位到的内容；深度扫描、file_id、远程等兜底结果调用方会清空 etag。
+    if _if_none_match_hit(request, etag):
+        return Response(status_code=304, headers=_immutable_media_headers(etag))
+    return None
+
+
+def _media_response(data: bytes, media_type: str, etag: str = "") -> Response:
+    # 未识别出类型（octet-stream）的结果可能只是暂时解不出来，不做长期缓存
+    headers = _immutable_media_headers(etag) if etag and media_type != "application/octet-stream" else None
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+def _build_cached_file_response(request: Optional[Request], path: Path, media_type: str, etag: str = "") -> Response:
+    # 明文文件直接交给 FileResponse（sendfile），ETag 取自文件 mtime/size（或调用方给出的 md5），无需读入内存
+    st = path.stat()
+    if etag:
+        headers = _immutable_media_headers(etag)
+    else:
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        headers = {
+            "Cache-Control": f"private, max-age={CHAT_MEDIA_BROWSER_CACHE_SECONDS}",
+            "ETag": etag,
+        }
+
+    if _if_none_match_hit(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(str(path), media_type=media_type, headers=headers, stat_result=st)
+
+
 def _image_candidate_variant_rank(path: Path) -> int:
     stem = str(path.stem or "").lower()
     if stem.endswith(("_b", ".b")):
@@ -514,7 +586,7 @@ def _chat_attach_hash_candidates(*values: str) -> list[str]:
         for match in re.finditer(r"(?i)(?:^|[^0-9a-f])([0-9a-f]{32})(?:$|[^0-9a-f])", u):
             out.append(str(match.group(1) or "").lower())
         try:
-            out.append(hashlib.md5(u.encode()).hexdigest())
+            out.append(_username_md5(u))
         except Exception:
             pass
     seen: set[str] = set()
@@ -1136,6 +1208,15 @@ def _fast_probe_record_video_in_chat_attach(
     return None
 
 
+def _query_head_image_row(head_image_db_path: Path, columns: str, username: str) -> Optional[tuple[Any, ...]]:
+    # 头像接口是 async 的，调用方用 asyncio.to_thread 跑这里，避免查询阻塞事件循环。
+    with _pooled_read_connection(head_image_db_path) as conn:
+        return conn.execute(
+            f"SELECT {columns} FROM head_image WHERE username = ? ORDER BY update_time DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+
+
 @router.get("/api/chat/avatar", summary="获取联系人头像")
 @router.head("/api/chat/avatar", include_in_schema=False)
 async def get_chat_avatar(username: str, account: Optional[str] = None, source: str = "auto"):
@@ -1190,83 +1271,72 @@ async def get_chat_avatar(username: str, account: Optional[str] = None, source:
         trace("response:error", result="head-image-db-missing")
         raise HTTPException(status_code=404, detail="head_image.db not found.")
 
-    conn = sqlite3.connect(str(head_image_db_path))
-    try:
-        meta = conn.execute(
-            "SELECT md5, update_time FROM head_image WHERE username = ? ORDER BY update_time DESC LIMIT 1",
-            (username,),
-        ).fetchone()
-        trace("head-image:meta", hasMeta=bool(meta and meta[0] is not None))
-        if meta and meta[0] is not None:
-            db_md5 = str(meta[0] or "").strip().lower()
+    meta = await asyncio.to_thread(_query_head_image_row, head_image_db_path, "md5, update_time", username)
+    trace("head-image:meta", hasMeta=bool(meta and meta[0] is not None))
+    if meta and meta[0] is not None:
+        db_md5 = str(meta[0] or "").strip().lower()
+        try:
+            db_update_time = int(meta[1] or 0)
+        except Exception:
+            db_update_time = 0
+
+        # Cache still valid against head_image metadata.
+        if cached_file is not None and user_entry:
+            cached_md5 = str(user_entry.get("source_md5") or "").strip().lower()
             try:
-                db_update_time = int(meta[1] or 0)
+                cached_update = int(user_entry.get("source_update_time") or 0)
             except Exception:
-                db_update_time = 0
-
-            # Cache still valid against head_image metadata.
-            if cached_file is not None and user_entry:
-                cached_md5 = str(user_entry.get("source_md5") or "").strip().lower()
-                try:
-                    cached_update = int(user_entry.get("source_update_time") or 0)
-                except Exception:
-                    cached_update = 0
-                if cached_md5 == db_md5 and cached_update == db_update_time:
-                    touch_avatar_cache_entry(account_name, str(user_entry.get("cache_key") or ""))
-                    headers = build_avatar_cache_response_headers(user_entry)
-                    trace(
-                        "response:ready",
-                        result="user-cache-hit-head-image-matched",
-                        mediaType=str(user_entry.get("media_type") or ""),
-                    )
-                    return FileResponse(
-                        str(cached_file),
-                        media_type=str(user_entry.get("media_type") or "application/octet-stream"),
-                        headers=headers,
-                    )
+                cached_update = 0
+            if cached_md5 == db_md5 and cached_update == db_update_time:
+                touch_avatar_cache_entry(account_name, str(user_entry.get("cache_key") or ""))
+                headers = build_avatar_cache_response_headers(user_entry)
+                trace(
+                    "response:ready",
+                    result="user-cache-hit-head-image-matched",
+                    mediaType=str(user_entry.get("media_type") or ""),
+                )
+                return FileResponse(
+                    str(cached_file),
+                    media_type=str(user_entry.get("media_type") or "application/octet-stream"),
+                    headers=headers,
+                )
 
-            # Refresh from blob (changed or first-load)
-            row = conn.execute(
-                "SELECT image_buffer FROM head_image WHERE username = ? ORDER BY update_time DESC LIMIT 1",
-                (username,),
-            ).fetchone()
-            if row and row[0] is not None:
-                data = bytes(row[0]) if isinstance(row[0], (memoryview, bytearray)) else row[0]
-                if not isinstance(data, (bytes, bytearray)):
-                    data = bytes(data)
-                trace("head-image:blob", bytes=len(data or b""))
-                if data:
-                    media_type = _detect_image_media_type(data)
-                    media_type = media_type if media_type.startswith("image/") else "application/octet-stream"
-                    entry, out_path = write_avatar_cache_payload(
-                        account_name,
-                        source_kind="user",
-                        username=user_key,
-                        payload=bytes(data),
-                        media_type=media_type,
-                        source_md5=db_md5,
-                        source_update_time=db_update_time,
-                        ttl_seconds=AVATAR_CACHE_TTL_SECONDS,
+        # Refresh from blob (changed or first-load)
+        row = await asyncio.to_thread(_query_head_image_row, head_image_db_path, "image_buffer", username)
+        if row and row[0] is not None:
+            data = bytes(row[0]) if isinstance(row[0], (memoryview, bytearray)) else row[0]
+            if not isinstance(data, (bytes, bytearray)):
+                data = bytes(data)
+            trace("head-image:blob", bytes=len(data or b""))
+            if data:
+                media_type = _detect_image_media_type(data)
+                media_type = media_type if media_type.startswith("image/") else "application/octet-stream"
+                entry, out_path = write_avatar_cache_payload(
+                    account_name,
+                    source_kind="user",
+                    username=user_key,
+                    payload=bytes(data),
+                    media_type=media_type,
+                    source_md5=db_md5,
+                    source_update_time=db_update_time,
+                    ttl_seconds=AVATAR_CACHE_TTL_SECONDS,
+                )
+                if entry and out_path:
+                    logger.debug(
+                        f"[avatar_cache_download] kind=user account={account_name} username={user_key} src=head_image"
                     )
-                    if entry and out_path:
-                        logger.debug(
-                            f"[avatar_cache_download] kind=user account={account_name} username={user_key} src=head_image"
-                        )
-                        headers = build_avatar_cache_response_headers(entry)
-                        trace("response:ready", result="head-image-blob-cache-write", mediaType=media_type, bytes=len(data))
-                        return FileResponse(str(out_path), media_type=media_type, headers=headers)
+                    headers = build_avatar_cache_response_headers(entry)
+                    trace("response:ready", result="head-image-blob-cache-write", mediaType=media_type, bytes=len(data))
+                    return FileResponse(str(out_path), media_type=media_type, headers=headers)
 
-                    # cache write failed: fallback to response bytes
-                    logger.warning(
-                        f"[avatar_cache_error] kind=user account={account_name} username={user_key} action=write_fallback"
-                    )
-                    trace("response:ready", result="head-image-blob-direct", mediaType=media_type, bytes=len(data))
-                    return Response(content=bytes(data), media_type=media_type)
+                # cache write failed: fallback to response bytes
+                logger.warning(
+                    f"[avatar_cache_error] kind=user account={account_name} username={user_key} action=write_fallback"
+                )
+                trace("response:ready", result="head-image-blob-direct", mediaType=media_type, bytes=len(data))
+                return Response(content=bytes(data), media_type=media_type)
 
-        # meta not found (no local avatar blob)
-        row = None
-    finally:
-        conn.close()
+    # meta not found (no local avatar blob)
 
     # 2) Fallback: remote avatar URL (contact/WCDB), cache by URL.
     remote_url = _resolve_avatar_remote_url(
@@ -1577,7 +1647,7 @@ def _lookup_image_md5_by_server_id_from_messages(account_dir_str: str, server_id
         return ""
 
     try:
-        chat_hash = hashlib.md5(username.encode()).hexdigest()
+        chat_hash = _username_md5(username)
     except Exception:
         return ""
     if not chat_hash:
@@ -1706,7 +1776,7 @@ def _lookup_image_md5_by_server_id_from_realtime_messages(account_dir_str: str,
         return ""
 
     try:
-        table_name = f"Msg_{hashlib.md5(username.encode()).hexdigest()}"
+        table_name = f"Msg_{_username_md5(username)}"
     except Exception:
         return ""
 
@@ -2430,9 +2500,8 @@ async def get_chat_image(
 
     # 回退：从微信数据目录实时定位并解密
     roots_started_at = time.perf_counter()
-    wxid_dir = _resolve_account_wxid_dir(account_dir)
+    wxid_dir, db_storage_dir = _resolve_account_media_dirs(account_dir)
     hardlink_db_path = account_dir / "hardlink.db"
-    db_storage_dir = _resolve_account_db_storage_dir(account_dir)
     hardlink_has_image_table = _hardlink_has_table_prefix(str(hardlink_db_path), "image_hardlink_info")
     trace(
         "roots:resolved",
@@ -2748,6 +2817,7 @@ async def get_chat_image(
 
 @router.get("/api/chat/media/emoji", summary="获取表情消息资源")
 async def get_chat_emoji(
+    request: Request,
     md5: str,
     account: Optional[str] = None,
     username: Optional[str] = None,
@@ -2757,26 +2827,48 @@ async def get_chat_emoji(
     if not md5:
         raise HTTPException(status_code=400, detail="Missing md5.")
     account_dir = _resolve_account_dir(account)
+    etag = _md5_media_etag(md5)
 
     # 优先从解密资源目录读取（更快）
     decrypted_path = _try_find_decrypted_resource(account_dir, md5.lower())
     if decrypted_path:
+        not_modified = _not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        media_type = _probe_plain_image_file(decrypted_path)
+        if media_type:
+            return _build_cached_file_response(request, decrypted_path, media_type, etag)
         data = decrypted_path.read_bytes()
         media_type = _detect_image_media_type(data[:32])
         if media_type != "application/octet-stream" and _is_probably_valid_image(data, media_type):
-            return Response(content=data, media_type=media_type)
+            return _media_response(data, media_type, etag)
         try:
             if decrypted_path.suffix.lower() in {".jpg", ".jpeg", ".png", ".gif", ".webp"}:
                 decrypted_path.unlink()
         except Exception:
             pass
 
-    wxid_dir = _resolve_account_wxid_dir(account_dir)
-    p = _resolve_media_path_for_kind(account_dir, kind="emoji", md5=str(md5), username=username)
+    wxid_dir, _db_storage_dir = _resolve_account_media_dirs(account_dir)
+    p = _resolve_media_path_for_kind(
+        account_dir, kind="emoji", md5=str(md5), username=username, allow_fallback_scan=False
+    )
+    if p:
+        not_modified = _not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+    else:
+        etag = ""
+        if wxid_dir:
+            hit = _fallback_search_media_by_md5(str(wxid_dir), str(md5), kind="emoji")
+            if hit:
+                p = Path(hit)
 
     data = b""
     media_type = "application/octet-stream"
     if p:
+        plain_media_type = _probe_plain_image_file(p)
+        if plain_media_type:
+            return _build_cached_file_response(request, p, plain_media_type, etag)
         data, media_type = _read_and_maybe_decrypt_media(p, account_dir=account_dir, weixin_root=wxid_dir)
 
     if media_type == "application/octet-stream":
@@ -2784,6 +2876,7 @@ async def get_chat_emoji(
         data2, mt2 = _try_fetch_emoticon_from_remote(account_dir, str(md5).lower())
         if data2 is not None and mt2:
             data, media_type = data2, mt2
+            etag = ""
 
     if media_type == "application/octet-stream" and emoji_url:
         # Some merged-forward records include CDN URLs and AES keys inside recordItem, but the md5
@@ -2821,6 +2914,7 @@ async def get_chat_emoji(
                     continue
                 if mt != "application/octet-stream":
                     data, media_type = data2, mt
+                    etag = ""
                     break
 
     if (not p) and media_type == "application/octet-stream":
@@ -2836,11 +2930,45 @@ async def get_chat_emoji(
                 out_path.write_bytes(data)
         except Exception:
             pass
-    return Response(content=data, media_type=media_type)
+    return _media_response(data, media_type, etag)
+
+
+def _resolve_video_lookup_roots(
+    account_dir: Path,
+    trace: Callable[..., Any],
+) -> tuple[Optional[Path], Optional[Path], Path, list[Path], bool]:
+    """视频/视频缩略图共用的查找根目录；找不到任何根目录时直接 404。"""
+    roots_started_at = time.perf_counter()
+    wxid_dir, db_storage_dir = _resolve_account_media_dirs(account_dir)
+    hardlink_db_path = account_dir / "hardlink.db"
+    hardlink_has_video_table = _hardlink_has_table_prefix(str(hardlink_db_path), "video_hardlink_info")
+
+    roots: list[Path] = []
+    if wxid_dir:
+        roots.append(wxid_dir)
+    if db_storage_dir:
+        roots.append(db_storage_dir)
+    trace(
+        "roots:resolved",
+        hasWxidDir=bool(wxid_dir),
+        wxidDir=str(wxid_dir or ""),
+        hasDbStorageDir=bool(db_storage_dir),
+        dbStorageDir=str(db_storage_dir or ""),
+        hardlinkHasVideoTable=bool(hardlink_has_video_table),
+        elapsedMsLocal=round((time.perf_counter() - roots_started_at) * 1000.0, 1),
+    )
+    if not roots:
+        trace("response:error", result="roots-not-found")
+        raise HTTPException(
+            status_code=404,
+            detail="wxid_dir/db_storage_path not found. Please decrypt with db_storage_path to enable media lookup.",
+        )
+    return wxid_dir, db_storage_dir, hardlink_db_path, roots, hardlink_has_video_table
 
 
 @router.get("/api/chat/media/video_thumb", summary="Get video thumbnail media")
 async def get_chat_video_thumb(
+    request: Request,
     md5: Optional[str] = None,
     file_id: Optional[str] = None,
     account: Optional[str] = None,
@@ -2876,6 +3004,7 @@ async def get_chat_video_thumb(
         deepScan=bool(deep_scan),
     )
     trace("request:start")
+    etag = _md5_media_etag(md5_norm)
 
     # Fast path: cached decoded thumbnail resource.
     if md5_norm:
@@ -2888,6 +3017,10 @@ async def get_chat_video_thumb(
             elapsedMsLocal=round((time.perf_counter() - cache_started_at) * 1000.0, 1),
         )
         if decrypted_path:
+            not_modified = _not_modified_response(request, etag)
+            if not_modified is not None:
+                trace("response:ready", result="not-modified")
+                return not_modified
             read_started_at = time.perf_counter()
             data = decrypted_path.read_bytes()
             media_type = _detect_image_media_type(data[:32])
@@ -2899,40 +3032,14 @@ async def get_chat_video_thumb(
                 elapsedMsLocal=round((time.perf_counter() - read_started_at) * 1000.0, 1),
             )
             trace("response:ready", result="decrypted-cache-hit", mediaType=media_type, bytes=len(data or b""))
-            return Response(content=data, media_type=media_type)
+            return _media_response(data, media_type, etag)
     else:
         trace("decrypted-cache:skipped", reason="missing-md5")
 
     # Fallback: locate and decode from WeChat data directories.
-    roots_started_at = time.perf_counter()
-    wxid_dir = _resolve_account_wxid_dir(account_dir)
-    hardlink_db_path = account_dir / "hardlink.db"
-    extra_roots: list[Path] = []
-    db_storage_dir = _resolve_account_db_storage_dir(account_dir)
-    hardlink_has_video_table = _hardlink_has_table_prefix(str(hardlink_db_path), "video_hardlink_info")
-    if db_storage_dir:
-        extra_roots.append(db_storage_dir)
-
-    roots: list[Path] = []
-    if wxid_dir:
-        roots.append(wxid_dir)
-    if db_storage_dir:
-        roots.append(db_storage_dir)
-    trace(
-        "roots:resolved",
-        hasWxidDir=bool(wxid_dir),
-        wxidDir=str(wxid_dir or ""),
-        hasDbStorageDir=bool(db_storage_dir),
-        dbStorageDir=str(db_storage_dir or ""),
-        hardlinkHasVideoTable=bool(hardlink_has_video_table),
-        elapsedMsLocal=round((time.perf_counter() - roots_started_at) * 1000.0, 1),
+    wxid_dir, db_storage_dir, hardlink_db_path, roots, hardlink_has_video_table = _resolve_video_lookup_roots(
+        account_dir, trace
     )
-    if not roots:
-        trace("response:error", result="roots-not-found")
-        raise HTTPException(
-            status_code=404,
-            detail="wxid_dir/db_storage_path not found. Please decrypt with db_storage_path to enable media lookup.",
-        )
 
     p: Optional[Path] = None
     allow_deep_scan = False
@@ -2953,6 +3060,15 @@ async def get_chat_video_thumb(
             path=str(p or ""),
             elapsedMsLocal=round((time.perf_counter() - hardlink_started_at) * 1000.0, 1),
         )
+        if p and "_thumb." in p.name.lower():
+            not_modified = _not_modified_response(request, etag)
+            if not_modified is not None:
+                trace("response:ready", result="not-modified")
+                return not_modified
+        else:
+            # hardlink 没有 `_thumb` 文件时会拿视频本体/同名图片顶替缩略图，这类替身同样不带 md5 ETag；
+            # 下面的兜底（视频索引/目录探测/深度扫描/file_id）找到的文件不一定就是这个 md5，不带 md5 ETag
+            etag = ""
 
         # WeFlow-style lookup: build a short-lived index of msg/video/YYYY-MM and resolve by local file token.
         if (not p) and (wxid_dir or db_storage_dir):
@@ -3053,6 +3169,11 @@ async def get_chat_video_thumb(
         trace("response:error", result="source-not-found", allowDeepScan=bool(allow_deep_scan))
         raise HTTPException(status_code=404, detail="Video thumbnail not found.")
 
+    plain_media_type = await asyncio.to_thread(_probe_plain_image_file, p)
+    if plain_media_type:
+        trace("response:ready", result="plain-file", mediaType=plain_media_type, path=str(p))
+        return _build_cached_file_response(request, p, plain_media_type, etag)
+
     read_started_at = time.perf_counter()
     data, media_type = await asyncio.to_thread(_read_and_maybe_decrypt_media, p, account_dir=account_dir, weixin_root=wxid_dir)
     trace(
@@ -3063,11 +3184,12 @@ async def get_chat_video_thumb(
         elapsedMsLocal=round((time.perf_counter() - read_started_at) * 1000.0, 1),
     )
     trace("response:ready", result="decoded", mediaType=media_type, bytes=len(data or b""))
-    return Response(content=data, media_type=media_type)
+    return _media_response(data, media_type, etag)
 
 
 @router.get("/api/chat/media/video", summary="Get video media")
 async def get_chat_video(
+    request: Request,
     md5: Optional[str] = None,
     file_id: Optional[str] = None,
     account: Optional[str] = None,
@@ -3103,6 +3225,7 @@ async def get_chat_video(
         deepScan=bool(deep_scan),
     )
     trace("request:start")
+    etag = _md5_media_etag(md5_norm)
 
     if md5_norm:
         # Fast path Range?
@@ -3115,41 +3238,20 @@ async def get_chat_video(
             elapsedMsLocal=round((time.perf_counter() - cache_started_at) * 1000.0, 1),
         )
         if decrypted_path:
+            not_modified = _not_modified_response(request, etag)
+            if not_modified is not None:
+                trace("response:ready", result="not-modified")
+                return not_modified
             mt = _guess_media_type_by_path(decrypted_path, fallback="video/mp4")
             trace("response:ready", result="decrypted-cache-hit", mediaType=mt, path=str(decrypted_path))
-            return FileResponse(str(decrypted_path), media_type=mt)
+            headers = _immutable_media_headers(etag) if etag else None
+            return FileResponse(str(decrypted_path), media_type=mt, headers=headers)
     else:
         trace("decrypted-cache:skipped", reason="missing-md5")
 
-    roots_started_at = time.perf_counter()
-    wxid_dir = _resolve_account_wxid_dir(account_dir)
-    hardlink_db_path = account_dir / "hardlink.db"
-    extra_roots: list[Path] = []
-    db_storage_dir = _resolve_account_db_storage_dir(account_dir)
-    hardlink_has_video_table = _hardlink_has_table_prefix(str(hardlink_db_path), "video_hardlink_info")
-    if db_storage_dir:
-        extra_roots.append(db_storage_dir)
-
-    roots: list[Path] = []
-    if wxid_dir:
-        roots.append(wxid_dir)
-    if db_storage_dir:
-        roots.append(db_storage_dir)
-    trace(
-        "roots:resolved",
-        hasWxidDir=bool(wxid_dir),
-        wxidDir=str(wxid_dir or ""),
-        hasDbStorageDir=bool(db_storage_dir),
-        dbStorageDir=str(db_storage_dir or ""),
-        hardlinkHasVideoTable=bool(hardlink_has_video_table),
-        elapsedMsLocal=round((time.perf_counter() - roots_started_at) * 1000.0, 1),
+    wxid_dir, db_storage_dir, hardlink_db_path, roots, hardlink_has_video_table = _resolve_video_lookup_roots(
+        account_dir, trace
     )
-    if not roots:
-        trace("response:error", result="roots-not-found")
-        raise HTTPException(
-            status_code=404,
-            detail="wxid_dir/db_storage_path not found. Please decrypt with db_storage_path to enable media lookup.",
-        )
 
     p: Optional[Path] = None
     allow_deep_scan = False
@@ -3170,6 +3272,14 @@ async def get_chat_video(
             path=str(p or ""),
             elapsedMsLocal=round((time.perf_counter() - hardlink_started_at) * 1000.0, 1),
         )
+        if p:
+            not_modified = _not_modified_response(request, etag)
+            if not_modified is not None:
+                trace("response:ready", result="not-modified")
+                return not_modified
+        else:
+            # 下面的兜底（视频索引/目录探测/深度扫描/file_id）找到的文件不一定就是这个 md5，不带 md5 ETag
+            etag = ""
         if (not p) and (wxid_dir or db_storage_dir):
             index_started_at = time.perf_counter()
             p = await asyncio.to_thread(
@@ -3262,6 +3372,7 @@ async def get_chat_video(
     if not p:
         trace("response:error", result="source-not-found", allowDeepScan=bool(allow_deep_scan))
         raise HTTPException(status_code=404, detail="Video not found.")
+    file_headers = _immutable_media_headers(etag) if etag else None
 
     # Fast path MP4??? FileResponse??? Range?
     probe_started_at = time.perf_counter()
@@ -3278,7 +3389,7 @@ async def get_chat_video(
         if is_plain_mp4:
             media_type = _guess_media_type_by_path(p, fallback="video/mp4")
             trace("response:ready", result="plain-file", mediaType=media_type, path=str(p))
-            return FileResponse(str(p), media_type=media_type)
+            return FileResponse(str(p), media_type=media_type, headers=file_headers)
     except Exception as e:
         trace(
             "decode:probe-plain-mp4",
@@ -3312,12 +3423,14 @@ async def get_chat_video(
         if materialized:
             media_type = _guess_media_type_by_path(materialized, fallback="video/mp4")
             trace("response:ready", result="materialized", mediaType=media_type, path=str(materialized))
-            return FileResponse(str(materialized), media_type=media_type)
+            return FileResponse(str(materialized), media_type=media_type, headers=file_headers)
 
     # Fast path bytes???? Range?
     read_started_at = time.perf_counter()
     data, media_type = await asyncio.to_thread(_read_and_maybe_decrypt_media, p, account_dir=account_dir, weixin_root=wxid_dir)
     if media_type == "application/octet-stream":
+        # 未能识别出内容，按扩展名兜底返回，但不做长期缓存
+        etag = ""
         media_type = _guess_media_type_by_path(p, fallback="video/mp4")
     trace(
         "decode:bytes-fallback",
@@ -3327,7 +3440,26 @@ async def get_chat_video(
         elapsedMsLocal=round((time.perf_counter() - read_started_at) * 1000.0, 1),
     )
     trace("response:ready", result="bytes-fallback", mediaType=media_type, bytes=len(data or b""))
-    return Response(content=data, media_type=media_type)
+    return _media_response(data, media_type, etag)
+
+
+def _load_voice_data(media_db_path: Path, server_id: int) -> Optional[bytes]:
+    # 语音接口会被前端连续调用，复用池化的只读连接；在线程里执行，不阻塞事件循环。
+    try:
+        with _pooled_read_connection(media_db_path) as conn:
+            row = conn.execute(
+                "SELECT voice_data FROM VoiceInfo WHERE svr_id = ? ORDER BY create_time DESC LIMIT 1",
+                (int(server_id),),
+            ).fetchone()
+    except Exception:
+        row = None
+
+    if not row or row[0] is None:
+        return None
+    data = row[0]
+    if not isinstance(data, bytes):
+        data = bytes(data)
+    return data
 
 
 @router.get("/api/chat/media/voice", summary="获取语音消息资源")
@@ -3339,26 +3471,11 @@ async def get_chat_voice(server_id: int, account: Optional[str] = None):
     if not media_db_path.exists():
         raise HTTPException(status_code=404, detail="media_0.db not found.")
 
-    conn = sqlite3.connect(str(media_db_path))
-    conn.row_factory = sqlite3.Row
-    try:
-        row = conn.execute(
-            "SELECT voice_data FROM VoiceInfo WHERE svr_id = ? ORDER BY create_time DESC LIMIT 1",
-            (int(server_id),),
-        ).fetchone()
-    except Exception:
-        row = None
-    finally:
-        conn.close()
-
-    if not row or row[0] is None:
+    data = await asyncio.to_thread(_load_voice_data, media_db_path, int(server_id))
+    if data is None:
         raise HTTPException(status_code=404, detail="Voice not found.")
 
-    data = bytes(row[0]) if isinstance(row[0], (memoryview, bytearray)) else row[0]
-    if not isinstance(data, (bytes, bytearray)):
-        data = bytes(data)
-
-    payload, ext, media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+    payload, ext, media_type = await asyncio.to_thread(_convert_silk_to_browser_audio, data, preferred_format="mp3")
     if payload and ext != "silk":
         return Response(
             content=payload,
@@ -3398,26 +3515,13 @@ async def open_chat_media_folder(
         if not media_db_path.exists():
             raise HTTPException(status_code=404, detail="media_0.db not found.")
 
-        conn = sqlite3.connect(str(media_db_path))
-        conn.row_factory = sqlite3.Row
-        try:
-            row = conn.execute(
-                "SELECT voice_data FROM VoiceInfo WHERE svr_id = ? ORDER BY create_time DESC LIMIT 1",
-                (int(server_id),),
-            ).fetchone()
-        except Exception:
-            row = None
-        finally:
-            conn.close()
-
-        if not row or row[0] is None:
+        data = await asyncio.to_thread(_load_voice_data, media_db_path, int(server_id))
+        if data is None:
             raise HTTPException(status_code=404, detail="Voice not found.")
 
-        data = bytes(row[0]) if isinstance(row[0], (memoryview, bytearray)) else row[0]
-        if not isinstance(data, (bytes, bytearray)):
-            data = bytes(data)
-
-        payload, ext, _media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+        payload, ext, _media_type = await asyncio.to_thread(
+            _convert_silk_to_browser_audio, data, preferred_format="mp3"
+        )
         if not payload:
             payload = data
             ext = "silk"
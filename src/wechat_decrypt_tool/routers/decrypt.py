@@ -588,6 +588,14 @@ async def decrypt_databases_stream(
                 }
                 diagnostic_warning_count += int(account_diagnostic_warning_count)
 
+                # hardlink.db 的 md5 索引在解密阶段建好，媒体请求路径上不再写库（与 POST 接口一致）。
+                try:
+                    from ..media_helpers import build_hardlink_md5_indexes
+
+                    await asyncio.to_thread(build_hardlink_md5_indexes, account_output_dir)
+                except Exception as e:
+                    logger.warning(f"构建 hardlink md5 索引失败: {account}: {e}")
+
                 # Build cache table (keep behavior consistent with the POST endpoint).
                 if os.environ.get("WECHAT_TOOL_BUILD_SESSION_LAST_MESSAGE", "1") != "0":
                     yield _sse(
@@ -15,6 +15,7 @@ from ..chat_accounts import resolve_chat_account_context
 from ..chat_helpers import (
     _build_avatar_url,
     _decode_message_content,
+    _has_appmsg_tag,
     _infer_message_brief_by_local_type,
     _infer_transfer_status_text,
     _iter_message_db_paths,
@@ -924,7 +925,7 @@ def _summarize_message_row(row: sqlite3.Row) -> dict[str, Any]:
     transfer_id = ""
     transfer_memo = ""
 
-    if "<appmsg" in raw_text.lower() or base_type == 49:
+    if _has_appmsg_tag(raw_text) or base_type == 49:
         parsed = _parse_app_message(raw_text)
         render_type = _text(parsed.get("renderType")) or "text"
         amount = _format_amount_text(parsed.get("amount"))
@@ -21,7 +21,7 @@ from starlette.background import BackgroundTask
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response, FileResponse  # 返回视频文件
 
-from ..chat_helpers import _load_contact_rows, _pick_display_name, _resolve_account_dir
+from ..chat_helpers import _load_contact_rows, _pick_display_name, _resolve_account_dir, _zstd_decompress
 from ..logging_config import get_logger
 from ..source_fallback import build_source_fallback_meta, normalize_data_source
 from ..media_helpers import _read_and_maybe_decrypt_media, _resolve_account_wxid_dir
@@ -526,7 +526,7 @@ def _decode_sns_text_blob(value: Any) -> str:
         raw = bytes(value)
         if raw and zstd is not None and raw.startswith(_ZSTD_MAGIC):
             try:
-                raw = zstd.decompress(raw)
+                raw = _zstd_decompress(raw)
             except Exception:
                 pass
         try:
@@ -540,7 +540,7 @@ def _decode_sns_text_blob(value: Any) -> str:
         raw = bytes(value)
         if raw and zstd is not None and raw.startswith(_ZSTD_MAGIC):
             try:
-                raw = zstd.decompress(raw)
+                raw = _zstd_decompress(raw)
             except Exception:
                 pass
         try:
@@ -573,7 +573,7 @@ def _decode_sns_text_blob(value: Any) -> str:
             raw = bytes.fromhex(t_hex)
             if raw and zstd is not None and raw.startswith(_ZSTD_MAGIC):
                 try:
-                    raw = zstd.decompress(raw)
+                    raw = _zstd_decompress(raw)
                 except Exception:
                     raw = b""
             if raw:
@@ -589,7 +589,7 @@ def _decode_sns_text_blob(value: Any) -> str:
             raw = base64.b64decode(text)
             if raw and zstd is not None and raw.startswith(_ZSTD_MAGIC):
                 try:
-                    raw = zstd.decompress(raw)
+                    raw = _zstd_decompress(raw)
                 except Exception:
                     raw = b""
             if raw:
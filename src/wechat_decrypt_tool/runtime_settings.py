@@ -4,7 +4,10 @@ import json
 import os
 import re
 import secrets
+import sys
+from importlib.util import find_spec
 from pathlib import Path
+from typing import Any
 
 
 RUNTIME_SETTINGS_FILENAME = "runtime_settings.json"
@@ -15,6 +18,9 @@ ENV_PORT_KEY = "WECHAT_TOOL_PORT"
 ENV_HOST_KEY = "WECHAT_TOOL_HOST"
 ENV_MCP_TOKEN_KEY = "WECHAT_TOOL_MCP_TOKEN"
 ENV_FILE_KEY = "WECHAT_TOOL_ENV_FILE"
+ENV_WORKERS_KEY = "WECHAT_TOOL_WORKERS"
+ENV_ACCESS_LOG_KEY = "WECHAT_TOOL_ACCESS_LOG"
+ENV_UDS_KEY = "WECHAT_TOOL_UDS"
 DEFAULT_ENV_FILENAME = ".env"
 LOOPBACK_BACKEND_HOST = "127.0.0.1"
 LAN_BACKEND_HOST = "0.0.0.0"
@@ -177,6 +183,60 @@ def read_effective_backend_host(default: str = LOOPBACK_BACKEND_HOST) -> tuple[s
     return _normalize_host(default) or LOOPBACK_BACKEND_HOST, "default"
 
 
+def read_effective_backend_workers(default: int = 1) -> int:
+    """Return the uvicorn worker process count (env `WECHAT_TOOL_WORKERS`).
+
+    Defaults to a single worker: export jobs, realtime autosync and the WCDB
+    connection pool are per-process state, so extra workers only make sense for
+    read-mostly API deployments that do not rely on them.
+    """
+
+    raw = str(os.environ.get(ENV_WORKERS_KEY, "") or "").strip()
+    try:
+        workers = int(raw, 10) if raw else int(default)
+    except Exception:
+        workers = int(default)
+    cpu_limit = (os.cpu_count() or 1) * 2 + 1
+    return max(1, min(workers, cpu_limit))
+
+
+def read_backend_uds() -> str | None:
+    """Return the UNIX domain socket path to listen on (env `WECHAT_TOOL_UDS`).
+
+    Lets a same-host frontend/reverse proxy talk to the backend without going
+    through loopback TCP. Ignored on Windows; None means bind host/port as usual.
+    """
+
+    raw = str(os.environ.get(ENV_UDS_KEY, "") or "").strip()
+    if not raw or sys.platform == "win32":
+        return None
+    return raw
+
+
+def read_uvicorn_server_options() -> dict[str, Any]:
+    """Return uvicorn `loop`/`http`/`access_log` options for the current platform.
+
+    Prefers uvloop (libuv event loop) and httptools (C HTTP parser), both shipped
+    with `uvicorn[standard]`. uvloop does not support Windows, so the stock
+    asyncio loop is used there; either falls back when the package is missing.
+    Per-request access logging stays on unless `WECHAT_TOOL_ACCESS_LOG=0`.
+    """
+
+    def _installed(name: str) -> bool:
+        try:
+            return find_spec(name) is not None
+        except Exception:
+            return False
+
+    use_uvloop = sys.platform != "win32" and _installed("uvloop")
+    access_log = str(os.environ.get(ENV_ACCESS_LOG_KEY, "") or "").strip().lower() not in {"0", "false", "no", "off"}
+    return {
+        "loop": "uvloop" if use_uvloop else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "access_log": access_log,
+    }
+
+
 def read_mcp_token_setting() -> str | None:
     try:
         data = _read_runtime_settings()
@@ -39,6 +39,16 @@ HMAC_SIZE = 64
 RESERVE_SIZE = IV_SIZE + HMAC_SIZE
 
 
+def _release_pooled_read_handles(output_path: str | Path) -> None:
+    """覆盖/删除解密输出前，关掉接口连接池里指向该文件的空闲只读连接（Windows 上会挡住写入）。"""
+    try:
+        from .chat_helpers import _close_pooled_read_connections
+
+        _close_pooled_read_connections(output_path)
+    except Exception:
+        pass
+
+
 def _derive_mac_key(enc_key: bytes, salt: bytes) -> bytes:
     """Derive SQLCipher/WCDB page HMAC key."""
     mac_salt = bytes(b ^ 0x3A for b in salt)
@@ -663,6 +673,7 @@ class WeChatDatabaseDecryptor:
                     if not result["error"]:
                         result["error"] = failure_message
                     if output_file.exists():
+                        _release_pooled_read_handles(output_file)
                         try:
                             output_file.unlink()
                         except Exception as exc:
@@ -795,6 +806,7 @@ class WeChatDatabaseDecryptor:
             # 检查是否已经是解密的数据库
             if encrypted_data.startswith(SQLITE_HEADER):
                 logger.info(f"文件已是SQLite格式，直接复制: {db_path}")
+                _release_pooled_read_handles(output_path)
                 with open(output_path, 'wb') as f:
                     f.write(encrypted_data)
                 result["copied_as_sqlite"] = True
@@ -932,6 +944,7 @@ class WeChatDatabaseDecryptor:
             result["failed_pages"] = int(failed_pages)
 
             # 写入解密后的文件
+            _release_pooled_read_handles(output_path)
             with open(output_path, 'wb') as f:
                 f.write(decrypted_data)
 
@@ -1180,6 +1193,14 @@ def decrypt_wechat_databases(db_storage_path: str = None, key: str = None) -> di
         }
         diagnostic_warning_count += int(account_diagnostic_warning_count)
 
+        # hardlink.db 的 md5 索引在解密阶段建好，媒体请求路径上不再写库
+        try:
+            from .media_helpers import build_hardlink_md5_indexes
+
+            build_hardlink_md5_indexes(account_output_dir)
+        except Exception as e:
+            logger.warning(f"构建 hardlink md5 索引失败: {account_name}: {e}")
+
         # 构建“会话最后一条消息”缓存表：把耗时挪到解密阶段，后续会话列表直接查表
         if os.environ.get("WECHAT_TOOL_BUILD_SESSION_LAST_MESSAGE", "1") != "0":
             try:
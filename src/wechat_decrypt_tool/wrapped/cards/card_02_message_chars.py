@@ -11,8 +11,6 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
-from pypinyin import lazy_pinyin, Style
-
 from ...chat_helpers import (
     _build_avatar_url,
     _decode_message_content,
@@ -31,6 +29,14 @@ from ...logging_config import get_logger
 logger = get_logger(__name__)
 
 
+def _lazy_pinyin(text: str) -> list[str]:
+    # pypinyin loads large phrase dictionaries on import; only pay for it when
+    # the card is computed rather than at API startup.
+    from pypinyin import Style, lazy_pinyin
+
+    return lazy_pinyin(text, style=Style.NORMAL)
+
+
 # 键盘布局中用于“磨损”展示的按键（字母 + 数字 + 常用标点）。
 # 注意：功能键（Tab/Enter/Backspace 等）不统计；空格键单独放在 spaceHits。
 _KEYBOARD_KEYS = (
@@ -211,7 +217,7 @@ def _update_keyboard_counters(
             if do_pinyin:
                 py = pinyin_cache.get(ch)
                 if py is None:
-                    lst = lazy_pinyin(ch, style=Style.NORMAL)
+                    lst = _lazy_pinyin(ch)
                     py = (lst[0] or "").lower() if lst else ""
                     pinyin_cache[ch] = py
                 for letter in py:
@@ -709,7 +715,7 @@ def sample_typed_phrases(*, account_dir: Path, year: int, k: int = 14) -> list[d
     out: list[dict[str, str]] = []
     for text in picked:
         try:
-            syllables = [str(s or "").strip().lower() for s in lazy_pinyin(text, style=Style.NORMAL)]
+            syllables = [str(s or "").strip().lower() for s in _lazy_pinyin(text)]
         except Exception:
             continue
         if not syllables or any(not _TYPED_PHRASE_PY_RE.fullmatch(s) for s in syllables):
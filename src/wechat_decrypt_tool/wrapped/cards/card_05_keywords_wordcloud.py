@@ -9,19 +9,27 @@ import sqlite3
 import time
 from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-import jieba
-
 from ...chat_helpers import _decode_message_content, _decode_sqlite_text, _iter_message_db_paths, _quote_ident
 from ...logging_config import get_logger
 
 logger = get_logger(__name__)
-try:
-    jieba.setLogLevel(logging.ERROR)
-except Exception:
-    pass
+
+
+@lru_cache(maxsize=1)
+def _get_jieba():
+    # jieba (and its pkg_resources import) is slow to load; defer it until the
+    # keywords card is actually built instead of paying it at API startup.
+    import jieba
+
+    try:
+        jieba.setLogLevel(logging.ERROR)
+    except Exception:
+        pass
+    return jieba
 
 
 _MD5_HEX_RE = re.compile(r"(?i)\b[0-9a-f]{32}\b")
@@ -283,6 +291,7 @@ def _normalize_token(tok: str) -> str:
 
 
 def extract_keywords_jieba(texts: list[str], *, top_n: int = 40) -> list[dict[str, Any]]:
+    jieba = _get_jieba()
     counter: Counter[str] = Counter()
     for raw in texts:
         s = _clean_text(raw)
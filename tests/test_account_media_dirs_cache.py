@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import media_helpers
+
+
+class TestAccountMediaDirsCache(unittest.TestCase):
+    def setUp(self):
+        media_helpers._ACCOUNT_MEDIA_DIRS_CACHE.clear()
+
+    def tearDown(self):
+        media_helpers._ACCOUNT_MEDIA_DIRS_CACHE.clear()
+
+    def test_resolution_is_cached_until_source_json_changes(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            account_dir = root / "output" / "wxid_a"
+            account_dir.mkdir(parents=True)
+            first = root / "first" / "wxid_a"
+            (first / "db_storage").mkdir(parents=True)
+            second = root / "second" / "wxid_a"
+            second.mkdir(parents=True)
+            source = account_dir / "_source.json"
+            source.write_text(json.dumps({"wxid_dir": str(first)}), encoding="utf-8")
+
+            with mock.patch.object(media_helpers, "get_account_keys_path", return_value=root / "account_keys.json"):
+                self.assertEqual(
+                    media_helpers._resolve_account_media_dirs(account_dir),
+                    (first, first / "db_storage"),
+                )
+                with mock.patch.object(
+                    media_helpers, "_resolve_account_wxid_dir", side_effect=AssertionError("re-resolved")
+                ):
+                    self.assertEqual(media_helpers._resolve_account_media_dirs(account_dir)[0], first)
+
+                source.write_text(json.dumps({"wxid_dir": str(second)}), encoding="utf-8")
+                st = os.stat(source)
+                os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+                with mock.patch.object(media_helpers, "_guess_wxid_dir_from_common_paths", return_value=None):
+                    self.assertEqual(media_helpers._resolve_account_media_dirs(account_dir), (second, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
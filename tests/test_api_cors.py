@@ -0,0 +1,47 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from fastapi.testclient import TestClient
+
+from wechat_decrypt_tool import api
+
+
+class TestApiCors(unittest.TestCase):
+    def test_wildcard_origin_is_static_and_without_credentials(self):
+        if not api._CORS_ENABLED or api._CORS_ORIGINS != ["*"]:
+            self.skipTest("CORS is disabled or pinned via env")
+        client = TestClient(api.app)
+        resp = client.get("/api/health", headers={"Origin": "http://localhost:3000"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers.get("access-control-allow-origin"), "*")
+        self.assertNotIn("access-control-allow-credentials", resp.headers)
+
+    def test_mcp_session_headers_pass_preflight_and_are_exposed(self):
+        if not api._CORS_ENABLED:
+            self.skipTest("CORS is disabled via env")
+        origin = "http://localhost:3000" if api._CORS_ORIGINS == ["*"] else api._CORS_ORIGINS[0]
+        client = TestClient(api.app)
+        resp = client.options(
+            "/api/health",
+            headers={
+                "Origin": origin,
+                "Access-Control-Request-Method": "POST",
+                "Access-Control-Request-Headers": "content-type, mcp-session-id, mcp-protocol-version",
+            },
+        )
+        self.assertEqual(resp.status_code, 200)
+        allowed = resp.headers.get("access-control-allow-headers", "").lower()
+        self.assertIn("mcp-session-id", allowed)
+        self.assertIn("mcp-protocol-version", allowed)
+
+        resp = client.get("/api/health", headers={"Origin": origin})
+        self.assertIn("mcp-session-id", resp.headers.get("access-control-expose-headers", "").lower())
+
+
+if __name__ == "__main__":
+    unittest.main()
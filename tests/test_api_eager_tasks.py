@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from fastapi.testclient import TestClient
+
+from wechat_decrypt_tool import api
+
+
+class TestApiEagerTasks(unittest.TestCase):
+    def _start_and_probe(self, *, enabled: bool):
+        with mock.patch.object(api, "_EAGER_TASKS_ENABLED", enabled), mock.patch.object(
+            api.CHAT_REALTIME_AUTOSYNC, "start"
+        ), mock.patch.object(api, "_shutdown_wcdb_realtime", mock.AsyncMock()):
+            with TestClient(api.app) as client:
+                resp = client.get("/api/health")
+                factory = client.portal.call(lambda: asyncio.get_running_loop().get_task_factory())
+        return resp, factory
+
+    def test_flag_off_keeps_default_task_factory(self):
+        resp, factory = self._start_and_probe(enabled=False)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNone(factory)
+
+    def test_flag_on_starts_and_serves(self):
+        resp, factory = self._start_and_probe(enabled=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json().get("status"), "healthy")
+        self.assertIs(factory, getattr(asyncio, "eager_task_factory", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import api
+
+
+class TestShutdownWcdbRealtime(unittest.TestCase):
+    def _run_shutdown(self, *, close_all, wcdb_shutdown):
+        with mock.patch.object(api.CHAT_REALTIME_AUTOSYNC, "stop"), mock.patch.object(
+            api.IMG_HELPER, "disable"
+        ), mock.patch.object(api.WCDB_REALTIME, "close_all", close_all), mock.patch.object(
+            api, "_wcdb_shutdown", wcdb_shutdown
+        ):
+            with self.assertLogs(api.logger, level="WARNING") as logs:
+                asyncio.run(api._shutdown_wcdb_realtime())
+        return logs.output
+
+    def test_close_all_error_is_logged_and_skips_lib_shutdown(self):
+        wcdb_shutdown = mock.Mock()
+        output = self._run_shutdown(
+            close_all=mock.Mock(side_effect=RuntimeError("boom")),
+            wcdb_shutdown=wcdb_shutdown,
+        )
+        wcdb_shutdown.assert_not_called()
+        self.assertTrue(any("close_all failed: boom" in line for line in output))
+
+    def test_lib_shutdown_error_is_logged(self):
+        output = self._run_shutdown(
+            close_all=mock.Mock(return_value=True),
+            wcdb_shutdown=mock.Mock(side_effect=OSError("dll gone")),
+        )
+        self.assertTrue(any("wcdb_shutdown failed: dll gone" in line for line in output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -523,6 +523,38 @@ class TestChatExportTargets(unittest.TestCase):
             self.assertGreater(len(message_query_limits), 2)
             self.assertLessEqual(max(message_query_limits), 1000)
 
+    def test_decrypted_message_iterator_unpacks_rows_in_select_order(self):
+        import wechat_decrypt_tool.chat_export_service as svc
+
+        with TemporaryDirectory() as td:
+            account_dir = self._prepare_account(Path(td))
+            conn = sqlite3.connect(str(account_dir / "message_0.db"))
+            try:
+                table_name = f"msg_{hashlib.md5(b'wxid_visible').hexdigest()}"
+                conn.execute(
+                    f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (2, 1002, 3, 7, 1, 101, "<msg><img /></msg>", None),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+            rows = list(
+                svc._iter_rows_for_conversation(
+                    account_dir=account_dir,
+                    conv_username="wxid_visible",
+                    start_time=None,
+                    end_time=None,
+                )
+            )
+
+        keys = [(r.local_id, r.server_id, r.local_type, r.sort_seq, r.create_time) for r in rows]
+        self.assertEqual(keys, [(1, 1001, 1, 1, 100), (2, 1002, 3, 7, 101)])
+        self.assertEqual(rows[0].raw_text, "message for wxid_visible")
+        self.assertEqual((rows[0].sender_username, rows[0].is_sent), ("wxid_visible", False))
+        self.assertEqual((rows[1].sender_username, rows[1].is_sent), ("wxid_account", True))
+        self.assertIsNone(rows[1].packed_info_data)
+
 
 if __name__ == "__main__":
     unittest.main()
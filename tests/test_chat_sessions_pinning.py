@@ -175,6 +175,11 @@ class TestChatSessionsPinning(unittest.TestCase):
             self.assertTrue(bool(sessions[0].get("isTop")))
             self.assertEqual(sessions[1].get("username"), "wxid_new")
             self.assertFalse(bool(sessions[1].get("isTop")))
+            self.assertEqual(sessions[1].get("lastMessage"), "new message")
+            self.assertEqual(
+                sessions[0].get("avatar"),
+                "http://testserver/api/chat/avatar?account=acc&username=wxid_top",
+            )
 
     def test_missing_flag_column_does_not_error_and_defaults_false(self):
         with TemporaryDirectory() as td:
@@ -0,0 +1,84 @@
+import re
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+
+
+class TestChatXmlRegexHelpers(unittest.TestCase):
+    def test_tag_and_attr_extraction_reuse_compiled_patterns(self):
+        xml = '<msg><appmsg><Title><![CDATA[hi]]></Title></appmsg><img md5 = "abc" /></msg>'
+        self.assertEqual(chat_helpers._extract_xml_tag_text(xml, "title"), "hi")
+        self.assertEqual(chat_helpers._extract_xml_attr(xml, "MD5"), "abc")
+        self.assertIs(chat_helpers._xml_tag_re("title"), chat_helpers._xml_tag_re("title"))
+        self.assertEqual(chat_helpers._extract_xml_tag_text(xml, "a.b"), "")
+
+    def test_ascii_fast_path_matches_ignorecase_search(self):
+        samples = [
+            '<msg><img CdnThumbUrl="Http://A/B" cdnthumbmd5="AbC" MD5 = \'XyZ\' /><Title>Mixed Case</TITLE></msg>',
+            '<msg><img md5="" cdnurl="u" /><md5>Tag Value</md5></msg>',
+            '<msg><title>标题 Title</title><img MD5="Ä1" /></msg>',
+        ]
+        for xml in samples:
+            for name in ("md5", "MD5", "cdnthumburl", "cdnurl", "title", "missing"):
+                m = chat_helpers._xml_attr_re(name).search(xml)
+                self.assertEqual(chat_helpers._extract_xml_attr(xml, name), (m.group(1) or "").strip() if m else "")
+                m = chat_helpers._xml_tag_re(name).search(xml)
+                self.assertEqual(
+                    chat_helpers._extract_xml_tag_text(xml, name),
+                    chat_helpers._strip_cdata(m.group(1) or "") if m else "",
+                )
+        self.assertEqual(chat_helpers._extract_xml_attr(samples[0], "md5"), "AbC")
+
+    def test_template_placeholders_match_regex_scan(self):
+        samples = [
+            '"${wxid_a}" 拍了拍 "${wxid_b}"',
+            "${} ${x${y} tail ${unterminated",
+            "no placeholders",
+            "${a}${a}$}{${b}",
+        ]
+        for tpl in samples:
+            expected = [m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", tpl)]
+            self.assertEqual(list(chat_helpers._iter_template_placeholders(tpl)), expected)
+
+    def test_is_http_url_matches_lowered_prefix_check(self):
+        for value in ("https://a/b", "  HTTP://x", "http:/x", "ftp://x", "", None, "HtTpS://" + "y" * 500, "xhttp://"):
+            expected = str(value or "").strip().lower().startswith(("http://", "https://"))
+            self.assertEqual(chat_helpers._is_http_url(value), expected)
+
+    def test_has_appmsg_tag_matches_lowered_substring_check(self):
+        for text in ("<msg><appmsg appid=''>", "<MSG><AppMsg>", "<msg><img/></msg>", "", "appmsg", "中文<APPMSG>"):
+            self.assertEqual(chat_helpers._has_appmsg_tag(text), "<appmsg" in text.lower())
+
+    def test_iter_message_db_paths_filters_names(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            for name in ("message_0.db", "biz_message_1.db", "message.db", "message_fts.db", "session.db", "my_message_x.db"):
+                (root / name).write_bytes(b"")
+            names = [p.name for p in chat_helpers._iter_message_db_paths(root)]
+        self.assertEqual(names, ["biz_message_1.db", "message.db", "message_0.db", "my_message_x.db"])
+
+    def test_extract_md5_from_blob_prefers_dat_names_case_insensitively(self):
+        md5 = "0123456789ABCDEF0123456789abcdef"
+        other = "f" * 32
+        blob = b"\x12\x20" + other.encode() + b"\x1a/Img/" + md5.encode() + b"_T.DAT\x00"
+        self.assertEqual(chat_helpers._extract_md5_from_blob(blob), md5.lower())
+        self.assertEqual(chat_helpers._extract_md5_from_blob(memoryview(other.upper().encode() + b"\x00")), other)
+        self.assertEqual(chat_helpers._extract_md5_from_blob(b"no md5 here"), "")
+
+    def test_extract_md5_from_blob_ties_keep_first_seen(self):
+        a = "a" * 32
+        b = "b" * 32
+        blob = f"{a} {b} {b} {a}".encode()
+        self.assertEqual(chat_helpers._extract_md5_from_blob(blob), a)
+        self.assertEqual(chat_helpers._extract_md5_from_blob(f"{a} {b} {b}".encode()), b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import base64
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+from wechat_decrypt_tool.chat_helpers import _decode_message_content, zstd
+
+
+XML = "<msg><appmsg><title>hello</title></appmsg></msg>"
+
+
+class TestDecodeMessageContentBlob(unittest.TestCase):
+    def test_hex_and_base64_xml_blobs_are_decoded(self):
+        self.assertEqual(_decode_message_content(None, XML.encode("utf-8").hex()), XML)
+        self.assertEqual(_decode_message_content(None, base64.b64encode(XML.encode("utf-8")).decode("ascii")), XML)
+
+    def test_plain_or_spaced_hex_text_is_kept(self):
+        plain = "68656c6c6f20776f726c6421"
+        self.assertEqual(_decode_message_content(None, plain), plain)
+        spaced = " ".join(XML.encode("utf-8").hex()[i : i + 2] for i in range(0, 40, 2))
+        self.assertEqual(_decode_message_content(None, spaced), spaced)
+
+    def test_hex_guard_only_sends_pure_hex_to_fromhex(self):
+        # 非十六进制的字母数字串不走 hex 分支，仍交给 base64 判定
+        b64 = base64.b64encode(XML.encode("utf-8")).decode("ascii")
+        self.assertFalse(chat_helpers._HEX_TEXT_RE.fullmatch(b64))
+        self.assertEqual(_decode_message_content(None, b64), XML)
+        word = "ghijklmnopqrstuvwxyzGHIJ"
+        self.assertEqual(_decode_message_content(None, word), word)
+
+    def test_non_ascii_text_skips_blob_decoders(self):
+        text = "今天天气很好我们一起去公园散步吧好不好呀哈哈哈哈"
+        with mock.patch.object(chat_helpers.base64, "b64decode", side_effect=AssertionError("decoded")):
+            self.assertEqual(_decode_message_content(None, text), text)
+
+    @unittest.skipIf(zstd is None, "zstandard not installed")
+    def test_zstd_frames_in_hex_blob_and_bytes(self):
+        frame = zstd.ZstdCompressor().compress(XML.encode("utf-8"))
+        self.assertEqual(_decode_message_content(None, frame.hex()), XML)
+        self.assertEqual(_decode_message_content(frame, b""), XML)
+
+    @unittest.skipIf(zstd is None, "zstandard not installed")
+    def test_decompressor_is_reused_per_thread(self):
+        frame = zstd.ZstdCompressor().compress(XML.encode("utf-8"))
+        self.assertEqual(chat_helpers._zstd_decompress(frame), XML.encode("utf-8"))
+        dctx = chat_helpers._ZSTD_LOCAL.dctx
+        chat_helpers._zstd_decompress(frame)
+        self.assertIs(chat_helpers._ZSTD_LOCAL.dctx, dctx)
+
+        seen = []
+        worker = threading.Thread(
+            target=lambda: (chat_helpers._zstd_decompress(frame), seen.append(chat_helpers._ZSTD_LOCAL.dctx))
+        )
+        worker.start()
+        worker.join()
+        self.assertIsNot(seen[0], dctx)
+
+    def test_mostly_printable_text_threshold(self):
+        self.assertTrue(chat_helpers._is_mostly_printable_text("第一行\r\n\t第二行"))
+        self.assertTrue(chat_helpers._is_mostly_printable_text("a" * 17 + "\x00" * 3))
+        self.assertFalse(chat_helpers._is_mostly_printable_text("a" * 16 + "\x00" * 4))
+        self.assertFalse(chat_helpers._is_mostly_printable_text(""))
+
+    def test_plain_compress_bytes_skip_zstd(self):
+        with mock.patch.object(chat_helpers, "_zstd_decompress", side_effect=AssertionError("decompressed")):
+            self.assertEqual(_decode_message_content(XML.encode("utf-8"), ""), XML)
+
+    def test_looks_like_xml_skips_whitespace_and_wrapping_quotes(self):
+        self.assertTrue(chat_helpers._looks_like_xml("\n  <msg/>"))
+        self.assertTrue(chat_helpers._looks_like_xml(' "" \t<msg/>"'))
+        self.assertFalse(chat_helpers._looks_like_xml('"<msg/>'))
+        self.assertFalse(chat_helpers._looks_like_xml('  ""  '))
+        self.assertFalse(chat_helpers._looks_like_xml("hello <msg/>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
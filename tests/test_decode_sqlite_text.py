@@ -0,0 +1,23 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.chat_helpers import _decode_sqlite_text
+
+
+class TestDecodeSqliteText(unittest.TestCase):
+    def test_common_column_types(self):
+        text = "你好"
+        self.assertIs(_decode_sqlite_text(text), text)
+        self.assertEqual(_decode_sqlite_text(None), "")
+        self.assertEqual(_decode_sqlite_text("你好".encode("utf-8") + b"\xff"), "你好")
+        self.assertEqual(_decode_sqlite_text(memoryview(b"abc")), "abc")
+        self.assertEqual(_decode_sqlite_text(42), "42")
+
+
+if __name__ == "__main__":
+    unittest.main()
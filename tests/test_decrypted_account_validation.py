@@ -56,6 +56,24 @@ class TestDecryptedAccountValidation(unittest.TestCase):
                 else:
                     os.environ["WECHAT_TOOL_DATA_DIR"] = prev_data_dir
 
+    def test_sqlite_validity_is_cached_until_file_changes(self):
+        from unittest import mock
+
+        import wechat_decrypt_tool.chat_accounts as chat_accounts
+
+        with TemporaryDirectory() as td:
+            db_path = Path(td) / "session.db"
+            db_path.write_bytes(b"SQLite format 3\x00")
+            self.assertFalse(chat_accounts._is_valid_decrypted_sqlite(db_path))
+
+            with mock.patch.object(chat_accounts, "is_usable_sqlite_db", side_effect=AssertionError("reopened")):
+                self.assertFalse(chat_accounts._is_valid_decrypted_sqlite(db_path))
+
+            db_path.unlink()
+            _seed_sqlite(db_path, "SessionTable")
+            self.assertTrue(chat_accounts._is_valid_decrypted_sqlite(db_path))
+            self.assertFalse(chat_accounts._is_valid_decrypted_sqlite(Path(td) / "missing.db"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
+import ctypes
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
@@ -9,6 +11,7 @@ sys.path.insert(0, str(ROOT / "src"))
 
 
 import wechat_decrypt_tool.image_key_memory_scan as memory_scan
+import wechat_decrypt_tool.image_key_resolver as resolver
 from wechat_decrypt_tool.image_key_memory_scan import (
     MEM_COMMIT,
     PAGE_GUARD,
@@ -150,6 +153,16 @@ def test_candidate_extraction_requires_exact_32_character_runs() -> None:
     assert list(iter_memory_aes_candidates(b"!\x00" + (b"A\x00" * 33) + b"?\x00")) == []
 
 
+def test_candidate_extraction_skips_short_runs_around_a_key() -> None:
+    noise = b" ".join([b"abc", b"0123456789", b"Z" * 40, b"x"]) * 50
+    data = noise + b"\n" + FULL_CANDIDATE.encode("ascii") + b"\n" + noise
+    assert list(iter_memory_aes_candidates(data)) == [(AES_KEY, "ascii")]
+
+    utf16 = noise.decode("ascii").encode("utf-16le")
+    data = utf16 + b"|\x00" + FULL_CANDIDATE.encode("utf-16le") + b"|\x00" + utf16
+    assert list(iter_memory_aes_candidates(data)) == [(AES_KEY, "utf-16le")]
+
+
 def test_candidate_extraction_defers_unknown_chunk_boundaries() -> None:
     candidate = FULL_CANDIDATE.encode("ascii")
     assert list(
@@ -176,6 +189,28 @@ def test_chunk_candidate_must_verify_against_real_v2_ciphertext(tmp_path: Path)
     assert find_verified_aes_key_in_chunk(wrong, scan) is None
 
 
+def test_chunk_skips_uppercase_candidates_and_reuses_aes_results(tmp_path: Path, monkeypatch) -> None:
+    scan = _template_scan(tmp_path)
+    calls: list[str] = []
+    real_trusted = memory_scan.trusted_xor_for_verified_aes_key
+
+    def counting_trusted(aes_key, template_data):
+        calls.append(aes_key)
+        return real_trusted(aes_key, template_data)
+
+    monkeypatch.setattr(memory_scan, "trusted_xor_for_verified_aes_key", counting_trusted)
+    upper = b"!0123456789ABCDEF0123456789abcdef?"
+    assert find_verified_aes_key_in_chunk(upper, scan) is None
+    assert calls == []
+
+    resolver._decrypt_aes_block_cached.cache_clear()
+    data = b"!" + FULL_CANDIDATE.encode("ascii") + b"?"
+    assert find_verified_aes_key_in_chunk(data, scan) is not None
+    assert find_verified_aes_key_in_chunk(data, scan) is not None
+    info = resolver._decrypt_aes_block_cached.cache_info()
+    assert info.hits > 0
+
+
 class _FakeMemoryApi:
     def __init__(self, regions: list[MemoryRegion], memory: dict[int, bytes]) -> None:
         self.regions = iter(regions)
@@ -203,6 +238,42 @@ class _FakeMemoryApi:
         self.closed += 1
 
 
+class _FakeKernelFunction:
+    def __init__(self, impl=None) -> None:
+        self.impl = impl
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self.impl(*args) if self.impl is not None else 0
+
+
+def test_win32_read_memory_reuses_buffer_and_returns_only_bytes_read() -> None:
+    memory = bytes(range(256)) * 4
+    buffers: list[int] = []
+
+    def read_process_memory(handle, address, buffer, size, bytes_read_ref):
+        buffers.append(ctypes.addressof(buffer))
+        start = int(address.value or 0)
+        data = memory[start : start + size]
+        ctypes.memmove(buffer, data, len(data))
+        bytes_read_ref._obj.value = len(data)
+        return 1
+
+    kernel32 = SimpleNamespace(
+        OpenProcess=_FakeKernelFunction(),
+        VirtualQueryEx=_FakeKernelFunction(),
+        ReadProcessMemory=_FakeKernelFunction(read_process_memory),
+        CloseHandle=_FakeKernelFunction(),
+    )
+    api = memory_scan._Win32MemoryApi(kernel32)
+
+    assert api.read_memory(object(), 0, 512) == memory[:512]
+    assert api.read_memory(object(), 1000, 512) == memory[1000:]
+    assert api.read_memory(object(), 16, 8) == memory[16:24]
+    assert len(set(buffers)) == 1
+
+
 def test_process_scan_filters_regions_and_finds_cross_chunk_candidate(tmp_path: Path) -> None:
     chunk_size = memory_scan.MEMORY_CHUNK_SIZE
     valid_base = 0x6000_0000
@@ -148,6 +148,26 @@ def test_scan_v2_templates_prefers_recent_attach_img_files(tmp_path: Path) -> No
     assert scan.files_scanned == 2
 
 
+def test_scan_limit_keeps_recency_order_across_read_batches(tmp_path: Path) -> None:
+    account_dir = tmp_path / "wxid_account"
+    img_dir = account_dir / "msg" / "attach" / "contact" / "2026-07" / "Img"
+    expected: list[Path] = []
+    for index in range(20):
+        path = img_dir / f"{index:02d}_t.dat"
+        if index % 3 == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"not-a-v2-template-at-all")
+            os.utime(path, ns=(10_000_000_000 - index, 10_000_000_000 - index))
+            continue
+        _write_v2_template(path, aes_key="0123456789abcdef", xor_key=0x11, mtime_ns=10_000_000_000 - index)
+        expected.append(path)
+
+    scan = scan_v2_templates(account_dir, limit=5)
+
+    assert [item.path for item in scan.templates] == expected[:5]
+    assert scan.files_scanned == 8
+
+
 def test_scan_v2_templates_uses_bounded_fallback(tmp_path: Path) -> None:
     account_dir = tmp_path / "wxid_test"
     aes_key = "0123456789abcdef"
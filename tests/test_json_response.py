@@ -0,0 +1,69 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from wechat_decrypt_tool import json_response
+from wechat_decrypt_tool.json_response import FastJSONResponse
+
+
+class TestFastJSONResponse(unittest.TestCase):
+    def test_renders_compact_utf8_like_starlette(self):
+        payload = {"name": "张三", "items": [1, 2.5, None, True], "nested": {"k": "v"}}
+        body = FastJSONResponse(payload).body
+        self.assertEqual(json.loads(body), payload)
+        self.assertIn("张三".encode("utf-8"), body)
+        self.assertNotIn(b" ", body.replace("张三".encode("utf-8"), b""))
+
+    def test_non_str_keys_are_supported(self):
+        body = FastJSONResponse({1: "a", "b": 2}).body
+        self.assertEqual(json.loads(body), {"1": "a", "b": 2})
+
+    def test_falls_back_to_stdlib_for_huge_ints(self):
+        big = 1 << 80
+        body = FastJSONResponse({"id": big}).body
+        self.assertEqual(json.loads(body), {"id": big})
+
+    def test_works_without_orjson(self):
+        with patch.object(json_response, "orjson", None):
+            body = FastJSONResponse({"ok": "是"}).body
+        self.assertEqual(body, '{"ok":"是"}'.encode("utf-8"))
+
+
+class TestMessagePageResponseModel(unittest.TestCase):
+    def test_message_routes_declare_dict_response_model(self):
+        from wechat_decrypt_tool.routers import chat
+
+        models = {r.path: r.response_model for r in chat.router.routes if hasattr(r, "response_model")}
+        self.assertEqual(models["/api/chat/messages"], dict[str, Any])
+        self.assertEqual(models["/api/chat/messages/around"], dict[str, Any])
+
+    def test_dict_response_model_matches_default_encoding(self):
+        payload = {
+            "status": "success",
+            "messages": [{"id": "message_0:Msg_a:1", "content": "你好", "atUsers": [], "serverId": 1 << 62}],
+            "hasMore": False,
+            "nested": {"k": None, "f": 1.5},
+        }
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.get("/plain")(lambda: payload)
+        app.get("/typed", response_model=dict[str, Any])(lambda: payload)
+        client = TestClient(app)
+        plain = client.get("/plain")
+        typed = client.get("/typed")
+        self.assertEqual(typed.status_code, 200)
+        self.assertEqual(typed.content, plain.content)
+        self.assertEqual(typed.json(), payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
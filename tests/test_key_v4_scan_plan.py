@@ -0,0 +1,30 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.key_v4 import plan_scan_work
+
+
+class TestKeyV4ScanPlan(unittest.TestCase):
+    def test_large_regions_are_split_with_overlap(self):
+        groups = plan_scan_work([(0x1000, 100)], 4, chunk_size=40, overlap=8)
+        items = sorted(item for group in groups for item in group)
+        self.assertEqual(items, [(0x1000, 48), (0x1000 + 40, 48), (0x1000 + 80, 20)])
+
+    def test_groups_are_balanced_by_bytes(self):
+        regions = [(0, 1000)] + [(10_000 + i * 100, 10) for i in range(50)]
+        groups = plan_scan_work(regions, 4, chunk_size=250, overlap=0)
+        loads = sorted(sum(size for _, size in group) for group in groups)
+        self.assertEqual(sum(loads), 1500)
+        self.assertLessEqual(loads[-1] - loads[0], 10)
+
+    def test_empty_input(self):
+        self.assertEqual(plan_scan_work([], 8), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+
+
+def _create_contact_db(path: Path) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        for table in ("contact", "stranger"):
+            conn.execute(
+                f"CREATE TABLE {table} (username TEXT, remark TEXT, nick_name TEXT, alias TEXT,"
+                " big_head_url TEXT, small_head_url TEXT)"
+            )
+        conn.execute("INSERT INTO contact VALUES ('wxid_a', '', 'Alice', '', '', '')")
+        conn.execute("INSERT INTO stranger VALUES ('wxid_b', '', 'Bob', '', '', '')")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestLoadContactRowsCache(unittest.TestCase):
+    def test_repeated_lookups_skip_the_database(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "contact.db"
+            _create_contact_db(db)
+
+            rows = chat_helpers._load_contact_rows(db, ["wxid_a", "wxid_b", "wxid_x"])
+            self.assertEqual(rows["wxid_a"]["nick_name"], "Alice")
+            self.assertEqual(rows["wxid_b"]["nick_name"], "Bob")
+            self.assertNotIn("wxid_x", rows)
+
+            rows["wxid_a"]["nick_name"] = "mutated"
+            with mock.patch.object(chat_helpers, "_connect_sqlite_for_read", side_effect=AssertionError("db hit")):
+                again = chat_helpers._load_contact_rows(db, ["wxid_x", "wxid_a", "wxid_b"])
+            self.assertEqual(again["wxid_a"]["nick_name"], "Alice")
+            self.assertEqual(set(again), {"wxid_a", "wxid_b"})
+
+    def test_rewritten_database_invalidates_cache(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "contact.db"
+            _create_contact_db(db)
+            self.assertEqual(chat_helpers._load_contact_rows(db, ["wxid_a"])["wxid_a"]["nick_name"], "Alice")
+
+            conn = sqlite3.connect(str(db))
+            try:
+                conn.execute("UPDATE contact SET nick_name = 'Alice Zhang' WHERE username = 'wxid_a'")
+                conn.commit()
+            finally:
+                conn.close()
+            st = os.stat(db)
+            os.utime(db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+            self.assertEqual(chat_helpers._load_contact_rows(db, ["wxid_a"])["wxid_a"]["nick_name"], "Alice Zhang")
+
+    def test_large_username_lists_are_fetched_in_one_pass(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "contact.db"
+            _create_contact_db(db)
+            conn = sqlite3.connect(str(db))
+            try:
+                conn.executemany(
+                    "INSERT INTO contact VALUES (?, '', ?, '', '', '')",
+                    [(f"wxid_{i}", f"user {i}") for i in range(1500)],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+            wanted = [f"wxid_{i}" for i in range(1500)] + ["wxid_b"]
+            rows = chat_helpers._load_contact_rows(db, wanted)
+            self.assertEqual(len(rows), 1501)
+            self.assertEqual(rows["wxid_1499"]["nick_name"], "user 1499")
+            self.assertEqual(rows["wxid_b"]["nick_name"], "Bob")
+            chat_helpers._close_pooled_read_connections()
+
+
+if __name__ == "__main__":
+    unittest.main()
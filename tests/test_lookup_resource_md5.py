@@ -0,0 +1,124 @@
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+from wechat_decrypt_tool.chat_helpers import _lookup_resource_md5, _lookup_resource_md5_batch, _prefetch_resource_md5
+
+
+MD5_A = "a" * 32
+MD5_B = "b" * 32
+
+
+class TestLookupResourceMd5(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "CREATE TABLE MessageResourceInfo (message_id INTEGER PRIMARY KEY, chat_id INTEGER, message_local_type INTEGER,"
+            " message_svr_id INTEGER, message_local_id INTEGER, message_create_time INTEGER, packed_info BLOB)"
+        )
+        self.conn.executemany(
+            "INSERT INTO MessageResourceInfo VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (1, 7, 3, 100, 10, 1000, MD5_A.encode() + b".dat"),
+                (2, 8, 3, 100, 11, 1001, MD5_B.encode()),
+            ],
+        )
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_server_id_lookup_honours_chat_and_type_filters(self):
+        self.assertEqual(_lookup_resource_md5(self.conn, None, 0, 100, 0, 0), MD5_B)
+        self.assertEqual(_lookup_resource_md5(self.conn, 7, 3, 100, 0, 0), MD5_A)
+        self.assertEqual(_lookup_resource_md5(self.conn, 7, 43, 100, 0, 0), "")
+
+    def test_falls_back_to_local_id_and_create_time(self):
+        self.assertEqual(_lookup_resource_md5(self.conn, 8, 3, 999, 11, 1001), MD5_B)
+        self.assertEqual(_lookup_resource_md5(self.conn, None, 0, 0, 10, 1000), MD5_A)
+        self.assertEqual(_lookup_resource_md5(self.conn, None, 0, 0, 0, 0), "")
+
+    def test_batch_matches_per_row_lookup(self):
+        keys = [
+            (0, 100, 0, 0),
+            (3, 100, 0, 0),
+            (43, 100, 0, 0),
+            (3, 999, 11, 1001),
+            (0, 0, 10, 1000),
+            (3, 0, 10, 1001),
+            (0, 0, 0, 0),
+        ]
+        for chat_id in (None, 7, 8):
+            got = _lookup_resource_md5_batch(self.conn, chat_id, keys)
+            for key in keys:
+                self.assertEqual(got[key], _lookup_resource_md5(self.conn, chat_id, *key), (chat_id, key))
+
+    def test_prefetch_only_covers_media_rows(self):
+        rows = [
+            {"local_type": 3, "server_id": 100, "local_id": 10, "create_time": 1000},
+            {"local_type": 1, "server_id": 100, "local_id": 10, "create_time": 1000},
+        ]
+        self.assertEqual(_prefetch_resource_md5(self.conn, 7, rows), {(3, 100, 10, 1000): MD5_A})
+        self.assertIsNone(_prefetch_resource_md5(self.conn, 7, [{"local_type": 3}]))
+        self.assertIsNone(_prefetch_resource_md5(None, 7, rows))
+
+    def test_export_iterator_prefetches_per_batch(self):
+        from wechat_decrypt_tool import chat_export_service as svc
+
+        def row(local_type, local_id):
+            return svc._Row("message_0", "Msg_a", local_id, 100, local_type, 0, 1000, "", "", False)
+
+        rows = [row(3, 10), row(1, 11), row(1, 12), {"realtime": True}]
+        with mock.patch.object(svc, "_RESOURCE_MD5_BATCH_SIZE", 2), mock.patch.object(
+            svc, "_lookup_resource_md5_batch", wraps=_lookup_resource_md5_batch
+        ) as batch:
+            out = list(svc._iter_with_resource_md5_prefetch(iter(rows), self.conn, 7))
+        self.assertEqual([m for m, _ in out], rows)
+        self.assertEqual(batch.call_count, 1)
+        self.assertEqual(out[0][1], {(3, 100, 10, 1000): MD5_A})
+        self.assertIs(out[0][1], out[1][1])
+        self.assertEqual(out[2][1], {})
+        self.assertEqual(list(svc._iter_with_resource_md5_prefetch(rows[:1], None, 7)), [(rows[0], None)])
+
+    def test_open_message_resource_is_lazy_and_caches_chat_id(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "message_resource.db"
+            self.assertEqual(chat_helpers._open_message_resource(db, "wxid_a"), (None, None))
+
+            setup = sqlite3.connect(str(db))
+            setup.execute("CREATE TABLE ChatName2Id (user_name TEXT)")
+            setup.execute("INSERT INTO ChatName2Id VALUES ('wxid_a')")
+            setup.commit()
+            setup.close()
+
+            conn, chat_id = chat_helpers._open_message_resource(db, "wxid_a")
+            self.assertEqual(chat_id, 1)
+            conn.close()
+
+            with mock.patch.object(chat_helpers, "_connect_sqlite_for_read", side_effect=AssertionError("opened")):
+                conn, chat_id = chat_helpers._open_message_resource(db, "wxid_a")
+                self.assertEqual(chat_id, 1)
+                self.assertEqual(_prefetch_resource_md5(conn, chat_id, [{"local_type": 1}]), {})
+                self.assertFalse(conn.opened)
+                conn.close()
+
+            conn, _chat_id = chat_helpers._open_message_resource(db, "wxid_a")
+            try:
+                self.assertEqual(conn.execute("SELECT user_name FROM ChatName2Id").fetchone()["user_name"], "wxid_a")
+                self.assertTrue(conn.opened)
+                # 同一请求内的查询共用一个读事务
+                self.assertTrue(conn._conn.in_transaction)
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM ChatName2Id").fetchone()[0], 1)
+            finally:
+                conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
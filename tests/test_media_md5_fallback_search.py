@@ -0,0 +1,86 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import media_helpers
+
+
+MD5 = "0123456789abcdef0123456789abcdef"
+
+
+def _touch(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+    return path
+
+
+class TestFallbackSearchMediaByMd5(unittest.TestCase):
+    def setUp(self):
+        media_helpers._fallback_search_media_by_md5.cache_clear()
+
+    def test_prefers_earlier_pattern_across_the_tree(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            _touch(root / "msg" / "attach" / "a" / f"{MD5}.jpg")
+            _touch(root / "msg" / "attach" / "b" / "c" / f"{MD5}_t.dat")
+            hd = _touch(root / "msg" / "attach" / "z" / f"{MD5}_h.dat")
+            _touch(root / "msg" / "attach" / "z" / "unrelated.dat")
+
+            self.assertEqual(media_helpers._fallback_search_media_by_md5(str(root), MD5), str(hd))
+
+    def test_search_dir_order_wins_over_pattern_rank(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            mp4 = _touch(root / "msg" / "attach" / "x" / f"{MD5}.mp4")
+            _touch(root / "msg" / "video" / f"{MD5}_h.dat")
+
+            self.assertEqual(media_helpers._fallback_search_media_by_md5(str(root), MD5), str(mp4))
+
+    def test_scan_stops_when_event_is_set(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            _touch(root / f"{MD5}.dat")
+            stop = threading.Event()
+            stop.set()
+            self.assertIsNone(media_helpers._scan_tree_for_md5_patterns(str(root), MD5, [f"{MD5}.dat"], stop))
+            self.assertEqual(
+                media_helpers._scan_tree_for_md5_patterns(str(root), MD5, [f"{MD5}.dat"]),
+                str(root / f"{MD5}.dat"),
+            )
+
+    def test_file_kind_matches_md5_anywhere_in_name(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            target = _touch(root / "msg" / "file" / "2024-01" / f"report_{MD5}.pdf")
+
+            self.assertEqual(media_helpers._fallback_search_media_by_md5(str(root), MD5, "file"), str(target))
+            self.assertIsNone(media_helpers._fallback_search_media_by_md5(str(root), "f" * 32, "file"))
+
+    def test_index_relists_only_changed_directories(self):
+        with TemporaryDirectory() as td, mock.patch.object(media_helpers, "_MEDIA_MD5_INDEX_RECHECK_SECONDS", 0.0):
+            root = Path(td)
+            _touch(root / "a" / "b" / f"{MD5}.jpg")
+            _touch(root / "c" / "unrelated.dat")
+            patterns = [f"{MD5}_h.dat", f"{MD5}*.jpg"]
+            self.assertEqual(
+                media_helpers._indexed_scan_for_md5_patterns(str(root), MD5, patterns),
+                str(root / "a" / "b" / f"{MD5}.jpg"),
+            )
+
+            hd = _touch(root / "c" / "d" / f"{MD5}_h.dat")
+            with mock.patch.object(
+                media_helpers, "_list_dir_md5_entries", wraps=media_helpers._list_dir_md5_entries
+            ) as listed:
+                self.assertEqual(media_helpers._indexed_scan_for_md5_patterns(str(root), MD5, patterns), str(hd))
+            self.assertEqual(sorted(call.args[0] for call in listed.call_args_list), [str(root / "c"), str(root / "c" / "d")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import struct
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Crypto.Cipher import AES
+from Crypto.Util import Padding
+
+from wechat_decrypt_tool import media_helpers
+
+
+def _slow_xor(data: bytes, key: int) -> bytes:
+    return bytes(b ^ key for b in data)
+
+
+class TestMediaXorDecrypt(unittest.TestCase):
+    def test_xor_bytes_matches_per_byte_xor(self):
+        data = bytes(range(256)) * 3
+        for key in (0x00, 0x37, 0xFF):
+            self.assertEqual(media_helpers._xor_bytes(data, key), _slow_xor(data, key))
+        self.assertEqual(media_helpers._xor_bytes(bytearray(b"abc"), 0x20), b"ABC")
+        self.assertEqual(media_helpers._xor_bytes(b"", 0x11), b"")
+
+    def test_detect_image_media_type_signatures(self):
+        detect = media_helpers._detect_image_media_type
+        self.assertEqual(detect(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8), "image/png")
+        self.assertEqual(detect(b"\xff\xd8\xff\xe0"), "image/jpeg")
+        self.assertEqual(detect(b"\xff\xd8\xff\xff"), "application/octet-stream")
+        self.assertEqual(detect(b"GIF87a"), "image/gif")
+        self.assertEqual(detect(b"RIFF\x00\x00\x00\x00WEBP"), "image/webp")
+        self.assertEqual(detect(b"RIFF\x00\x00\x00\x00WAVE"), "application/octet-stream")
+        self.assertEqual(detect(b""), "application/octet-stream")
+        self.assertEqual(media_helpers._detect_wechat_dat_version(b"\x07\x08V2\x08\x07rest"), 2)
+        self.assertEqual(media_helpers._detect_wechat_dat_version(b"\x00" * 8), 0)
+        self.assertEqual(media_helpers._detect_wechat_dat_version(b"\x07"), -1)
+
+    def test_decrypt_v3_round_trips(self):
+        plain = b"\xff\xd8\xff\xe0" + b"jpeg-body" * 100
+        enc = _slow_xor(plain, 0x5A)
+        self.assertEqual(media_helpers._decrypt_wechat_dat_v3(enc, 0x5A), plain)
+
+    def test_decrypt_v4_matches_aes_ecb_plus_xor_tail(self):
+        aes_key = b"cfcd208495d565ef"
+        aes_plain = b"\xff\xd8\xff\xe0" + b"A" * 30
+        raw = b"raw-middle" * 5
+        tail_plain = b"tail-bytes" * 3
+        aes_enc = AES.new(aes_key, AES.MODE_ECB).encrypt(Padding.pad(aes_plain, 16))
+        header = struct.pack("<6sLLx", b"\x07\x08V1\x08\x07", len(aes_plain), len(tail_plain))
+        data = header + aes_enc + raw + _slow_xor(tail_plain, 0x5A)
+
+        out = media_helpers._decrypt_wechat_dat_v4(data, 0x5A, aes_key)
+        self.assertEqual(out, aes_plain + raw + tail_plain)
+
+        with self.assertRaises(ValueError):
+            media_helpers._decrypt_wechat_dat_v4(data, 0x5A, b"0" * 16)
+
+    def test_magic_detection_decodes_mp4(self):
+        plain = b"\x00\x00\x00\x18ftypisom" + b"\x00" * 64
+        decoded, media_type = media_helpers._try_xor_decrypt_by_magic(_slow_xor(plain, 0x37))
+        self.assertEqual(media_type, "video/mp4")
+        self.assertEqual(decoded, plain)
+
+    def test_read_and_maybe_decrypt_media_reads_file_once(self):
+        plain = b"\x00\x00\x00\x18ftypisom" + b"\x00" * 64
+        with TemporaryDirectory() as td:
+            path = Path(td) / "video.dat"
+            path.write_bytes(_slow_xor(plain, 0x37))
+            with mock.patch.object(Path, "read_bytes", side_effect=AssertionError("re-read")):
+                data, media_type = media_helpers._read_and_maybe_decrypt_media(path)
+        self.assertEqual(media_type, "video/mp4")
+        self.assertEqual(data, plain)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.chat_helpers import _infer_last_message_brief, _infer_message_brief_by_local_type
+
+
+class TestMessageBrief(unittest.TestCase):
+    def test_last_message_brief(self):
+        self.assertEqual(_infer_last_message_brief(3, 0), "[图片]")
+        self.assertEqual(_infer_last_message_brief(49, 36), "[小程序]")
+        self.assertEqual(_infer_last_message_brief(49, 999), "[消息]")
+        self.assertEqual(_infer_last_message_brief(5, 0), "[消息]")
+        self.assertEqual(_infer_last_message_brief(None, None), "[消息]")
+
+    def test_brief_by_local_type(self):
+        self.assertEqual(_infer_message_brief_by_local_type(1), "")
+        self.assertEqual(_infer_message_brief_by_local_type(244813135921), "[引用消息]")
+        self.assertEqual(_infer_message_brief_by_local_type(25769803825), "[文件]")
+        self.assertEqual(_infer_message_brief_by_local_type(None), "[消息]")
+
+
+if __name__ == "__main__":
+    unittest.main()
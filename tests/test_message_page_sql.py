@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+from wechat_decrypt_tool.routers import chat
+
+
+def _create_message_db(path: Path, *, with_name2id: bool) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute(
+            "CREATE TABLE Msg_a (local_id INTEGER, server_id INTEGER, local_type INTEGER, sort_seq INTEGER,"
+            " real_sender_id INTEGER, create_time INTEGER, message_content TEXT, compress_content BLOB,"
+            " packed_info_data BLOB)"
+        )
+        if with_name2id:
+            conn.execute("CREATE TABLE Name2Id (user_name TEXT)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestMessagePageSql(unittest.TestCase):
+    def test_sql_is_built_once_per_db_file(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "message_0.db"
+            _create_message_db(db, with_name2id=True)
+            conn = sqlite3.connect(str(db))
+            try:
+                with_join, no_join = chat._message_page_sql(conn, db, "Msg_a")
+                self.assertIn("LEFT JOIN Name2Id", with_join)
+                self.assertIn("m.packed_info_data AS packed_info_data", no_join)
+                self.assertIn("NULL AS msg_source", no_join)
+                conn.execute(with_join, (1,)).fetchall()
+
+                probe = mock.Mock(side_effect=AssertionError("re-probed"))
+                self.assertEqual(chat._message_page_sql(probe, db, "Msg_a"), (with_join, no_join))
+
+                conn.execute("ALTER TABLE Msg_a ADD COLUMN source TEXT")
+                conn.commit()
+                st = os.stat(db)
+                os.utime(db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+                _with_join, no_join = chat._message_page_sql(conn, db, "Msg_a")
+                self.assertIn("m.source AS msg_source", no_join)
+            finally:
+                conn.close()
+
+    def test_missing_name2id_skips_join_query(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "message_0.db"
+            _create_message_db(db, with_name2id=False)
+            conn = sqlite3.connect(str(db))
+            try:
+                with_join, no_join = chat._message_page_sql(conn, db, "Msg_a")
+                self.assertEqual(with_join, "")
+                self.assertEqual(conn.execute(no_join, (1,)).fetchall(), [])
+            finally:
+                conn.close()
+
+    def test_table_name_and_my_rowid_are_cached_per_db_file(self):
+        with TemporaryDirectory() as td:
+            db = Path(td) / "message_0.db"
+            _create_message_db(db, with_name2id=True)
+            table = f"Msg_{hashlib.md5(b'wxid_friend').hexdigest()}"
+            conn = sqlite3.connect(str(db))
+            try:
+                conn.execute(f"ALTER TABLE Msg_a RENAME TO {table}")
+                conn.execute("INSERT INTO Name2Id (user_name) VALUES ('wxid_friend'), ('wxid_me')")
+                conn.commit()
+                meta = chat._message_page_meta(conn, db, username="wxid_friend", my_wxid="wxid_me")
+                self.assertEqual(meta, (table, 2))
+
+                probe = mock.Mock(side_effect=AssertionError("re-queried"))
+                self.assertEqual(chat._message_page_meta(probe, db, username="wxid_friend", my_wxid="wxid_me"), meta)
+                self.assertEqual(chat._message_page_meta(conn, db, username="wxid_other", my_wxid="wxid_me"), (None, None))
+
+                conn.execute("DELETE FROM Name2Id WHERE user_name = 'wxid_me'")
+                conn.execute("INSERT INTO Name2Id (user_name) VALUES ('wxid_x'), ('wxid_me')")
+                conn.commit()
+                st = os.stat(db)
+                os.utime(db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+                self.assertEqual(
+                    chat._message_page_meta(conn, db, username="wxid_friend", my_wxid="wxid_me"), (table, 3)
+                )
+            finally:
+                conn.close()
+
+    def test_fetch_message_pages_keeps_db_order_and_isolates_broken_dbs(self):
+        username = "wxid_friend"
+        table = f"Msg_{hashlib.md5(username.encode()).hexdigest()}"
+        with TemporaryDirectory() as td:
+            paths = []
+            for i in range(3):
+                db = Path(td) / f"message_{i}.db"
+                _create_message_db(db, with_name2id=True)
+                conn = sqlite3.connect(str(db))
+                try:
+                    conn.execute(f"ALTER TABLE Msg_a RENAME TO {table}")
+                    conn.execute(
+                        f"INSERT INTO {table} (local_id, local_type, sort_seq, create_time, message_content)"
+                        " VALUES (?, 1, ?, ?, 'hi')",
+                        (i + 1, i, i),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+                paths.append(db)
+            broken = Path(td) / "message_9.db"
+            broken.write_bytes(b"not a sqlite database" * 256)
+            empty = Path(td) / "message_8.db"
+            _create_message_db(empty, with_name2id=False)
+            db_paths = [paths[0], broken, paths[1], empty, paths[2]]
+
+            try:
+                pages = chat._fetch_message_pages(db_paths, username=username, my_wxid="wxid_me", take_probe=10)
+            finally:
+                chat_helpers._close_pooled_read_connections()
+
+        self.assertEqual(len(pages), 5)
+        self.assertIsInstance(pages[1], sqlite3.DatabaseError)
+        self.assertIsNone(pages[3])
+        for page, local_id in zip((pages[0], pages[2], pages[4]), (1, 2, 3)):
+            table_name, my_rowid, rows = page
+            self.assertEqual(table_name, table)
+            self.assertIsNone(my_rowid)
+            self.assertEqual([r["local_id"] for r in rows], [local_id])
+
+    def test_limit_message_pages_keeps_global_newest_rows(self):
+        def row(create_time, local_id):
+            return {"create_time": create_time, "sort_seq": 0, "local_id": local_id}
+
+        broken = sqlite3.DatabaseError("broken")
+        pages = [
+            ("t0", 1, [row(90, 9), row(50, 5), row(10, 1)]),
+            broken,
+            ("t1", None, [row(80, 8), row(70, 7), row(60, 6)]),
+            None,
+        ]
+        self.assertTrue(chat._limit_message_pages(pages, 3))
+        self.assertEqual([r["local_id"] for r in pages[0][2]], [9])
+        self.assertEqual([r["local_id"] for r in pages[2][2]], [8, 7])
+        self.assertIs(pages[1], broken)
+        self.assertIsNone(pages[3])
+
+        single = [("t0", None, [row(3, 3), row(2, 2)])]
+        self.assertFalse(chat._limit_message_pages(single, 2))
+        self.assertTrue(chat._limit_message_pages(single, 1))
+        self.assertEqual([r["local_id"] for r in single[0][2]], [3])
+
+    def test_message_order_key_sorts_by_time_then_seq_then_local_id(self):
+        msgs = [
+            {"id": "a", "createTime": 10, "sortSeq": 2, "localId": 1},
+            {"id": "b", "createTime": 20, "sortSeq": 0, "localId": 5},
+            {"id": "c", "createTime": 10, "sortSeq": 2, "localId": 3},
+            {"id": "d", "createTime": 10, "sortSeq": 1, "localId": 9},
+        ]
+        msgs.sort(key=chat._MESSAGE_ORDER_KEY, reverse=True)
+        self.assertEqual([m["id"] for m in msgs], ["b", "c", "a", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
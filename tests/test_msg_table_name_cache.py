@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+from wechat_decrypt_tool.media_helpers import _resolve_hardlink_dir2id_table_name, _resolve_hardlink_table_name
+
+
+def _msg_table(username: str) -> str:
+    return "Msg_" + hashlib.md5(username.encode("utf-8")).hexdigest()
+
+
+class TestMsgTableNameCache(unittest.TestCase):
+    def test_resolves_and_sees_tables_created_later(self):
+        with TemporaryDirectory() as td:
+            conn = sqlite3.connect(str(Path(td) / "message_0.db"))
+            try:
+                conn.execute(f"CREATE TABLE {_msg_table('wxid_a')} (local_id INTEGER)")
+                conn.commit()
+                self.assertEqual(chat_helpers._resolve_msg_table_name(conn, "wxid_a"), _msg_table("wxid_a"))
+                self.assertIsNone(chat_helpers._resolve_msg_table_name(conn, "wxid_b"))
+
+                conn.execute(f"CREATE TABLE {_msg_table('wxid_b')} (local_id INTEGER)")
+                conn.commit()
+                self.assertEqual(chat_helpers._resolve_msg_table_name(conn, "wxid_b"), _msg_table("wxid_b"))
+            finally:
+                conn.close()
+
+    def test_in_memory_database_is_not_cached(self):
+        conn = sqlite3.connect(":memory:")
+        try:
+            self.assertIsNone(chat_helpers._table_names_cache_key(conn))
+            conn.execute(f"CREATE TABLE {_msg_table('wxid_a')} (local_id INTEGER)")
+            self.assertEqual(chat_helpers._resolve_msg_table_name(conn, "wxid_a"), _msg_table("wxid_a"))
+        finally:
+            conn.close()
+
+    def test_hardlink_tables_pick_latest_prefix_match(self):
+        with TemporaryDirectory() as td:
+            conn = sqlite3.connect(str(Path(td) / "hardlink.db"))
+            try:
+                for name in ("image_hardlink_info_v3", "image_hardlink_info_v4", "dir2id", "video_hardlink_info_v4"):
+                    conn.execute(f"CREATE TABLE {name} (x INTEGER)")
+                conn.commit()
+                self.assertEqual(_resolve_hardlink_table_name(conn, "image_hardlink_info"), "image_hardlink_info_v4")
+                self.assertEqual(_resolve_hardlink_dir2id_table_name(conn), "dir2id")
+                self.assertIsNone(_resolve_hardlink_table_name(conn, "file_hardlink_info"))
+            finally:
+                conn.close()
+
+    def test_hardlink_dir2id_map_is_reused_until_file_changes(self):
+        from wechat_decrypt_tool import media_helpers
+
+        with TemporaryDirectory() as td:
+            db_path = Path(td) / "hardlink.db"
+            conn = sqlite3.connect(str(db_path))
+            try:
+                conn.execute("CREATE TABLE dir2id (username TEXT)")
+                conn.execute("INSERT INTO dir2id (username) VALUES ('wxid_a')")
+                conn.commit()
+                first = media_helpers._get_hardlink_dir2id_map(conn, db_path)
+                self.assertEqual(first, {1: "wxid_a"})
+                self.assertIs(media_helpers._get_hardlink_dir2id_map(conn, db_path), first)
+
+                conn.execute("INSERT INTO dir2id (username) VALUES ('wxid_b')")
+                conn.commit()
+                os.utime(db_path, ns=(0, 1))
+                self.assertEqual(media_helpers._get_hardlink_dir2id_map(conn, db_path), {1: "wxid_a", 2: "wxid_b"})
+            finally:
+                conn.close()
+
+    def test_read_connection_refuses_writes(self):
+        with TemporaryDirectory() as td:
+            db_path = Path(td) / "head_image.db"
+            setup = sqlite3.connect(str(db_path))
+            setup.execute("CREATE TABLE head_image (username TEXT)")
+            setup.execute("INSERT INTO head_image VALUES ('wxid_a')")
+            setup.commit()
+            setup.close()
+
+            self.assertEqual(chat_helpers._query_head_image_usernames(db_path, ["wxid_a", "wxid_b"]), {"wxid_a"})
+            conn = chat_helpers._connect_sqlite_for_read(db_path)
+            try:
+                with self.assertRaises(sqlite3.OperationalError):
+                    conn.execute("INSERT INTO head_image VALUES ('wxid_b')")
+            finally:
+                conn.close()
+
+    def test_head_image_lookup_handles_lists_beyond_variable_limit(self):
+        with TemporaryDirectory() as td:
+            db_path = Path(td) / "head_image.db"
+            setup = sqlite3.connect(str(db_path))
+            setup.execute("CREATE TABLE head_image (username TEXT)")
+            setup.executemany("INSERT INTO head_image VALUES (?)", [("wxid_1",), ("群聊@chatroom",)])
+            setup.commit()
+            setup.close()
+
+            usernames = [f"wxid_{i}" for i in range(40000)] + ["群聊@chatroom"]
+            self.assertEqual(
+                chat_helpers._query_head_image_usernames(db_path, usernames),
+                {"wxid_1", "群聊@chatroom"},
+            )
+
+    def test_hardlink_md5_indexes_are_built_after_decrypt(self):
+        from unittest import mock
+
+        from wechat_decrypt_tool import media_helpers
+
+        with TemporaryDirectory() as td:
+            account_dir = Path(td)
+            self.assertEqual(media_helpers.build_hardlink_md5_indexes(account_dir), 0)
+
+            db_path = account_dir / "hardlink.db"
+            setup = sqlite3.connect(str(db_path))
+            setup.execute("CREATE TABLE image_hardlink_info_v4 (md5 TEXT, modify_time INTEGER, dir1 INTEGER)")
+            setup.execute("CREATE TABLE video_hardlink_info_v4 (md5 TEXT, modify_time INTEGER, dir1 INTEGER)")
+            setup.execute("CREATE TABLE dir2id (username TEXT)")
+            setup.commit()
+            setup.close()
+
+            self.assertEqual(media_helpers.build_hardlink_md5_indexes(account_dir), 2)
+            conn = sqlite3.connect(str(db_path))
+            try:
+                names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            finally:
+                conn.close()
+            self.assertEqual(names, {"ix_image_hardlink_info_v4_md5_mtime", "ix_video_hardlink_info_v4_md5_mtime"})
+
+            # 媒体查找路径只读：不建索引，也不改动库文件
+            stamp = chat_helpers._sqlite_file_stamp(db_path)
+            with mock.patch.object(media_helpers, "build_hardlink_md5_indexes", side_effect=AssertionError("write")):
+                self.assertIsNone(
+                    media_helpers._resolve_media_path_from_hardlink(
+                        db_path, account_dir, md5="0" * 32, kind="video", username=None
+                    )
+                )
+            chat_helpers._close_pooled_read_connections()
+            self.assertEqual(chat_helpers._sqlite_file_stamp(db_path), stamp)
+
+    def test_hardlink_resolves_video_via_dir2id_month(self):
+        from unittest import mock
+
+        from wechat_decrypt_tool import media_helpers
+
+        with TemporaryDirectory() as td:
+            db_path = Path(td) / "hardlink.db"
+            wxid_dir = Path(td) / "wxid_a"
+            target = wxid_dir / "msg" / "video" / "2024-05" / "abc.mp4"
+            target.parent.mkdir(parents=True)
+            target.write_bytes(b"mp4")
+
+            setup = sqlite3.connect(str(db_path))
+            setup.execute("CREATE TABLE dir2id (username TEXT)")
+            setup.execute("INSERT INTO dir2id (username) VALUES ('2024-05')")
+            setup.execute(
+                "CREATE TABLE video_hardlink_info_v4 (md5 TEXT, dir1 INTEGER, dir2 INTEGER, file_name TEXT, file_size INTEGER, modify_time INTEGER)"
+            )
+            setup.execute("INSERT INTO video_hardlink_info_v4 VALUES ('m1', 0, 1, 'abc.mp4', 3, 0)")
+            setup.commit()
+            setup.close()
+
+            try:
+                found = media_helpers._resolve_media_path_from_hardlink(db_path, wxid_dir, "m1", "video", None)
+                self.assertEqual(found, target.resolve())
+                self.assertIsNone(media_helpers._resolve_media_path_from_hardlink(db_path, wxid_dir, "m2", "video", None))
+
+                # 索引建好后库文件不再变化，后续查找复用池里的连接
+                with mock.patch.object(chat_helpers, "_connect_sqlite_for_read", side_effect=AssertionError("reopened")):
+                    again = media_helpers._resolve_media_path_from_hardlink(db_path, wxid_dir, "m1", "video", None)
+                self.assertEqual(again, found)
+            finally:
+                chat_helpers._close_pooled_read_connections()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -188,6 +188,21 @@ class TestParseAppMessage(unittest.TestCase):
         self.assertEqual(parsed.get("quoteContent"), "[链接] 谁说冬天不能穿裙子？")
         self.assertEqual(parsed.get("quoteThumbUrl"), "https://mmbiz.qpic.cn/some-thumb2.jpg")
 
+    def test_quote_reply_title_ignores_titles_inside_refermsg(self):
+        # 回复正文的 <title> 要在剔除 refermsg 后提取；引用块出现在外层 title 之前时也不能取错。
+        raw_text = (
+            '<msg><appmsg appid="" sdkver="0"><type>57</type>'
+            '<refermsg><type>49</type><title>被引用的标题</title><content>x</content></refermsg>'
+            '<title>我的回复</title>'
+            '<refermsg><title>第二个引用</title></refermsg>'
+            '</appmsg></msg>'
+        )
+
+        parsed = _parse_app_message(raw_text)
+
+        self.assertEqual(parsed.get("renderType"), "quote")
+        self.assertEqual(parsed.get("content"), "我的回复")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,102 @@
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import path_fix
+from wechat_decrypt_tool.path_fix import PathFixRoute
+
+
+def _build_client() -> TestClient:
+    router = APIRouter(route_class=PathFixRoute)
+
+    @router.get("/api/ping")
+    async def ping(request: Request):
+        return {"request_class": type(request).__name__}
+
+    @router.post("/api/paths")
+    async def paths(request: Request):
+        return await request.json()
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestPathFixRoute(unittest.TestCase):
+    def test_non_json_request_skips_path_fix_request(self):
+        client = _build_client()
+        with patch.object(path_fix, "PathFixRequest", side_effect=AssertionError("should not wrap")):
+            resp = client.get("/api/ping")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["request_class"], "Request")
+
+    def test_json_request_still_validates_db_storage_path(self):
+        client = _build_client()
+        resp = client.post("/api/paths", json={"db_storage_path": "relative/db_storage"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("相对路径", resp.json()["detail"])
+
+    def test_json_request_without_paths_passes_through(self):
+        client = _build_client()
+        resp = client.post("/api/paths", json={"account": "wxid_a"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"account": "wxid_a"})
+
+    def test_valid_json_is_validated_once(self):
+        client = _build_client()
+        with patch.object(
+            path_fix.PathFixRequest, "_validate_paths_in_json", autospec=True, return_value=None
+        ) as validate:
+            resp = client.post("/api/paths", json={"account": "wxid_a", "dir": "C:\\\\data"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"account": "wxid_a", "dir": "C:\\\\data"})
+        self.assertEqual(validate.call_count, 1)
+
+    def test_unescaped_windows_path_is_fixed(self):
+        client = _build_client()
+        resp = client.post(
+            "/api/paths",
+            content=b'{"dir": "D:\\wechat\\files"}',
+            headers={"content-type": "application/json"},
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"dir": "D:\\wechat\\files"})
+
+    def test_json_loader_falls_back_for_stdlib_only_inputs(self):
+        self.assertEqual(path_fix._loads_json(b'{"a": 1}'), {"a": 1})
+        self.assertEqual(path_fix._loads_json('{"n": NaN, "p": "C:\\\\x"}')["p"], "C:\\x")
+        with self.assertRaises(ValueError):
+            path_fix._loads_json('{"a": ')
+
+    def test_db_storage_scan_skips_key_info_and_non_storage_dirs(self):
+        with TemporaryDirectory() as td:
+            base = Path(td) / "wxid_a"
+            (base / "other").mkdir(parents=True)
+            (base / "other" / "misc.db").write_bytes(b"")
+            storage = base / "db_storage"
+            (storage / "message").mkdir(parents=True)
+            (storage / "key_info.db").write_bytes(b"")
+            self.assertIsNone(path_fix._find_first_storage_db(str(base)))
+
+            (storage / "message" / "message_0.db").write_bytes(b"")
+            self.assertEqual(
+                path_fix._find_first_storage_db(str(base)),
+                str(storage / "message" / "message_0.db"),
+            )
+
+            client = _build_client()
+            resp = client.post("/api/paths", json={"db_storage_path": str(storage)})
+            self.assertEqual(resp.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
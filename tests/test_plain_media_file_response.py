@@ -0,0 +1,104 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi.responses import FileResponse
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.media_helpers import _probe_plain_image_file
+from wechat_decrypt_tool.routers import chat_media
+from wechat_decrypt_tool.routers.chat_media import _build_cached_file_response
+
+
+class TestPlainMediaFileResponse(unittest.TestCase):
+    def test_probe_accepts_complete_plain_images_only(self):
+        with TemporaryDirectory() as td:
+            root = Path(td)
+            big_jpeg = root / "a.jpg"
+            big_jpeg.write_bytes(b"\xff\xd8\xff\xe0" + b"\x11" * 100_000 + b"\xff\xd9")
+            truncated = root / "b.jpg"
+            truncated.write_bytes(b"\xff\xd8\xff\xe0" + b"\x11" * 100_000)
+            encrypted = root / "c.dat"
+            encrypted.write_bytes(b"\x07\x08V2\x08\x07" + b"\x00" * 64)
+
+            self.assertEqual(_probe_plain_image_file(big_jpeg), "image/jpeg")
+            self.assertEqual(_probe_plain_image_file(truncated), "")
+            self.assertEqual(_probe_plain_image_file(encrypted), "")
+            self.assertEqual(_probe_plain_image_file(root / "missing.jpg"), "")
+
+    def test_file_response_carries_stat_etag_and_honours_if_none_match(self):
+        with TemporaryDirectory() as td:
+            p = Path(td) / "thumb.jpg"
+            p.write_bytes(b"\xff\xd8\xff\xe0thumb\xff\xd9")
+
+            resp = _build_cached_file_response(None, p, "image/jpeg")
+            self.assertIsInstance(resp, FileResponse)
+            etag = resp.headers["etag"]
+            self.assertIn("max-age=", resp.headers["cache-control"])
+
+            request = SimpleNamespace(headers={"if-none-match": etag})
+            cached = _build_cached_file_response(request, p, "image/jpeg")
+            self.assertEqual(cached.status_code, 304)
+
+    def test_md5_etag_is_immutable_and_matches_weak_or_listed_tags(self):
+        md5 = "0123456789ABCDEF0123456789abcdef"
+        etag = chat_media._md5_media_etag(md5)
+        self.assertEqual(etag, '"0123456789abcdef0123456789abcdef"')
+        self.assertEqual(chat_media._md5_media_etag("not-an-md5"), "")
+
+        with TemporaryDirectory() as td:
+            p = Path(td) / "emoji.gif"
+            p.write_bytes(b"GIF89a;")
+            resp = _build_cached_file_response(None, p, "image/gif", etag)
+            self.assertEqual(resp.headers["etag"], etag)
+            self.assertIn("immutable", resp.headers["cache-control"])
+
+        request = SimpleNamespace(headers={"if-none-match": f'"other", W/{etag}'})
+        self.assertEqual(chat_media._not_modified_response(request, etag).status_code, 304)
+        self.assertIsNone(chat_media._not_modified_response(request, ""))
+        self.assertIsNone(chat_media._media_response(b"x", "application/octet-stream", etag).headers.get("etag"))
+
+    def test_emoji_conditional_get_skips_read_after_md5_hit(self):
+        md5 = "0123456789abcdef0123456789abcdef"
+        request = SimpleNamespace(headers={"if-none-match": f'"{md5}"'})
+        with TemporaryDirectory() as td:
+            cached = Path(td) / f"{md5}.gif"
+            cached.write_bytes(b"GIF89a;")
+            with mock.patch.object(chat_media, "_resolve_account_dir", return_value=Path(td)), mock.patch.object(
+                chat_media, "_try_find_decrypted_resource", return_value=cached
+            ), mock.patch.object(chat_media, "_probe_plain_image_file", side_effect=AssertionError("read")):
+                resp = asyncio.run(chat_media.get_chat_emoji(request, md5))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["etag"], f'"{md5}"')
+
+    def test_emoji_found_by_deep_scan_is_not_cached_as_immutable(self):
+        md5 = "0123456789abcdef0123456789abcdef"
+        request = SimpleNamespace(headers={"if-none-match": f'"{md5}"'})
+        with TemporaryDirectory() as td:
+            hit = Path(td) / "scan_hit.gif"
+            hit.write_bytes(b"GIF89a;")
+            with mock.patch.object(chat_media, "_resolve_account_dir", return_value=Path(td)), mock.patch.object(
+                chat_media, "_try_find_decrypted_resource", return_value=None
+            ), mock.patch.object(
+                chat_media, "_resolve_account_media_dirs", return_value=(Path(td), None)
+            ), mock.patch.object(
+                chat_media, "_resolve_media_path_for_kind", return_value=None
+            ), mock.patch.object(
+                chat_media, "_fallback_search_media_by_md5", return_value=str(hit)
+            ), mock.patch.object(
+                chat_media, "_probe_plain_image_file", return_value="image/gif"
+            ):
+                resp = asyncio.run(chat_media.get_chat_emoji(request, md5))
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["etag"], f'"{md5}"')
+        self.assertNotIn("immutable", resp.headers["cache-control"])
+
+if __name__ == "__main__":
+    unittest.main()
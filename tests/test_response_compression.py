@@ -0,0 +1,77 @@
+import sys
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.response_compression import GZipTextMiddleware
+
+
+_BIG_TEXT = "聊天记录" * 1000
+
+
+def _build_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(GZipTextMiddleware, minimum_size=1024)
+
+    @app.get("/json")
+    async def big_json():
+        return JSONResponse({"text": _BIG_TEXT})
+
+    @app.get("/small")
+    async def small_json():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(content=b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/events")
+    async def events():
+        async def gen():
+            yield "data: " + _BIG_TEXT + "\n\n"
+            yield "data: done\n\n"
+
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+class TestGZipTextMiddleware(unittest.TestCase):
+    def test_compresses_large_json(self):
+        client = _build_client()
+        resp = client.get("/json", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers.get("content-encoding"), "gzip")
+        self.assertIn("Accept-Encoding", resp.headers.get("vary", ""))
+        self.assertEqual(resp.json(), {"text": _BIG_TEXT})
+
+    def test_skips_when_client_does_not_accept_gzip(self):
+        client = _build_client()
+        resp = client.get("/json", headers={"Accept-Encoding": "identity"})
+        self.assertIsNone(resp.headers.get("content-encoding"))
+        self.assertEqual(resp.json(), {"text": _BIG_TEXT})
+
+    def test_small_and_media_responses_are_untouched(self):
+        client = _build_client()
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertIsNone(small.headers.get("content-encoding"))
+        image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+        self.assertIsNone(image.headers.get("content-encoding"))
+        self.assertEqual(len(image.content), 4100)
+
+    def test_streaming_sse_is_not_buffered_or_compressed(self):
+        client = _build_client()
+        resp = client.get("/events", headers={"Accept-Encoding": "gzip"})
+        self.assertIsNone(resp.headers.get("content-encoding"))
+        self.assertTrue(resp.text.endswith("data: done\n\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
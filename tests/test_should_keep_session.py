@@ -0,0 +1,42 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.chat_helpers import _should_keep_session
+
+
+class TestShouldKeepSession(unittest.TestCase):
+    def test_keeps_regular_sessions(self):
+        for username in ("wxid_abc", "123@chatroom", "alice", "gh_official"):
+            with self.subTest(username=username):
+                self.assertTrue(_should_keep_session(username, include_official=True))
+
+    def test_drops_system_and_service_accounts(self):
+        for username in (
+            "",
+            "weixin",
+            "qqmail",
+            "fmessage",
+            "medianote",
+            "floatbottle",
+            "newsapp",
+            "abc@kefu.openim",
+            "abc@openim",
+            "wxid_service_x",
+            "brandsessionholder",
+            "notification_messages",
+            "someone@stranger",
+        ):
+            with self.subTest(username=username):
+                self.assertFalse(_should_keep_session(username, include_official=True))
+
+    def test_official_accounts_follow_flag(self):
+        self.assertFalse(_should_keep_session("gh_official", include_official=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
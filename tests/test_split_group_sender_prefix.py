@@ -0,0 +1,32 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool.chat_helpers import _split_group_sender_prefix
+
+
+class TestSplitGroupSenderPrefix(unittest.TestCase):
+    def test_strong_hint_or_xml_body_splits(self):
+        self.assertEqual(_split_group_sender_prefix("wxid_abc:\n\nhello"), ("wxid_abc", "hello"))
+        self.assertEqual(_split_group_sender_prefix('bob:\n  "<msg/>'), ("bob", '  "<msg/>'))
+
+    def test_plain_text_without_hint_is_kept(self):
+        self.assertEqual(_split_group_sender_prefix("note:\nhello"), ("", "note:\nhello"))
+        self.assertEqual(_split_group_sender_prefix("a b:\nhello"), ("", "a b:\nhello"))
+        self.assertEqual(_split_group_sender_prefix(":\nhello"), ("", ":\nhello"))
+
+    def test_known_sender_values(self):
+        self.assertEqual(_split_group_sender_prefix("bob:\nhi", known_sender_alias="bob"), ("bob", "hi"))
+        self.assertEqual(_split_group_sender_prefix("carol:\nhi", known_sender_username="bob"), ("", "carol:\nhi"))
+        self.assertEqual(
+            _split_group_sender_prefix("carol:\n<msg/>", known_sender_username="bob"),
+            ("carol", "<msg/>"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
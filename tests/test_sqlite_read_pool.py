@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import chat_helpers
+
+
+class TestPooledReadConnection(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.db = Path(self._td.name) / "media_0.db"
+        conn = sqlite3.connect(str(self.db))
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.execute("INSERT INTO t VALUES ('x')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        chat_helpers._close_pooled_read_connections()
+        self._td.cleanup()
+
+    def test_connection_is_reused_and_reset(self):
+        with chat_helpers._pooled_read_connection(self.db) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.text_factory = bytes
+            self.assertEqual(conn.execute("SELECT v FROM t").fetchone()["v"], b"x")
+        with chat_helpers._pooled_read_connection(self.db) as again:
+            self.assertIs(again, conn)
+            self.assertIsNone(again.row_factory)
+            self.assertEqual(again.execute("SELECT v FROM t").fetchone(), ("x",))
+            with self.assertRaises(sqlite3.OperationalError):
+                again.execute("INSERT INTO t VALUES ('y')")
+
+    def test_changed_file_drops_pooled_connections(self):
+        with chat_helpers._pooled_read_connection(self.db) as conn:
+            pass
+        st = os.stat(self.db)
+        os.utime(self.db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        with chat_helpers._pooled_read_connection(self.db) as fresh:
+            self.assertIsNot(fresh, conn)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    def test_connection_is_closed_when_body_raises(self):
+        with self.assertRaises(RuntimeError):
+            with chat_helpers._pooled_read_connection(self.db) as conn:
+                raise RuntimeError("boom")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertNotIn(str(self.db), chat_helpers._READ_POOL)
+
+    def test_idle_connections_are_reaped(self):
+        with chat_helpers._pooled_read_connection(self.db) as conn:
+            pass
+        with mock.patch.object(chat_helpers, "_READ_POOL_IDLE_SECONDS", -1.0):
+            chat_helpers._reap_idle_read_connections()
+        self.assertNotIn(str(self.db), chat_helpers._READ_POOL)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    def test_scoped_close_only_releases_matching_paths(self):
+        other_dir = Path(self._td.name) / "wxid_other"
+        other_dir.mkdir()
+        other = other_dir / "media_0.db"
+        sqlite3.connect(str(other)).close()
+        with chat_helpers._pooled_read_connection(self.db) as conn:
+            pass
+        with chat_helpers._pooled_read_connection(other) as kept:
+            pass
+
+        chat_helpers._close_pooled_read_connections(self.db)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual(kept.execute("SELECT 1").fetchone(), (1,))
+
+        chat_helpers._close_pooled_read_connections(Path(self._td.name) / "wxid_oth")
+        self.assertEqual(kept.execute("SELECT 1").fetchone(), (1,))
+        chat_helpers._close_pooled_read_connections(other_dir)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            kept.execute("SELECT 1")
+        self.assertEqual(chat_helpers._READ_POOL, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import runtime_settings
+
+
+class TestUvicornServerOptions(unittest.TestCase):
+    def test_prefers_uvloop_and_httptools_when_installed(self):
+        with mock.patch.object(runtime_settings.sys, "platform", "linux"), mock.patch.object(
+            runtime_settings, "find_spec", return_value=object()
+        ):
+            opts = runtime_settings.read_uvicorn_server_options()
+        self.assertEqual(opts["loop"], "uvloop")
+        self.assertEqual(opts["http"], "httptools")
+
+    def test_windows_never_uses_uvloop(self):
+        with mock.patch.object(runtime_settings.sys, "platform", "win32"), mock.patch.object(
+            runtime_settings, "find_spec", return_value=object()
+        ):
+            opts = runtime_settings.read_uvicorn_server_options()
+        self.assertEqual(opts["loop"], "asyncio")
+        self.assertEqual(opts["http"], "httptools")
+
+    def test_falls_back_when_accelerators_missing(self):
+        with mock.patch.object(runtime_settings.sys, "platform", "darwin"), mock.patch.object(
+            runtime_settings, "find_spec", return_value=None
+        ):
+            opts = runtime_settings.read_uvicorn_server_options()
+        self.assertEqual(opts["loop"], "asyncio")
+        self.assertEqual(opts["http"], "h11")
+
+    def test_access_log_can_be_disabled(self):
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_ACCESS_LOG_KEY: ""}):
+            self.assertTrue(runtime_settings.read_uvicorn_server_options()["access_log"])
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_ACCESS_LOG_KEY: "0"}):
+            self.assertFalse(runtime_settings.read_uvicorn_server_options()["access_log"])
+
+    def test_workers_default_to_single_process(self):
+        with mock.patch.dict(runtime_settings.os.environ, {}, clear=False):
+            runtime_settings.os.environ.pop(runtime_settings.ENV_WORKERS_KEY, None)
+            self.assertEqual(runtime_settings.read_effective_backend_workers(), 1)
+
+    def test_workers_env_is_clamped(self):
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_WORKERS_KEY: "0"}):
+            self.assertEqual(runtime_settings.read_effective_backend_workers(), 1)
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_WORKERS_KEY: "abc"}):
+            self.assertEqual(runtime_settings.read_effective_backend_workers(), 1)
+        with mock.patch.object(runtime_settings.os, "cpu_count", return_value=2), mock.patch.dict(
+            runtime_settings.os.environ, {runtime_settings.ENV_WORKERS_KEY: "64"}
+        ):
+            self.assertEqual(runtime_settings.read_effective_backend_workers(), 5)
+
+    def test_uds_is_opt_in_and_ignored_on_windows(self):
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_UDS_KEY: ""}):
+            self.assertIsNone(runtime_settings.read_backend_uds())
+        with mock.patch.dict(runtime_settings.os.environ, {runtime_settings.ENV_UDS_KEY: "/tmp/wt.sock"}):
+            with mock.patch.object(runtime_settings.sys, "platform", "linux"):
+                self.assertEqual(runtime_settings.read_backend_uds(), "/tmp/wt.sock")
+            with mock.patch.object(runtime_settings.sys, "platform", "win32"):
+                self.assertIsNone(runtime_settings.read_backend_uds())
+
+
+if __name__ == "__main__":
+    unittest.main()
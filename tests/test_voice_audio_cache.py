@@ -0,0 +1,54 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wechat_decrypt_tool import media_helpers
+
+
+class TestVoiceAudioCache(unittest.TestCase):
+    def setUp(self):
+        self._reset_cache()
+
+    def tearDown(self):
+        self._reset_cache()
+
+    @staticmethod
+    def _reset_cache():
+        with media_helpers._VOICE_AUDIO_CACHE_LOCK:
+            media_helpers._VOICE_AUDIO_CACHE.clear()
+            media_helpers._voice_audio_cache_bytes = 0
+
+    def test_repeated_conversion_is_served_from_cache(self):
+        silk = b"\x02#!SILK_V3" + b"\x00" * 32
+        with mock.patch.object(media_helpers, "_convert_silk_to_wav", return_value=b"RIFF-wav") as to_wav, \
+                mock.patch.object(media_helpers, "_convert_wav_to_mp3", return_value=b"ID3-mp3") as to_mp3:
+            first = media_helpers._convert_silk_to_browser_audio(silk)
+            second = media_helpers._convert_silk_to_browser_audio(silk)
+            wav = media_helpers._convert_silk_to_browser_audio(silk, preferred_format="wav")
+
+        self.assertEqual(first, (b"ID3-mp3", "mp3", "audio/mpeg"))
+        self.assertEqual(second, first)
+        self.assertEqual(wav, (b"RIFF-wav", "wav", "audio/wav"))
+        self.assertEqual(to_wav.call_count, 2)
+        self.assertEqual(to_mp3.call_count, 1)
+
+    def test_failed_decode_is_not_cached_and_cache_is_bounded(self):
+        with mock.patch.object(media_helpers, "_convert_silk_to_wav", side_effect=lambda d: d) as to_wav:
+            self.assertEqual(media_helpers._convert_silk_to_browser_audio(b"silk", preferred_format="wav")[1], "silk")
+            media_helpers._convert_silk_to_browser_audio(b"silk", preferred_format="wav")
+        self.assertEqual(to_wav.call_count, 2)
+
+        with mock.patch.object(media_helpers, "_VOICE_AUDIO_CACHE_MAX_BYTES", 10):
+            media_helpers._convert_silk_to_browser_audio(b"RIFF-aaaa", preferred_format="wav")
+            media_helpers._convert_silk_to_browser_audio(b"RIFF-bbbb", preferred_format="wav")
+        self.assertEqual(len(media_helpers._VOICE_AUDIO_CACHE), 1)
+        self.assertEqual(media_helpers._voice_audio_cache_bytes, 9)
+
+
+if __name__ == "__main__":
+    unittest.main()